@@ -0,0 +1,147 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef, Q
+
+from vehicleBudget.models import DocumentCost, FinancialRecord, FuelConsumption, VehicleMaintenance
+from vehicleHub.models import IssueReport
+
+
+class Echo:
+    """
+    File-like object handing each written line back to the caller instead of buffering it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def maintenance_of_vehicle(vehicle_id, outer_ref="pk"):
+    return Exists(IssueReport.objects.filter(maintenance=OuterRef(outer_ref), vehicle_id=vehicle_id))
+
+
+class Export:
+    """
+    Streams the rows of a model as CSV or NDJSON. Rows are read as `values()` dicts through
+    `.iterator(chunk_size=...)`, so the memory used does not grow with the size of the export.
+    """
+
+    model = None
+    fields = ()
+    date_field = None
+
+    def get_vehicle_filter(self, vehicle_id):
+        return Q(vehicle_id=vehicle_id)
+
+    def get_queryset(self, vehicle_id=None, date_from=None, date_to=None):
+        queryset = self.model.objects.all()
+        if vehicle_id is not None:
+            queryset = queryset.filter(self.get_vehicle_filter(vehicle_id))
+        if date_from is not None:
+            queryset = queryset.filter(**{f"{self.date_field}__gte": date_from})
+        if date_to is not None:
+            queryset = queryset.filter(**{f"{self.date_field}__lte": date_to})
+        return queryset.order_by("id").values(*self.fields)
+
+    def rows(self, queryset):
+        return queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+    def stream_csv(self, queryset):
+        writer = csv.DictWriter(Echo(), fieldnames=self.fields)
+        yield writer.writeheader()
+        for row in self.rows(queryset):
+            yield writer.writerow(row)
+
+    def stream_ndjson(self, queryset):
+        for row in self.rows(queryset):
+            yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+class FinancialRecordExport(Export):
+    model = FinancialRecord
+    fields = (
+        "id",
+        "record_date",
+        "cost",
+        "payment_method",
+        "fuel_consumption",
+        "document_cost",
+        "vehicle_maintenance",
+        "created_at",
+    )
+    date_field = "record_date"
+
+    def get_vehicle_filter(self, vehicle_id):
+        return (
+            Q(fuel_consumption__vehicle_id=vehicle_id)
+            | Q(document_cost__document__issued_vehicle_id=vehicle_id)
+            | maintenance_of_vehicle(vehicle_id, "vehicle_maintenance")
+        )
+
+
+class FuelConsumptionExport(Export):
+    model = FuelConsumption
+    fields = (
+        "id",
+        "date",
+        "vehicle",
+        "vehicle__license_plate_number",
+        "fuel_type__fuel_type",
+        "quantity",
+        "quantity_type",
+        "fuel_cost",
+        "payment_method",
+        "payment_date",
+        "partner__partnership__name",
+        "created_at",
+    )
+    date_field = "date"
+
+
+class DocumentCostExport(Export):
+    model = DocumentCost
+    fields = (
+        "id",
+        "payment_date",
+        "payment_amount",
+        "payment_method",
+        "document",
+        "document__name",
+        "document__issued_vehicle",
+        "notes",
+        "created_at",
+    )
+    date_field = "payment_date"
+
+    def get_vehicle_filter(self, vehicle_id):
+        return Q(document__issued_vehicle_id=vehicle_id)
+
+
+class VehicleMaintenanceExport(Export):
+    model = VehicleMaintenance
+    fields = (
+        "id",
+        "name",
+        "status",
+        "maintenance_begin_date",
+        "maintenance_end_date",
+        "payment_amount",
+        "payment_method",
+        "payment_date",
+        "partner__partnership__name",
+        "created_at",
+    )
+    date_field = "maintenance_begin_date"
+
+    def get_vehicle_filter(self, vehicle_id):
+        return maintenance_of_vehicle(vehicle_id)
+
+
+EXPORTS = {
+    "financial-records": FinancialRecordExport(),
+    "fuel-consumptions": FuelConsumptionExport(),
+    "document-costs": DocumentCostExport(),
+    "maintenances": VehicleMaintenanceExport(),
+}
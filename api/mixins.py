@@ -1,5 +1,16 @@
-from django.contrib.auth import REDIRECT_FIELD_NAME
+import logging
+
+from django.conf import settings
+from django.contrib.auth import REDIRECT_FIELD_NAME, get_user_model
 from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from rest_framework import permissions
+from rest_framework.response import Response
+
+from api.query_plan import QueryPlan
+from api.serializers import ExpandableFieldsMixin
+from management.models import Vehicle, VehicleDriverAssignment
+
+logger = logging.getLogger(__name__)
 
 
 class MultipleSerializerAPIMixin:
@@ -28,6 +39,123 @@ class MultipleSerializerAPIMixin:
         return super().get_serializer_class()
 
 
+class EmptyListResponseMixin:
+    """
+    `list()` answering `{"response_message": empty_list_message}` when there is nothing to list.
+    Paginated lists are tested from their page (and the row count or an `exists()` when it is empty),
+    unpaginated ones once serialized: the queryset is never loaded just to be tested.
+    """
+
+    empty_list_message = None
+
+    def get_empty_list_response(self):
+        return Response({"response_message": self.empty_list_message})
+
+    def get_list_response(self, data):
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        if queryset is None:
+            return self.get_empty_list_response()
+        queryset = self.filter_queryset(queryset)
+
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            data = self.get_serializer(queryset, many=True).data
+            if not data:
+                return self.get_empty_list_response()
+            return self.get_list_response(data)
+
+        if not page and self.is_empty_list(queryset):
+            return self.get_empty_list_response()
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def is_empty_list(self, queryset):
+        # page number pagination has counted the rows already; an empty page past the first one
+        # (cursor pagination) does not mean an empty list.
+        page = getattr(self.paginator, "page", None)
+        if page is not None:
+            return page.paginator.count == 0
+        return not queryset.exists()
+
+
+class QueryOptimizerMixin:
+    """
+    `select_related`, `prefetch_related` and `only` derived from the serializer of the action
+    (`get_serializer_class()`) by a `QueryPlan`, for the read requests.
+    With `QUERY_OPTIMIZER_DEBUG`, the fields it could not see through are logged.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if queryset is None or self.request.method not in permissions.SAFE_METHODS:
+            return queryset
+        plan = QueryPlan(self.get_serializer(), queryset.model)
+        if settings.QUERY_OPTIMIZER_DEBUG:
+            for path, reason in plan.unoptimized:
+                logger.warning("%s: %s not optimized (%s).", self.__class__.__name__, path, reason)
+        return plan.apply(queryset)
+
+
+class ExpandableFieldsAPIMixin(QueryOptimizerMixin):
+    """
+    `?fields=a,b` and `?expand=a,b.c` (comma separated) passed to an `ExpandableFieldsMixin` serializer:
+    the queryset only fetches the relations it nests.
+    """
+
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+
+    def get_query_param_list(self, param):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        return [name.strip() for name in value.split(",") if name.strip()]
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), ExpandableFieldsMixin):
+            kwargs.setdefault("fields", self.get_query_param_list(self.fields_query_param))
+            kwargs.setdefault("expand", self.get_query_param_list(self.expand_query_param))
+        return super().get_serializer(*args, **kwargs)
+
+
+class VehicleScopeMixin:
+    """
+    The vehicles a user may see: all of them for a superuser, the vehicles of their active assignments for a
+    driver and the vehicles they manage for a technician; `None` for anyone else.
+    The role is resolved once per request, with the driver and technician profiles in a single query.
+    """
+
+    def get_vehicle_role(self):
+        if not hasattr(self, "_vehicle_role"):
+            user = self.request.user
+            if user.is_superuser:
+                self._vehicle_role = ("superuser", None)
+            else:
+                # the reverse one-to-ones are joined by their related_query_name and read by their related_name:
+                # "drivers" is Driver.user (user.driver), "user" is VehicleTechnician.user (user.technician).
+                user = get_user_model().objects.select_related("drivers", "user").filter(pk=user.pk).first()
+                if getattr(user, "driver", None) is not None:
+                    self._vehicle_role = ("driver", user.driver)
+                elif getattr(user, "technician", None) is not None:
+                    self._vehicle_role = ("technician", user.technician)
+                else:
+                    self._vehicle_role = (None, None)
+        return self._vehicle_role
+
+    def get_scoped_vehicles(self):
+        role, profile = self.get_vehicle_role()
+        if role == "superuser":
+            return Vehicle.objects.all()
+        elif role == "driver":
+            ACTIVE = VehicleDriverAssignment.AssignmentStatus.ACTIVE
+            return Vehicle.objects.filter(assignment__driver=profile, assignment__assignment_status=ACTIVE)
+        elif role == "technician":
+            return Vehicle.objects.filter(managing_technician=profile, managing_technician__end_date__isnull=False)
+        return None
+
+
 class AccessMixin:
     permission_denied_message = "You do not have access to perform this action."
     raise_exception = True
@@ -0,0 +1,193 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class HistoryCursorPagination(CursorPagination):
+    ordering = "-created_at"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class VehiclePickerPagination(CursorPagination):
+    # the plate is unique: a stable cursor, in the order the pickers display.
+    ordering = "license_plate_number"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+def estimate_count(queryset):
+    """
+    Rows of `queryset` as estimated by the PostgreSQL planner, without scanning them;
+    the exact count on the other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over `ordering`, which must be unique as a whole (`(created_at, id)` by default): a page
+    is read after (or before) the keys of the last row of the previous one, with a WHERE on the keys instead of
+    an OFFSET, and nothing is counted. `?count=estimate` adds an estimated total in the X-Estimated-Count header.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    estimated_count_header = "X-Estimated-Count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_fields(self, model):
+        return [model._meta.get_field(field.lstrip("-")) for field in self.ordering]
+
+    def load_ordering(self, queryset):
+        # the cursors are encoded from the keys of the rows: deferred (by an `only()`), they would be
+        # loaded by one more query per page.
+        keys = {field.lstrip("-") for field in self.ordering}
+        names, defer = queryset.query.deferred_loading
+        if not defer:
+            return queryset.only(*names, *keys)
+        if names & keys:
+            return queryset.defer(None).defer(*(names - keys))
+        return queryset
+
+    def encode_cursor(self, row, reverse):
+        # value_to_string keeps the microseconds of the datetimes, DjangoJSONEncoder would not.
+        position = [field.value_to_string(row) for field in self.get_fields(type(row))]
+        cursor = json.dumps({"p": position, "r": reverse})
+        return replace_query_param(self.base_url, self.cursor_query_param, urlsafe_b64encode(cursor.encode()).decode())
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+            fields = self.get_fields(model)
+            if len(cursor["p"]) != len(fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(fields, cursor["p"])], bool(cursor["r"])
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_keyset_filter(self, position, reverse):
+        # (a, b) after (x, y) in ascending order: a > x, or a = x and b > y.
+        keyset_filter, equal = Q(), {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") != reverse else "gt"
+            keyset_filter |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return keyset_filter
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+
+        self.estimated_count = None
+        if request.query_params.get(self.count_query_param) == "estimate":
+            self.estimated_count = estimate_count(queryset)
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.ordering
+        if reverse:
+            ordering = [field[1:] if field.startswith("-") else f"-{field}" for field in ordering]
+        queryset = self.load_ordering(queryset).order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position, reverse))
+
+        rows = list(queryset[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.rows = rows
+        return rows
+
+    def get_next_link(self):
+        if not (self.has_next and self.rows):
+            return None
+        return self.encode_cursor(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.rows:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.rows[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        headers = {}
+        if self.estimated_count is not None:
+            headers[self.estimated_count_header] = str(self.estimated_count)
+        return Response(
+            {"next": self.get_next_link(), "previous": self.get_previous_link(), "results": data}, headers=headers
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class SelectablePagination(BasePagination):
+    """
+    Page number pagination by default; keyset pagination (see `KeysetPagination`) when the view sets
+    `pagination_mode = "cursor"` or the request asks for `?pagination=cursor`.
+    """
+
+    mode_query_param = "pagination"
+    modes = {"page": PageNumberPagination, "cursor": KeysetPagination}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        mode = request.query_params.get(self.mode_query_param) or getattr(view, "pagination_mode", "page")
+        if mode not in self.modes:
+            raise ValidationError({self.mode_query_param: f"Expected one of: {', '.join(self.modes)}."})
+        self.paginator = self.modes[mode]()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def __getattr__(self, attr):
+        # page, links... of the paginator of the request
+        if attr == "paginator":
+            raise AttributeError(attr)
+        return getattr(self.paginator, attr)
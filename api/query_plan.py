@@ -0,0 +1,99 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+class QueryPlan:
+    """
+    The `select_related`, `prefetch_related` and `only` lookups a queryset of `model` needs for `serializer`
+    to render its rows without a query per row, read from the serializer declaration:
+
+    - nested serializers and dotted sources through a foreign key (`fuel_type.fuel_type`) are joined;
+    - many relations (`issue_reports`), and every relation under one, are prefetched;
+    - only the rendered columns are loaded, unless a field of the model level may read anything
+      (method fields, properties, a custom `to_representation`): that level is then loaded whole.
+
+    The fields that could not be seen through are listed in `unoptimized`, as `(path, reason)`.
+    """
+
+    def __init__(self, serializer, model):
+        self.select_related = []
+        self.prefetch_related = []
+        self.unoptimized = []
+        self.only = self.walk(serializer, model)
+        self.opaque = self.only is None
+
+    def add_relation(self, lookup, prefetched):
+        lookups = self.prefetch_related if prefetched else self.select_related
+        if lookup not in lookups:
+            lookups.append(lookup)
+
+    def walk(self, serializer, model, prefix="", prefetched=False):
+        """
+        Add the relations of `serializer`, for `model` reached through `prefix`, and return its `only` lookups
+        (None when the level is loaded whole).
+        """
+        only, opaque = [], False
+        if type(serializer).to_representation is not serializers.ModelSerializer.to_representation:
+            self.unoptimized.append((prefix.rstrip("_") or "*", "custom to_representation"))
+            opaque = True
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            path = f"{prefix}{name}"
+            if field.source == "*":
+                reason = "method field" if isinstance(field, serializers.SerializerMethodField) else "whole object"
+                self.unoptimized.append((path, reason))
+                opaque = True
+                continue
+
+            current, lookup, field_prefetched = model, prefix, prefetched
+            for position, attr in enumerate(field.source_attrs):
+                try:
+                    model_field = current._meta.get_field(attr)
+                except FieldDoesNotExist:
+                    self.unoptimized.append((path, f"{attr} is not a model field"))
+                    opaque = True
+                    break
+
+                lookup = f"{lookup}{attr}"
+                last = position == len(field.source_attrs) - 1
+                if not model_field.is_relation:
+                    only.append(lookup)
+                    break
+
+                many = model_field.many_to_many or model_field.one_to_many
+                if last and not many and isinstance(field, serializers.RelatedField):
+                    if field.use_pk_only_optimization():
+                        # the primary key, read from the foreign key column.
+                        only.append(lookup)
+                        break
+                field_prefetched = field_prefetched or many
+                self.add_relation(lookup, field_prefetched)
+                if not many:
+                    only.append(lookup)
+                current = model_field.related_model
+                nested = getattr(field, "child", field)
+                if last and isinstance(nested, serializers.ModelSerializer):
+                    nested_only = self.walk(nested, current, f"{lookup}__", field_prefetched)
+                    if nested_only is not None and not field_prefetched:
+                        only.remove(lookup)
+                        only += nested_only
+                lookup = f"{lookup}__"
+
+        return None if opaque else only
+
+    def apply(self, queryset):
+        joined = queryset.query.select_related
+        optimized = queryset.select_related(*self.select_related).prefetch_related(*self.prefetch_related)
+        if self.opaque or joined is True or queryset.query.deferred_loading != (frozenset(), True):
+            return optimized
+        # the relations the queryset joined already are loaded whole.
+        return optimized.only(*self.only, *self.get_joined(joined or {}))
+
+    def get_joined(self, select_related, prefix=""):
+        joined = []
+        for name, nested in select_related.items():
+            joined.append(f"{prefix}{name}")
+            joined += self.get_joined(nested, f"{prefix}{name}__")
+        return joined
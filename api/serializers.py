@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
@@ -11,6 +12,62 @@ from vehicleBudget.models import VehicleMaintenance
 from vehicleHub.models import Document, Fuel, IssueReport, Partner, Partnership
 
 
+class ExpandableFieldsMixin:
+    """
+    Sparse fieldsets: only the `fields` listed are rendered, and only the relations listed in `expand` are
+    nested (dotted for the deeper levels, e.g. `issued_driver.user`), the others rendered as primary keys.
+    Without `expand` every relation is nested. Only the relations rendered by an `ExpandableFieldsMixin`
+    serializer can be expanded deeper.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if expand is not None:
+            self.expand_relations(expand)
+        if fields is not None:
+            unknown = set(fields) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError(
+                    {"fields": _("Unknown fields: {}.").format(", ".join(sorted(unknown)))}
+                )
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def expand_relations(self, expand):
+        nested = {}
+        for path in expand:
+            name, _dot, rest = path.partition(".")
+            nested.setdefault(name, [])
+            if rest:
+                nested[name].append(rest)
+
+        relations = {
+            name: field
+            for name, field in self.fields.items()
+            if isinstance(getattr(field, "child", field), serializers.BaseSerializer)
+        }
+        unknown = set(nested) - set(relations)
+        if unknown:
+            raise serializers.ValidationError(
+                {"expand": _("Unknown relations: {}.").format(", ".join(sorted(unknown)))}
+            )
+
+        for name, field in relations.items():
+            many = isinstance(field, serializers.ListSerializer)
+            serializer = field.child if many else field
+            kwargs = {} if field.source == name else {"source": field.source}
+            if name not in nested:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(many=many, read_only=True, **kwargs)
+            elif isinstance(serializer, ExpandableFieldsMixin):
+                self.fields[name] = type(serializer)(many=many, read_only=True, expand=nested[name], **kwargs)
+            elif nested[name]:
+                # nested as a whole: the deeper relations asked for would be silently ignored.
+                paths = ", ".join(sorted(f"{name}.{rest}" for rest in nested[name]))
+                raise serializers.ValidationError(
+                    {"expand": _("Relations that cannot be expanded: {}.").format(paths)}
+                )
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = AppUser
@@ -32,7 +89,7 @@ class ListUserSerializer(serializers.ModelSerializer):
         fields = ["id", "employeeID", "email", "first_name", "last_name", "password", "is_active"]
 
 
-class DriverSerializer(serializers.ModelSerializer):
+class DriverSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     user = ListUserSerializer(read_only=True)
     have_valid_license = serializers.SerializerMethodField()
 
@@ -89,9 +146,19 @@ class TokenSerializer(TokenObtainPairSerializer):
         token_data["first_name"] = user.first_name
         token_data["last_name"] = user.last_name
         token_data["username"] = user.email
-        access_role = user.access_roles.first()
-        if access_role:
-            token_data["role"] = access_role.role.role_name
+        access_roles = user.load_active_access_roles()
+        if access_roles:
+            token_data["role"] = access_roles[0].role.role_name
+
+        token_data["token_version"] = user.token_version
+        if settings.JWT_ROLE_CLAIMS:
+            token_data["is_staff"] = user.is_staff
+            token_data["is_superuser"] = user.is_superuser
+            token_data["roles"] = [access_role.role.role_name for access_role in access_roles]
+            # the claimed roles are trusted until the first of them ends.
+            token_data["roles_valid_until"] = (
+                min(access_role.end_date for access_role in access_roles).isoformat() if access_roles else None
+            )
         return token_data
 
     def validate(self, attrs):
@@ -103,12 +170,15 @@ class TokenSerializer(TokenObtainPairSerializer):
                 "no_active_account",
             )
 
+        # loaded once by get_token, during super().validate()
+        access_roles = self.user.load_active_access_roles()
         user_details = {
             "user_id": self.user.id,
             "username": self.user.email,
             "first_name": self.user.first_name,
             "last_name": self.user.last_name,
-            "role": self.user.access_roles.first().role.role_name if self.user.access_roles.first() else None,
+            "role": access_roles[0].role.role_name if access_roles else None,
+            "roles": [access_role.role.role_name for access_role in access_roles],
         }
         data = {"user": user_details, **token_data}
         return data
@@ -161,8 +231,14 @@ class ListVehicleSerializer(VehicleSerializer):
         fields = VehicleSerializer.Meta.fields + ["created_by", "driver"]
 
     def get_driver(self, obj):
+        # the list view prefetches the active assignment (with its driver and user) for the whole page.
+        if hasattr(obj, "active_assignments"):
+            if not obj.active_assignments:
+                return []
+            return DriverSerializer(obj.active_assignments[0].driver).data
+
         try:
-            assignment = VehicleDriverAssignment.objects.get(
+            assignment = VehicleDriverAssignment.objects.select_related("driver__user").get(
                 vehicle=obj, assignment_status=VehicleDriverAssignment.AssignmentStatus.ACTIVE
             )
         except VehicleDriverAssignment.MultipleObjectsReturned:
@@ -224,7 +300,7 @@ class PartnershipListSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "start_date", "end_date", "description", "is_permanent_partner"]
 
 
-class PartnerListSerializer(serializers.ModelSerializer):
+class PartnerListSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     partnership = PartnershipListSerializer(read_only=True)
 
     class Meta:
@@ -307,7 +383,7 @@ class IssueReportSerializer(serializers.ModelSerializer):
     #         raise serializers.ValidationError("Could not report that vehicle. Try again later.")
 
 
-class ListIssueReportSerializer(IssueReportSerializer):
+class ListIssueReportSerializer(ExpandableFieldsMixin, IssueReportSerializer):
     vehicle = VehicleSerializer(read_only=True)
 
     class Meta(IssueReportSerializer.Meta):
@@ -336,7 +412,7 @@ class VehicleMaintenanceSerializer(serializers.ModelSerializer):
         fields = ["name", "issue_reports", "maintenance_begin_date", "maintenance_end_date", "partner", "status"]
 
 
-class ListVehicleMaintenanceSerializer(VehicleMaintenanceSerializer):
+class ListVehicleMaintenanceSerializer(ExpandableFieldsMixin, VehicleMaintenanceSerializer):
     issue_reports = ListIssueReportSerializer(many=True, read_only=True)
     partner = PartnerListSerializer(read_only=True)
 
@@ -344,7 +420,7 @@ class ListVehicleMaintenanceSerializer(VehicleMaintenanceSerializer):
         fields = ["id"] + VehicleMaintenanceSerializer.Meta.fields + ["payment_amount"]
 
 
-class DocumentListSerializer(serializers.ModelSerializer):
+class DocumentListSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     issued_driver = DriverSerializer(read_only=True)
     issued_vehicle = VehicleSerializer(read_only=True)
     issuing_authority = PartnerListSerializer(read_only=True)
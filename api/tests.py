@@ -1,3 +1,532 @@
+from datetime import date
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from api.query_plan import QueryPlan
+from api.serializers import DocumentListSerializer, ListVehicleMaintenanceSerializer
+from authentication.models import AccessRole, AppUser, Driver, Role
+from management.models import Vehicle, VehicleDriverAssignment, VehicleTechnician
+from vehicleBudget.models import FuelConsumption, VehicleMaintenance
+from vehicleHub.models import Document, Fuel, IssueReport, Partner, Partnership
+
+
+class FleetTestCase(TestCase):
+    """A fleet where every vehicle has an active assignment, managed by one technician."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.superuser = AppUser.objects.create_superuser(email="admin@example.com", password=None)
+        self.technician = VehicleTechnician.objects.create(
+            user=AppUser.objects.create_user(email="technician@example.com", password=None),
+            begin_date=date(2024, 1, 1),
+            end_date=date(2030, 1, 1),
+        )
+        self.fuel = Fuel.objects.create(fuel_type="Diesel")
+        self.partner = Partner.objects.create(
+            partnership=Partnership.objects.create(name="Garage"), email="garage@example.com", companyNIF="NIF1"
+        )
+        self.vehicles = []
+        self.drivers = []
+
+    def authenticate(self, user):
+        # a fresh instance, as a request would load: nothing cached by a previous request.
+        self.client.force_authenticate(AppUser.objects.get(pk=user.pk))
+
+    def add_vehicles(self, count):
+        # the deferred events of the fixtures are processed as they would be on commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(count):
+                n = len(self.vehicles)
+                vehicle = Vehicle.objects.create(
+                    make="Toyota",
+                    model="Hilux",
+                    year=2020,
+                    vin_number=f"VIN{n}",
+                    license_plate_number=f"P{n}",
+                    fuel_type=self.fuel,
+                    created_by=self.superuser,
+                )
+                driver = Driver.objects.create(
+                    user=AppUser.objects.create_user(email=f"driver{n}@example.com", password=None),
+                    driving_license_number=f"L{n}",
+                    delivery_date=date(2020, 1, 1),
+                    expiry_date=date(2030, 1, 1),
+                )
+                VehicleDriverAssignment.objects.create(
+                    driver=driver, vehicle=vehicle, begin_at=date(2024, 1, 1), ends_at=date(2030, 1, 1)
+                )
+                self.technician.managed_vehicles.add(vehicle)
+                self.vehicles.append(vehicle)
+                self.drivers.append(driver)
+
+
+class VehicleListQueriesTests(FleetTestCase):
+    """The queries of the vehicle list do not grow with the page, whatever the role."""
+
+    url = reverse("vehicle-list")
+
+    def assert_list_queries(self, user, num, rows):
+        for count in (2, 8):
+            self.add_vehicles(count - len(self.vehicles))
+            self.authenticate(user)
+            with self.assertNumQueries(num):
+                response = self.client.get(self.url)
+            self.assertEqual(len(response.data["results"]), rows(count))
+
+    def test_superuser(self):
+        # page, count and the active assignments with their driver.
+        self.assert_list_queries(self.superuser, 3, lambda count: count)
+
+    def test_technician(self):
+        # role, page, count and the active assignments with their driver.
+        self.assert_list_queries(self.technician.user, 4, lambda count: count)
+
+    def test_driver(self):
+        self.add_vehicles(1)
+        # role, page, count and the active assignments with their driver.
+        self.assert_list_queries(self.drivers[0].user, 4, lambda count: 1)
+
+
+class VehicleHistoryQueriesTests(FleetTestCase):
+    """The queries of the vehicle history do not grow with its length."""
+
+    def setUp(self):
+        super().setUp()
+        self.add_vehicles(1)
+        self.vehicle = self.vehicles[0]
+        self.url = reverse("vehicle-history-all-info", args=[self.vehicle.pk])
+
+    def add_history(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(count):
+                FuelConsumption.objects.create(
+                    vehicle=self.vehicle, fuel_type=self.fuel, partner=self.partner, fuel_cost=10, payment_amount=10
+                )
+                Document.objects.create(
+                    name=f"Document {n}",
+                    document_type=Document.DocumentChoices.INSURANCE_CERTIFICATE,
+                    document_category=Document.DocumentTypeChoices.CORE,
+                    issued_vehicle=self.vehicle,
+                    issuing_authority=self.partner,
+                    exp_begin_date=date(2024, 1, 1),
+                    exp_end_date=date(2025, 1, 1),
+                )
+                report = IssueReport.objects.create(name=f"Issue {n}", vehicle=self.vehicle, issue_cost=10)
+                maintenance = VehicleMaintenance.objects.create(name=f"Fix {n}", partner=self.partner)
+                maintenance.issue_reports.set([report])
+
+    def assert_history_queries(self, num, sections=None):
+        params = {"sections": sections} if sections else {}
+        for count in (1, 5):
+            self.add_history(count)
+            self.authenticate(self.superuser)
+            with self.assertNumQueries(num):
+                response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+
+    def test_full_history(self):
+        # vehicle, driver profile of the user, summary and one query per listed section.
+        self.assert_history_queries(9)
+
+    def test_sections(self):
+        # vehicle, fuel consumptions and summary.
+        self.assert_history_queries(3, "fuel_consumption,stats")
+
+    def test_unknown_section(self):
+        self.authenticate(self.superuser)
+        for sections in ("stats,mileage", ",", ""):
+            response = self.client.get(self.url, {"sections": sections})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("fuel_consumption", response.data["response_data"]["sections"])
+
+    def test_paged_sections(self):
+        self.add_history(5)
+        self.authenticate(self.superuser)
+        for route, key, names in (
+            ("vehicle-history-documents", "name", [f"Document {n}" for n in range(5)]),
+            ("vehicle-history-maintenances", "name", [f"Fix {n}" for n in range(5)]),
+            ("vehicle-history-issue-reports", "name", [f"Issue {n}" for n in range(5)]),
+        ):
+            url, pages = reverse(route, args=[self.vehicle.pk]), []
+            page = {"next": f"{url}?page_size=2"}
+            while page["next"]:
+                page = self.client.get(page["next"]).json()
+                pages.append([row[key] for row in page["results"]])
+            self.assertEqual(pages, [names[4:2:-1], names[2:0:-1], names[:1]])
+
+            page = self.client.get(page["previous"]).json()
+            self.assertEqual([row[key] for row in page["results"]], names[2:0:-1])
+
+
+class VehiclePickerTests(FleetTestCase):
+    """The vehicles a user may pick, whatever the role, a page of plates at a time."""
+
+    url = reverse("custom-vehicles-list")
+
+    def setUp(self):
+        super().setUp()
+        self.add_vehicles(3)
+        # a vehicle the technician does not manage.
+        self.technician.managed_vehicles.remove(self.vehicles[2])
+
+    def get_plates(self, user, num, params=None):
+        self.authenticate(user)
+        with self.assertNumQueries(num) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.page = response.json()
+        self.page_sql = queries.captured_queries[-1]["sql"]
+        return [vehicle["license_plate_number"] for vehicle in self.page["response_data"]]
+
+    def cursor(self, link):
+        return parse_qs(urlparse(self.page[link]).query)["cursor"][0]
+
+    def test_scope_per_role(self):
+        # the page; the role first for the others.
+        self.assertEqual(self.get_plates(self.superuser, 1), ["P0", "P1", "P2"])
+        self.assertEqual(self.get_plates(self.technician.user, 2), ["P0", "P1"])
+        self.assertEqual(self.get_plates(self.drivers[1].user, 2), ["P1"])
+
+        self.get_plates(AppUser.objects.create_user(email="nobody@example.com", password=None), 1)
+        self.assertEqual(
+            self.page, {"success": False, "response_message": "No vehicles to display.", "response_data": []}
+        )
+
+    def test_cursor_links(self):
+        self.assertEqual(self.get_plates(self.superuser, 1, {"page_size": 2}), ["P0", "P1"])
+        self.assertIsNone(self.page["previous"])
+        self.assertEqual(self.get_plates(self.superuser, 1, {"page_size": 2, "cursor": self.cursor("next")}), ["P2"])
+        self.assertIsNone(self.page["next"])
+        self.assertEqual(
+            self.get_plates(self.superuser, 1, {"page_size": 2, "cursor": self.cursor("previous")}), ["P0", "P1"]
+        )
+
+    def test_serializer_columns_only(self):
+        self.get_plates(self.superuser, 1)
+        self.assertIn('"license_plate_number"', self.page_sql)
+        self.assertIn('"fuel_type_id"', self.page_sql)
+        for column in ("mileage", "created_at", "created_by_id"):
+            self.assertNotIn(f'"{column}"', self.page_sql)
+
+
+class KeysetPaginationTests(FleetTestCase):
+    url = reverse("documents-list")
+
+    def setUp(self):
+        super().setUp()
+        self.add_vehicles(1)
+        self.documents = [
+            Document.objects.create(
+                name=f"Document {n}",
+                document_type=Document.DocumentChoices.INSURANCE_CERTIFICATE,
+                document_category=Document.DocumentTypeChoices.CORE,
+                issued_vehicle=self.vehicles[0],
+                exp_begin_date=date(2024, 1, 1),
+                exp_end_date=date(2025, 1, 1),
+            )
+            for n in range(5)
+        ]
+        self.authenticate(self.superuser)
+
+    def get_page(self, url, params=None, num=1):
+        # the page only: the keys of the cursors are loaded with the rows, even by `?fields=`.
+        with self.assertNumQueries(num):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_next_and_previous(self):
+        page = self.get_page(self.url, {"pagination": "cursor", "page_size": 2, "fields": "id,name"})
+        pages = [[row["id"] for row in page["results"]]]
+        self.assertIsNone(page["previous"])
+        while page["next"]:
+            page = self.get_page(page["next"])
+            pages.append([row["id"] for row in page["results"]])
+
+        newest_first = [document.pk for document in reversed(self.documents)]
+        self.assertEqual(pages, [newest_first[:2], newest_first[2:4], newest_first[4:]])
+
+        for expected in (pages[1], pages[0]):
+            page = self.get_page(page["previous"])
+            self.assertEqual([row["id"] for row in page["results"]], expected)
+        self.assertIsNone(page["previous"])
+
+    def test_invalid_cursor(self):
+        for cursor in ("garbage", "eyJwIjogWzFdLCAiciI6IGZhbHNlfQ=="):
+            response = self.client.get(self.url, {"pagination": "cursor", "cursor": cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_pagination_mode(self):
+        self.assertIn("count", self.client.get(self.url).json())
+        response = self.client.get(self.url, {"pagination": "offset"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("pagination", response.json())
+
+    def test_estimated_count(self):
+        response = self.client.get(self.url, {"pagination": "cursor"})
+        self.assertNotIn("X-Estimated-Count", response)
+        response = self.client.get(self.url, {"pagination": "cursor", "count": "estimate"})
+        self.assertEqual(response["X-Estimated-Count"], "5")
+
+
+class ExpandableFieldsTests(FleetTestCase):
+    url = reverse("documents-list")
+
+    def setUp(self):
+        super().setUp()
+        self.add_vehicles(2)
+        for vehicle, driver in zip(self.vehicles, self.drivers):
+            Document.objects.create(
+                name=f"Insurance {vehicle.pk}",
+                document_type=Document.DocumentChoices.INSURANCE_CERTIFICATE,
+                document_category=Document.DocumentTypeChoices.CORE,
+                issued_vehicle=vehicle,
+                issued_driver=driver,
+                issuing_authority=self.partner,
+                exp_begin_date=date(2024, 1, 1),
+                exp_end_date=date(2025, 1, 1),
+            )
+        self.authenticate(self.superuser)
+
+    def get_results(self, params):
+        # count and page, whatever the relations: only the joins of the page change.
+        with self.assertNumQueries(2) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"], queries.captured_queries[-1]["sql"].count("JOIN")
+
+    def test_unknown_names(self):
+        for params, key, message in (
+            ({"fields": "id,cost"}, "fields", "Unknown fields: cost."),
+            ({"expand": "issued_vehicle,owner"}, "expand", "Unknown relations: owner."),
+            ({"expand": "issuing_authority.owner"}, "expand", "Unknown relations: owner."),
+            (
+                {"expand": "issued_vehicle.fuel_type"},
+                "expand",
+                "Relations that cannot be expanded: issued_vehicle.fuel_type.",
+            ),
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()[key], message)
+
+    def test_full_payload(self):
+        rows, joins = self.get_results({})
+        self.assertEqual(rows[0]["issued_vehicle"]["license_plate_number"], self.vehicles[0].license_plate_number)
+        self.assertEqual(rows[0]["issued_driver"]["user"]["email"], self.drivers[0].user.email)
+        self.assertEqual(rows[0]["issuing_authority"]["partnership"]["name"], "Garage")
+        self.assertEqual(joins, 5)
+
+    def test_relations_collapsed_to_primary_keys(self):
+        rows, joins = self.get_results({"fields": "id,name,issued_vehicle,issuing_authority", "expand": ""})
+        self.assertEqual(
+            rows[0],
+            {
+                "id": rows[0]["id"],
+                "name": rows[0]["name"],
+                "issued_vehicle": self.vehicles[0].pk,
+                "issuing_authority": self.partner.pk,
+            },
+        )
+        self.assertEqual(joins, 0)
+
+        rows, joins = self.get_results({"fields": "issued_vehicle,issuing_authority", "expand": "issuing_authority"})
+        self.assertEqual(rows[0]["issued_vehicle"], self.vehicles[0].pk)
+        self.assertEqual(rows[0]["issuing_authority"]["partnership"], self.partner.partnership_id)
+        self.assertEqual(joins, 1)
+
+    def test_dotted_expand(self):
+        rows, joins = self.get_results({"fields": "issuing_authority", "expand": "issuing_authority.partnership"})
+        self.assertEqual(rows[0]["issuing_authority"]["partnership"]["name"], "Garage")
+        self.assertEqual(joins, 2)
+
+        rows, joins = self.get_results({"fields": "issued_driver", "expand": "issued_driver.user"})
+        self.assertEqual(rows[0]["issued_driver"]["user"]["email"], self.drivers[0].user.email)
+        self.assertEqual(joins, 2)
+
+
+class FuelNameSerializer(serializers.ModelSerializer):
+    fuel = serializers.CharField(source="fuel_type.fuel_type")
+
+    class Meta:
+        model = Vehicle
+        fields = ["license_plate_number", "fuel"]
+
+
+class QueryPlanTests(FleetTestCase):
+    def get_payload(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("response_message", response.json())
+        return response.json()
+
+    def test_dotted_source(self):
+        plan = QueryPlan(FuelNameSerializer(), Vehicle)
+        self.assertEqual((plan.select_related, plan.prefetch_related), (["fuel_type"], []))
+        self.assertEqual(plan.only, ["license_plate_number", "fuel_type", "fuel_type__fuel_type"])
+
+    def test_nested_many_relation(self):
+        plan = QueryPlan(ListVehicleMaintenanceSerializer(), VehicleMaintenance)
+        self.assertEqual(plan.prefetch_related, ["issue_reports", "issue_reports__vehicle"])
+        self.assertEqual(plan.select_related, ["partner", "partner__partnership"])
+        # the prefetched rows are loaded whole, the joined ones column by column.
+        self.assertNotIn("issue_reports", plan.only)
+        self.assertIn("partner__partnership__name", plan.only)
+        self.assertNotIn("partner", plan.only)
+
+    def test_method_field_loads_its_level_whole(self):
+        plan = QueryPlan(DocumentListSerializer(), Document)
+        self.assertIn(("issued_driver__have_valid_license", "method field"), plan.unoptimized)
+        # the driver is still joined, with its user, but none of their columns is listed: they are loaded whole.
+        self.assertIn("issued_driver__user", plan.select_related)
+        self.assertIn("issued_driver", plan.only)
+        self.assertFalse([lookup for lookup in plan.only if lookup.startswith("issued_driver__")])
+        # the other levels are not affected.
+        self.assertIn("issued_vehicle__license_plate_number", plan.only)
+
+    def test_same_payloads(self):
+        self.add_vehicles(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            for vehicle, driver in zip(self.vehicles, self.drivers):
+                document = Document.objects.create(
+                    name=f"Insurance {vehicle.pk}",
+                    document_type=Document.DocumentChoices.INSURANCE_CERTIFICATE,
+                    document_category=Document.DocumentTypeChoices.CORE,
+                    issued_vehicle=vehicle,
+                    issued_driver=driver,
+                    issuing_authority=self.partner,
+                    exp_begin_date=date(2024, 1, 1),
+                    exp_end_date=date(2025, 1, 1),
+                )
+                report = IssueReport.objects.create(name="Flat tire", vehicle=vehicle, issue_cost=10)
+                maintenance = VehicleMaintenance.objects.create(name="Fix", partner=self.partner, payment_amount=10)
+                maintenance.issue_reports.set([report])
+        self.authenticate(self.superuser)
+
+        urls = [
+            reverse("vehicle-list"),
+            reverse("vehicle-detail", args=[self.vehicles[0].pk]),
+            reverse("documents-list"),
+            reverse("documents-detail", args=[document.pk]),
+            reverse("issue-reports-list"),
+            reverse("issue-reports-detail", args=[report.pk]),
+            reverse("vehicle-maintenances-list"),
+            reverse("vehicle-maintenances-detail", args=[maintenance.pk]),
+        ]
+        optimized = [self.get_payload(url) for url in urls]
+        with mock.patch.object(QueryPlan, "apply", lambda plan, queryset: queryset):
+            plain = [self.get_payload(url) for url in urls]
+        self.assertEqual(optimized, plain)
+
+
+class EmptyListResponseTests(FleetTestCase):
+    url = reverse("documents-list")
+    empty = {"response_message": "No documents registered yet."}
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.superuser)
+
+    def add_document(self):
+        return Document.objects.create(
+            name="Registration",
+            document_type=Document.DocumentChoices.VEHICLE_REGISTRATION_DOCUMENT,
+            document_category=Document.DocumentTypeChoices.CORE,
+            exp_begin_date=date(2024, 1, 1),
+            exp_end_date=date(2025, 1, 1),
+        )
+
+    def test_empty_lists(self):
+        for params in ({}, {"pagination": "cursor"}):
+            self.assertEqual(self.client.get(self.url, params).json(), self.empty)
+
+    def test_nothing_in_scope(self):
+        self.add_vehicles(1)
+        self.authenticate(AppUser.objects.create_user(email="nobody@example.com", password=None))
+        response = self.client.get(reverse("vehicle-list"))
+        self.assertEqual(response.json(), {"success": False, "response_message": "No Vehicles registered!"})
+
+    def test_listed(self):
+        document = self.add_document()
+        page = self.client.get(self.url).json()
+        self.assertEqual((page["count"], page["results"][0]["id"]), (1, document.pk))
+
+        page = self.client.get(self.url, {"pagination": "cursor"}).json()
+        self.assertEqual(page["results"][0]["id"], document.pk)
+
+    def test_empty_page_of_a_list(self):
+        oldest = self.add_document()
+        self.add_document()
+        page = self.client.get(self.url, {"pagination": "cursor", "page_size": 1}).json()
+        oldest.delete()
+
+        # a cursor past the last row reads an empty page, not an empty list.
+        page = self.client.get(page["next"]).json()
+        self.assertEqual((page["next"], page["results"]), (None, []))
+        self.assertIsNotNone(page["previous"])
+
+
+class ExportTests(FleetTestCase):
+    url = reverse("export", args=["fuel-consumptions"])
+
+    def setUp(self):
+        super().setUp()
+        self.add_vehicles(1)
+
+    def test_reserved_to_the_financial_role(self):
+        controller = AppUser.objects.create_user(email="financial@example.com", password=None)
+        role = Role.objects.create(role_name="Financial", role_group=Role.RoleGroup.FINANCIAL)
+        AccessRole.objects.create(user=controller, role=role, start_date=date(2024, 1, 1), end_date=date(2030, 1, 1))
+
+        for user, status_code in (
+            (self.drivers[0].user, 403),
+            (self.technician.user, 403),
+            (controller, 200),
+            (self.superuser, 200),
+        ):
+            self.authenticate(user)
+            self.assertEqual(self.client.get(self.url).status_code, status_code)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class ImportTests(FleetTestCase):
+    url = reverse("import", args=["fuel-consumptions"])
+
+    def test_unreadable_file(self):
+        self.add_vehicles(1)
+        upload = SimpleUploadedFile(
+            "fuel.csv", b"vehicle,fuel_type,partner,date,fuel_cost\nP0,diesel,NIF1,2024-01-01,10\n\xff"
+        )
+        self.authenticate(self.superuser)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {"file": upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("can't decode", response.data["response_data"]["error"])
+
+
+class FinancialDashboardTests(FleetTestCase):
+    url = reverse("financial-dashboard")
+
+    def test_whole_amounts(self):
+        self.add_vehicles(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            FuelConsumption.objects.create(
+                vehicle=self.vehicles[0],
+                fuel_type=self.fuel,
+                partner=self.partner,
+                fuel_cost=40,
+                payment_amount=35,
+                payment_date=date(2024, 1, 15),
+            )
 
-# Create your tests here.
+        self.authenticate(self.superuser)
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()["vehicle_costs"], {"total_fuel_cost": 35, "total_document_cost": 0})
+        self.assertEqual(response.json()["timeline"][0]["fuel"], 35)
@@ -9,8 +9,10 @@ from api.views import (
     DriverDashboardView,
     DriverListView,
     DriverViewSet,
+    ExportView,
     FinancialControllerDashboardView,
     FuelViewSet,
+    ImportView,
     IssueReportViewSet,
     PartnerConfigurationViewSet,
     PartnershipManagementViewSet,
@@ -73,4 +75,12 @@ urlpatterns = [
     path("dashboard/driver/", DriverDashboardView.as_view(), name="driver-dashboard"),
     path("dashboard/technician/", TechnicianDashboardView.as_view(), name="technician-dashboard"),
     path("dashboard/financial/", FinancialControllerDashboardView.as_view(), name="financial-dashboard"),
+    #######################
+    # EXPORTS
+    #####################
+    path("export/<str:resource>/", ExportView.as_view(), name="export"),
+    #######################
+    # IMPORTS
+    #####################
+    path("import/<str:resource>/", ImportView.as_view(), name="import"),
 ]
@@ -1,12 +1,19 @@
-from datetime import timedelta
+import io
+import os
+from datetime import date, timedelta
 
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
-from django.db.models import Count, Q, Sum
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, Exists, OuterRef, Prefetch, Q, Sum
+from django.db.models.functions import Coalesce
 from django.db.utils import IntegrityError
-from django.http import JsonResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.utils.translation import gettext as _
+from django.utils.translation import gettext_lazy
 from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import GenericAPIView, ListAPIView
@@ -16,7 +23,16 @@ from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from api.mixins import AccessMixin, MultipleSerializerAPIMixin
+from api.exports import EXPORTS
+from api.mixins import (
+    AccessMixin,
+    EmptyListResponseMixin,
+    ExpandableFieldsAPIMixin,
+    MultipleSerializerAPIMixin,
+    QueryOptimizerMixin,
+    VehicleScopeMixin,
+)
+from api.pagination import HistoryCursorPagination, SelectablePagination, VehiclePickerPagination
 from api.serializers import (  # ListFuelSerializer,
     AddUserSerializer,
     DocumentCreateSerializer,
@@ -44,8 +60,18 @@ from api.serializers import (  # ListFuelSerializer,
 )
 from api.utils import send_email
 from authentication.models import AccessRole, AppUser, Driver, Role
+from management.health import celery_monitor
 from management.models import Vehicle, VehicleDriverAssignment, VehicleTechnician
-from vehicleBudget.models import DocumentCost, FuelConsumption, VehicleMaintenance
+from management.signals import SYSTEM_DASHBOARD_CACHE_KEY
+from vehicleBudget.importers import IMPORTERS
+from vehicleBudget.models import (
+    DocumentCost,
+    ExpenseRollup,
+    FuelConsumption,
+    PaymentMixin,
+    VehicleCostSummary,
+    VehicleMaintenance,
+)
 from vehicleHub.models import Document, Fuel, IssueReport, Partner, Partnership
 
 
@@ -74,6 +100,7 @@ class AddUserView(GenericAPIView):
 
 
 class UserAPIViewSet(
+    QueryOptimizerMixin,
     MultipleSerializerAPIMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -122,12 +149,12 @@ class UserAPIViewSet(
             )
 
 
-class DriverListView(ListAPIView):
+class DriverListView(QueryOptimizerMixin, ListAPIView):
     serializer_class = DriverSerializer
     queryset = Driver.objects.all()
 
 
-class DriverViewSet(ModelViewSet):
+class DriverViewSet(QueryOptimizerMixin, ModelViewSet):
     serializer_class = RegisterDriverSerializer
     detail_serializer_class = DriverSerializer
     permission_classes = [IsAuthenticated]
@@ -191,7 +218,7 @@ class DriverViewSet(ModelViewSet):
             return Response({"success": False, "count_": 0})
 
 
-class RegisterDriverApiView(ModelViewSet, MultipleSerializerAPIMixin):
+class RegisterDriverApiView(QueryOptimizerMixin, ModelViewSet, MultipleSerializerAPIMixin):
     permission_classes = [IsAuthenticated]
     queryset = Driver.objects.all()
     update_serializer_class = UpdateDriverSerializer
@@ -343,30 +370,33 @@ class RegisterDriverApiView(ModelViewSet, MultipleSerializerAPIMixin):
             )
 
 
-class FuelViewSet(viewsets.ModelViewSet):
+class FuelViewSet(QueryOptimizerMixin, viewsets.ModelViewSet):
     serializer_class = FuelSerializer
     queryset = Fuel.objects.all()
 
 
-class VehicleViewSet(MultipleSerializerAPIMixin, ModelViewSet):
+class VehicleViewSet(
+    VehicleScopeMixin, EmptyListResponseMixin, QueryOptimizerMixin, MultipleSerializerAPIMixin, ModelViewSet
+):
     queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
     list_serializer_class = ListVehicleSerializer
+    empty_list_message = gettext_lazy("No Vehicles registered!")
 
     def get_queryset(self):
-        user = self.request.user
-
-        if user.is_superuser:
-            return Vehicle.objects.all()
-
-        elif hasattr(user, "driver"):
-            driver = user.driver
-            ACTIVE = VehicleDriverAssignment.AssignmentStatus.ACTIVE
-            return Vehicle.objects.filter(assignment__driver=driver, assignment__assignment_status=ACTIVE)
+        queryset = self.get_scoped_vehicles()
+        if queryset is None:
+            return None
 
-        elif hasattr(user, "technician"):
-            technician = user.technician
-            return Vehicle.objects.filter(managing_technician=technician, managing_technician__end_date__isnull=False)
+        if self.action == "list":
+            # load the active assignment, its driver and user for the whole page in one batch
+            active_assignments = VehicleDriverAssignment.objects.filter(
+                assignment_status=VehicleDriverAssignment.AssignmentStatus.ACTIVE
+            ).select_related("driver__user")
+            queryset = queryset.select_related("created_by", "fuel_type").prefetch_related(
+                Prefetch("assignments", queryset=active_assignments, to_attr="active_assignments")
+            )
+        return queryset
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -391,16 +421,8 @@ class VehicleViewSet(MultipleSerializerAPIMixin, ModelViewSet):
 
         return None
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset:
-            return Response(
-                {
-                    "success": False,
-                    "response_message": _("No Vehicles registered!"),
-                }
-            )
-        return super().list(request, *args, **kwargs)
+    def get_empty_list_response(self):
+        return Response({"success": False, "response_message": self.empty_list_message})
 
     @action(detail=False, methods=["GET"], url_path="count/")
     def vehicle_config(self, request, *args, **kwargs):
@@ -414,9 +436,13 @@ class VehicleViewSet(MultipleSerializerAPIMixin, ModelViewSet):
             return Response({"success": False, "count_": 0})
 
 
-class VehicleTechnicianViewSet(ModelViewSet):
+class VehicleTechnicianViewSet(EmptyListResponseMixin, QueryOptimizerMixin, MultipleSerializerAPIMixin, ModelViewSet):
     queryset = VehicleTechnician.objects.all()
     serializer_class = VehicleTechnicianSerializer
+    list_serializer_class = VehicleTechnicianListSerializer
+    # the technicians are listed whole
+    pagination_class = None
+    empty_list_message = gettext_lazy("No vehicles registered yet.")
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -437,20 +463,8 @@ class VehicleTechnicianViewSet(ModelViewSet):
             )
         return Response({"success": False, "response_message": serializer.errors})
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset:
-            return Response({"response_message": _("No vehicles registered yet.")})
-
-        return Response(
-            {
-                "success": True,
-                "response_message": _("Vehicles found."),
-                "response_data": VehicleTechnicianListSerializer(
-                    queryset, many=True, context={"request": request}
-                ).data,
-            }
-        )
+    def get_list_response(self, data):
+        return Response({"success": True, "response_message": _("Vehicles found."), "response_data": data})
 
     @action(detail=False, methods=["GET"], url_path="count/")
     def vehicle_technician_config(self, request, *args, **kwargs):
@@ -508,7 +522,7 @@ class VehicleDriverAssignmentCreationView(APIView):
             )
 
 
-class VehicleAssignmentsManagementViewSet(MultipleSerializerAPIMixin, viewsets.ModelViewSet):
+class VehicleAssignmentsManagementViewSet(QueryOptimizerMixin, MultipleSerializerAPIMixin, viewsets.ModelViewSet):
     queryset = VehicleDriverAssignment.objects.all()
     serializer_class = VehicleDriverAssignmentSerializer
     list_serializer_class = ListVehicleDriverAssignmentSerializer
@@ -579,77 +593,49 @@ class VehicleAssignmentsManagementViewSet(MultipleSerializerAPIMixin, viewsets.M
             )
 
 
-class CustomVehicleList(APIView):
-    def get_queryset(self):
-        return Vehicle.objects.all()
-
-    def get(self, request, *args, **kwargs):
-        auth_user = request.user
-        ACTIVE = VehicleDriverAssignment.AssignmentStatus.ACTIVE
+class CustomVehicleList(VehicleScopeMixin, GenericAPIView):
+    """
+    Vehicles of the user's role (see `VehicleScopeMixin`), for the vehicle pickers: cursor-paginated
+    by plate, with only the columns of `VehicleSerializer`.
+    """
 
-        response_data = {
-            "success": False,
-            "response_message": _("An unexpected error occurred. Please Contact the administrator."),
-            "response_data": [],
-        }
+    serializer_class = VehicleSerializer
+    pagination_class = VehiclePickerPagination
 
-        if auth_user.is_superuser:
-            response_data["success"] = True
-            response_data["response_message"] = _("Success")
-            response_data["response_data"] = VehicleSerializer(self.get_queryset(), many=True).data
-            return Response(response_data, status=status.HTTP_200_OK)
+    def get_queryset(self):
+        queryset = self.get_scoped_vehicles()
+        if queryset is None:
+            return None
+        return queryset.only(*self.serializer_class.Meta.fields)
 
-        try:
-            vehicle_technician = VehicleTechnician.objects.get(user=auth_user)
-            managed_vehicles = Vehicle.objects.filter(
-                managing_technician=vehicle_technician, managing_technician__end_date__isnull=False
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        if queryset is None:
+            return Response(
+                {"success": False, "response_message": _("No vehicles to display."), "response_data": []},
+                status=status.HTTP_200_OK,
             )
-        except VehicleTechnician.DoesNotExist:
-            vehicle_technician = None
-            managed_vehicles = None
-
-        try:
-            try:
-                if auth_user.driver:
-                    vehicles = Vehicle.objects.filter(
-                        assignment__driver=auth_user.driver, assignment__assignment_status=ACTIVE
-                    )
-                    response_data["success"] = True
-                    response_data["response_message"] = _("Success")
-                    response_data["response_data"] = VehicleSerializer(vehicles, many=True).data
-                    return JsonResponse(response_data, status=status.HTTP_200_OK)
-            except Driver.DoesNotExist:
-                pass
-
-            if vehicle_technician:
-                response_data["success"] = True
-                response_data["response_message"] = _("Success")
-                response_data["response_data"] = VehicleSerializer(managed_vehicles, many=True).data
-                return Response(response_data, status=status.HTTP_200_OK)
-
-            response_data["response_message"] = _("No vehicles to display.")
-            return Response(response_data, status=status.HTTP_200_OK)
 
-        except Driver.DoesNotExist:
-            return JsonResponse(response_data, status=status.HTTP_404_NOT_FOUND)
-
-        except Exception as error:
-            print("\n\n", error)
-            response_data["success"] = False
-            return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        page = self.paginate_queryset(queryset)
+        return Response(
+            {
+                "success": True,
+                "response_message": _("Success"),
+                "response_data": self.get_serializer(page, many=True).data,
+                "next": self.paginator.get_next_link(),
+                "previous": self.paginator.get_previous_link(),
+            },
+            status=status.HTTP_200_OK,
+        )
 
 
-class PartnershipManagementViewSet(MultipleSerializerAPIMixin, ModelViewSet):
+class PartnershipManagementViewSet(
+    EmptyListResponseMixin, QueryOptimizerMixin, MultipleSerializerAPIMixin, ModelViewSet
+):
     queryset = Partnership.objects.filter(status=Partnership.Status.ACTIVE)
     serializer_class = PartnershipCreateSerializer
     list_serializer_class = PartnershipListSerializer
-
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset:
-            return Response({"response_message": _("No partnerships registered yet.")})
-
-        return super().list(request, *args, **kwargs)
+    empty_list_message = gettext_lazy("No partnerships registered yet.")
 
     @action(detail=False, methods=["POST"], url_path="add-partnership/")
     def add_partnership(self, request, *args, **kwargs):
@@ -668,17 +654,14 @@ class PartnershipManagementViewSet(MultipleSerializerAPIMixin, ModelViewSet):
     #     return self.add_partnership(request, *args, **kwargs)
 
 
-class PartnerConfigurationViewSet(MultipleSerializerAPIMixin, ModelViewSet):
+class PartnerConfigurationViewSet(
+    EmptyListResponseMixin, QueryOptimizerMixin, MultipleSerializerAPIMixin, ModelViewSet
+):
     queryset = Partner.objects.filter(partnership__status=Partnership.Status.ACTIVE)
     serializer_class = PartnerCreateSerializer
     create_serializer_class = PartnerCreateSerializer
     list_serializer_class = PartnerListSerializer
-
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset:
-            return Response({"response_message": _("No partners registered yet.")})
-        return super().list(request, *args, **kwargs)
+    empty_list_message = gettext_lazy("No partners registered yet.")
 
     @action(detail=False, methods=["POST"], url_path="add-partner/")
     def add_partner(self, request, *args, **kwargs):
@@ -694,11 +677,15 @@ class PartnerConfigurationViewSet(MultipleSerializerAPIMixin, ModelViewSet):
         return Response({"success": False, "response_message": serializer.errors})
 
 
-class DocumentManagementViewSet(MultipleSerializerAPIMixin, ModelViewSet):
+class DocumentManagementViewSet(
+    EmptyListResponseMixin, ExpandableFieldsAPIMixin, MultipleSerializerAPIMixin, ModelViewSet
+):
     queryset = Document.objects.all()
     create_serializer_class = DocumentCreateSerializer
     serializer_class = DocumentCreateSerializer
     list_serializer_class = DocumentListSerializer
+    pagination_class = SelectablePagination
+    empty_list_message = gettext_lazy("No documents registered yet.")
     # access_required = "trying.access"
     permission_denied_message = "You do not have required access to add documents."
 
@@ -722,23 +709,17 @@ class DocumentManagementViewSet(MultipleSerializerAPIMixin, ModelViewSet):
             }
         )
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset:
-            return Response({"response_message": _("No documents registered yet.")})
-
-        return super().list(request, *args, **kwargs)
-
 
 ########################
 # VEHICLE ISSUE REPORTS
 ########################
 
 
-class IssueReportViewSet(MultipleSerializerAPIMixin, ModelViewSet):
+class IssueReportViewSet(QueryOptimizerMixin, MultipleSerializerAPIMixin, ModelViewSet):
 
     serializer_class = IssueReportSerializer
     list_serializer_class = ListIssueReportSerializer
+    pagination_class = SelectablePagination
 
     def get_queryset(self):
         # we only display reports that have been rejected (they can be reviewed)...
@@ -838,11 +819,12 @@ class IssueReportViewSet(MultipleSerializerAPIMixin, ModelViewSet):
 ########################
 
 
-class VehicleMaintenanceViewSet(MultipleSerializerAPIMixin, ModelViewSet):
+class VehicleMaintenanceViewSet(ExpandableFieldsAPIMixin, MultipleSerializerAPIMixin, ModelViewSet):
 
     queryset = VehicleMaintenance.objects.all().order_by("-created_at")
     serializer_class = VehicleMaintenanceSerializer
     list_serializer_class = ListVehicleMaintenanceSerializer
+    pagination_class = SelectablePagination
 
     def create(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -921,33 +903,78 @@ class VehicleMaintenanceViewSet(MultipleSerializerAPIMixin, ModelViewSet):
 class SystemDashboardView(APIView):
     permission_classes = [IsAdminUser]  # Changed from IsAdminUser to allow all authenticated users
 
+    def get_system_statistics(self, today):
+        # fleet-wide figures: one conditional aggregate per model, cached until one of the models changes.
+        statistics = cache.get(SYSTEM_DASHBOARD_CACHE_KEY)
+        if statistics is not None:
+            return statistics
+
+        ACTIVE = VehicleDriverAssignment.AssignmentStatus.ACTIVE
+        vehicle_counts = Vehicle.objects.aggregate(
+            total_vehicles=Count("id"),
+            vehicles_needing_service=Count("id", filter=Q(last_service_date__lt=today - timedelta(days=90))),
+            unassigned_vehicles=Count(
+                "id", filter=~Exists(VehicleDriverAssignment.objects.filter(vehicle=OuterRef("pk")))
+            ),
+            **{value: Count("id", filter=Q(vehicle_type=value)) for value in Vehicle.VehicleType.values},
+        )
+        driver_counts = Driver.objects.aggregate(
+            total_drivers=Count("id"),
+            expiring_licenses=Count("id", filter=Q(expiry_date__range=[today, today + timedelta(days=30)])),
+            active_drivers=Count(
+                "id",
+                filter=Exists(VehicleDriverAssignment.objects.filter(driver=OuterRef("pk"), assignment_status=ACTIVE)),
+            ),
+            **{value: Count("id", filter=Q(license_category=value)) for value in Driver.LicenseCategories.values},
+        )
+        user_counts = AppUser.objects.aggregate(
+            total_users=Count("id"),
+            active_users=Count("id", filter=Q(is_active=True)),
+            inactive_users=Count("id", filter=Q(is_active=False)),
+            admin_users=Count("id", filter=Q(is_superuser=True)),
+        )
+
+        statistics = {
+            "system_stats": {
+                "total_vehicles": vehicle_counts["total_vehicles"],
+                "total_drivers": driver_counts["total_drivers"],
+                "total_technicians": VehicleTechnician.objects.count(),
+                "active_assignments": VehicleDriverAssignment.objects.filter(assignment_status=ACTIVE).count(),
+            },
+            "user_stats": {**user_counts, "role_count": Role.objects.count()},
+            "vehicle_stats": {
+                "vehicle_types": [
+                    {"vehicle_type": value, "count": vehicle_counts[value]}
+                    for value in Vehicle.VehicleType.values
+                    if vehicle_counts[value]
+                ],
+                "vehicles_needing_service": vehicle_counts["vehicles_needing_service"],
+                "unassigned_vehicles": vehicle_counts["unassigned_vehicles"],
+            },
+            "driver_stats": {
+                "license_categories": [
+                    {"license_category": value, "count": driver_counts[value]}
+                    for value in Driver.LicenseCategories.values
+                    if driver_counts[value]
+                ],
+                "expiring_licenses": driver_counts["expiring_licenses"],
+                "active_drivers": driver_counts["active_drivers"],
+            },
+        }
+        cache.set(SYSTEM_DASHBOARD_CACHE_KEY, statistics, settings.DASHBOARD_CACHE_TIMEOUT)
+        return statistics
+
     def get(self, request, *args, **kwargs):
         today = timezone.now().date()
-        thirty_days_from_now = today + timedelta(days=30)
         user = request.user
 
+        system_statistics = self.get_system_statistics(today) if user.is_superuser else {}
+
         # SYSTEM STATISTICS - Only for admin
-        system_stats = {}
-        if user.is_superuser:
-            system_stats = {
-                "total_vehicles": Vehicle.objects.count(),
-                "total_drivers": Driver.objects.count(),
-                "total_technicians": VehicleTechnician.objects.count(),
-                "active_assignments": VehicleDriverAssignment.objects.filter(
-                    assignment_status=VehicleDriverAssignment.AssignmentStatus.ACTIVE
-                ).count(),
-            }
+        system_stats = system_statistics.get("system_stats", {})
 
         # USER STATISTICS - Only for admin
-        user_stats = {}
-        if user.is_superuser:
-            user_stats = {
-                "total_users": AppUser.objects.count(),
-                "active_users": AppUser.objects.filter(is_active=True).count(),
-                "inactive_users": AppUser.inactive.count(),
-                "admin_users": AppUser.objects.filter(is_superuser=True).count(),
-                "role_count": Role.objects.count(),
-            }
+        user_stats = system_statistics.get("user_stats", {})
 
         # VEHICLE STATISTICS - Customized by role
         vehicle_stats = {}
@@ -955,29 +982,25 @@ class SystemDashboardView(APIView):
             if hasattr(user, "technician"):
                 # For technician
                 technician = user.technician
+                vehicle_counts = Vehicle.objects.filter(managing_technician=technician).aggregate(
+                    assigned_vehicles=Count("id"),
+                    vehicles_needing_service=Count("id", filter=Q(last_service_date__lt=today - timedelta(days=90))),
+                )
                 vehicle_stats = {
-                    "assigned_vehicles": Vehicle.objects.filter(managing_technician=technician).count(),
+                    "assigned_vehicles": vehicle_counts["assigned_vehicles"],
                     "total_maintenances": VehicleMaintenance.objects.filter(
                         issue_reports__vehicle__managing_technician=technician
                     )
                     .distinct()
                     .count(),
-                    "vehicles_needing_service": Vehicle.objects.filter(
-                        managing_technician=technician, last_service_date__lt=today - timedelta(days=90)
-                    ).count(),
+                    "vehicles_needing_service": vehicle_counts["vehicles_needing_service"],
                     "pending_issues": IssueReport.objects.filter(
                         vehicle__managing_technician=technician, is_fixed=False
                     ).count(),
                 }
             elif user.is_superuser:
                 # For admin
-                vehicle_stats = {
-                    "vehicle_types": Vehicle.objects.values("vehicle_type").annotate(count=Count("vehicle_type")),
-                    "vehicles_needing_service": Vehicle.objects.filter(
-                        last_service_date__lt=today - timedelta(days=90)
-                    ).count(),
-                    "unassigned_vehicles": Vehicle.objects.filter(assignment__isnull=True).count(),
-                }
+                vehicle_stats = system_statistics["vehicle_stats"]
         except VehicleTechnician.DoesNotExist:
             pass
 
@@ -987,38 +1010,31 @@ class SystemDashboardView(APIView):
             if hasattr(user, "driver"):
                 # For driver
                 driver = user.driver
+                assignment_counts = VehicleDriverAssignment.objects.filter(driver=driver).aggregate(
+                    total_assignments=Count("id"),
+                    active_assignments=Count(
+                        "id", filter=Q(assignment_status=VehicleDriverAssignment.AssignmentStatus.ACTIVE)
+                    ),
+                )
                 driver_stats = {
-                    "total_assignments": VehicleDriverAssignment.objects.filter(driver=driver).count(),
-                    "active_assignments": VehicleDriverAssignment.objects.filter(
-                        driver=driver, assignment_status=VehicleDriverAssignment.AssignmentStatus.ACTIVE
-                    ).count(),
+                    **assignment_counts,
                     # "reported_issues": IssueReport.objects.filter(created_by=user).count(),
                     "license_expiry": driver.expiry_date,
                 }
             elif user.is_superuser:
                 # For admin
-                driver_stats = {
-                    "license_categories": Driver.objects.values("license_category").annotate(
-                        count=Count("license_category")
-                    ),
-                    "expiring_licenses": Driver.objects.filter(
-                        expiry_date__range=[today, thirty_days_from_now]
-                    ).count(),
-                    "active_drivers": Driver.objects.filter(
-                        assignment__assignment_status=VehicleDriverAssignment.AssignmentStatus.ACTIVE
-                    )
-                    .distinct()
-                    .count(),
-                }
+                driver_stats = system_statistics["driver_stats"]
         except Driver.DoesNotExist:
             pass
 
         # System Health - Only for admin
         system_health = {}
         if user.is_superuser:
+            celery_health = check_celery_status()
             system_health = {
                 "database_status": "Connected",
-                "celery_status": check_celery_status(),
+                "celery_status": celery_health["status"],
+                "celery_checked_at": celery_health["checked_at"],
             }
 
         return Response(
@@ -1042,15 +1058,9 @@ class SystemDashboardView(APIView):
 #         return "Disconnected"
 #
 def check_celery_status():
-    try:
-        from celery.app.control import Control
-
-        app = Control()
-        if app.ping():
-            return "Running"
-        return "Stopped"
-    except Exception:
-        return "Error"
+    # the probe runs in the background (see management.health), this only reads its last result.
+    celery_monitor.start()
+    return celery_monitor.last_result()
 
 
 class VehicleHistoryViewSet(viewsets.ViewSet):
@@ -1058,160 +1068,267 @@ class VehicleHistoryViewSet(viewsets.ViewSet):
     ViewSet for handling vehicle history with different aspects
     """
 
+    SECTIONS = (
+        "basic_info",
+        "driver_assignments",
+        "maintenance_records",
+        "fuel_consumption",
+        "documents",
+        "financial_records",
+        "technical_management",
+        "issue_reports",
+        "stats",
+    )
+
     def get_vehicle(self, pk):
         return get_object_or_404(Vehicle, pk=pk)
 
+    def get_requested_sections(self, request):
+        # None when a listed section does not exist, or when none is listed (`?sections=,`).
+        sections = request.query_params.get("sections")
+        if sections is None:
+            return self.SECTIONS
+        requested = {section.strip() for section in sections.split(",") if section.strip()}
+        if not requested or not requested.issubset(self.SECTIONS):
+            return None
+        return [section for section in self.SECTIONS if section in requested]
+
+    def get_summary(self, vehicle):
+        # running totals kept in the vehicle's cost summary
+        summary = VehicleCostSummary.objects.filter(vehicle=vehicle).first()
+        if summary is None:
+            VehicleCostSummary.objects.refresh([vehicle.id])
+            summary = VehicleCostSummary.objects.get(vehicle=vehicle)
+        return summary
+
+    def get_assignments(self, vehicle, user):
+        assignments = VehicleDriverAssignment.objects.none()
+        if hasattr(user, "driver"):
+            driver = user.driver
+            assignments = vehicle.assignments.filter(driver=driver).order_by("-begin_at")
+
+        elif user.is_superuser:
+            assignments = vehicle.assignments.all().order_by("-begin_at")
+        return assignments.select_related("driver__user")
+
+    def get_maintenances(self, vehicle):
+        return (
+            VehicleMaintenance.objects.filter(issue_reports__vehicle=vehicle)
+            .distinct()
+            .select_related("partner__partnership")
+        )
+
+    def get_consumptions(self, vehicle):
+        return vehicle.fuel_consumptions.select_related("fuel_type", "partner__partnership").order_by("-date")
+
+    def get_documents(self, vehicle):
+        return vehicle.documents.select_related("issuing_authority__partnership").order_by("-created_at")
+
+    def get_technicians(self, vehicle):
+        return vehicle.technician.select_related("user").order_by("-begin_date")
+
+    def get_issue_reports(self, vehicle):
+        return vehicle.issue_reports.select_related("vehicle").order_by("-created_at")
+
+    def assignment_data(self, assignment):
+        return {
+            "driver": assignment.driver.user.full_name,
+            "status": assignment.get_assignment_status_display(),
+            "begin_at": assignment.begin_at,
+            "ends_at": assignment.ends_at,
+        }
+
+    def maintenance_data(self, maintenance):
+        return {
+            "name": maintenance.name,
+            "status": maintenance.get_status_display(),
+            "begin_date": maintenance.maintenance_begin_date,
+            "end_date": maintenance.maintenance_end_date,
+            "payment_amount": maintenance.payment_amount,
+            "payment_method": maintenance.get_payment_method_display(),
+            "partner": maintenance.partner.partnership.name if maintenance.partner else None,
+        }
+
+    def consumption_data(self, consumption):
+        return {
+            "date": consumption.date,
+            "fuel_type": consumption.fuel_type.fuel_type,
+            "quantity": str(consumption.quantity),
+            "quantity_type": consumption.get_quantity_type_display(),
+            "fuel_cost": consumption.fuel_cost,
+            "payment_method": consumption.get_payment_method_display(),
+            "partner": consumption.partner.partnership.name,
+        }
+
+    def document_data(self, document):
+        return {
+            "name": document.name,
+            "type": document.get_document_type_display(),
+            "category": document.get_document_category_display(),
+            "is_renewable": document.is_renewable,
+            "begin_date": document.exp_begin_date,
+            "end_date": document.exp_end_date,
+            "issuing_authority": (document.issuing_authority.partnership.name if document.issuing_authority else None),
+        }
+
+    def technician_data(self, technician):
+        return {
+            "technician": technician.user.full_name,
+            "begin_date": technician.begin_date,
+            "end_date": technician.end_date,
+        }
+
+    def paginated_section(self, request, queryset, to_data, ordering):
+        paginator = HistoryCursorPagination()
+        paginator.ordering = ordering
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response([to_data(item) for item in page])
+
     @action(detail=True, methods=["get"], url_path="all-info/")
     def all_info(self, request, pk=None):
         """
-        vehicle history information
+        vehicle history information, limited to the blocks listed in `?sections=` (all of them by default)
         """
         vehicle = self.get_vehicle(pk)
         user = request.user
+        sections = self.get_requested_sections(request)
+        if sections is None:
+            return Response(
+                {
+                    "success": False,
+                    "response_message": _("Unknown or missing history section."),
+                    "response_data": {"sections": self.SECTIONS},
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        overall_data = {}
 
         # Basic Info
         # basic_info = ListVehicleSerializer(vehicle, context={"request": request}).data
 
-        basic_info = {
-            "id": vehicle.id,
-            "make": vehicle.make,
-            "model": vehicle.model,
-            "year": vehicle.year,
-            "vehicle_type": vehicle.get_vehicle_type_display(),
-            "vin_number": vehicle.vin_number,
-            "color": vehicle.color,
-            "mileage": vehicle.mileage,
-            "license_plate_number": vehicle.license_plate_number,
-            "purchase_date": vehicle.purchase_date,
-            "last_service_date": vehicle.last_service_date,
-        }
+        if "basic_info" in sections:
+            overall_data["basic_info"] = {
+                "id": vehicle.id,
+                "make": vehicle.make,
+                "model": vehicle.model,
+                "year": vehicle.year,
+                "vehicle_type": vehicle.get_vehicle_type_display(),
+                "vin_number": vehicle.vin_number,
+                "color": vehicle.color,
+                "mileage": vehicle.mileage,
+                "license_plate_number": vehicle.license_plate_number,
+                "purchase_date": vehicle.purchase_date,
+                "last_service_date": vehicle.last_service_date,
+            }
 
         # Driver Assignments
-        assignments = VehicleDriverAssignment.objects.none()
-        if hasattr(user, "driver"):
-            driver = user.driver
-            assignments = vehicle.assignments.filter(driver=driver).order_by("-begin_at")
-
-        elif user.is_superuser:
-            assignments = vehicle.assignments.all().order_by("-begin_at")
-
-        driver_assignments = [
-            {
-                "driver": assignment.driver.user.full_name,
-                "status": assignment.get_assignment_status_display(),
-                "begin_at": assignment.begin_at,
-                "ends_at": assignment.ends_at,
-            }
-            for assignment in assignments
-        ]
+        if "driver_assignments" in sections:
+            overall_data["driver_assignments"] = [
+                self.assignment_data(assignment) for assignment in self.get_assignments(vehicle, user)
+            ]
 
         # Maintenance Records
-        maintenances = VehicleMaintenance.objects.filter(issue_reports__vehicle=vehicle).distinct()
-        maintenance_records = [
-            {
-                "name": maintenance.name,
-                "status": maintenance.get_status_display(),
-                "begin_date": maintenance.maintenance_begin_date,
-                "end_date": maintenance.maintenance_end_date,
-                "payment_amount": maintenance.payment_amount,
-                "payment_method": maintenance.get_payment_method_display(),
-                "partner": maintenance.partner.partnership.name if maintenance.partner else None,
-            }
-            for maintenance in maintenances
-        ]
+        if "maintenance_records" in sections:
+            overall_data["maintenance_records"] = [
+                self.maintenance_data(maintenance) for maintenance in self.get_maintenances(vehicle)
+            ]
 
         # Fuel Consumption
-        consumptions = vehicle.fuel_consumptions.all().order_by("-date")
-        fuel_consumption = [
-            {
-                "date": consumption.date,
-                "fuel_type": consumption.fuel_type.fuel_type,
-                "quantity": str(consumption.quantity),
-                "quantity_type": consumption.get_quantity_type_display(),
-                "fuel_cost": consumption.fuel_cost,
-                "payment_method": consumption.get_payment_method_display(),
-                "partner": consumption.partner.partnership.name,
-            }
-            for consumption in consumptions
-        ]
+        if "fuel_consumption" in sections:
+            overall_data["fuel_consumption"] = [
+                self.consumption_data(consumption) for consumption in self.get_consumptions(vehicle)
+            ]
 
         # Documents
-        documents = vehicle.documents.all().order_by("-created_at")
-        document_records = [
-            {
-                "name": document.name,
-                "type": document.get_document_type_display(),
-                "category": document.get_document_category_display(),
-                "is_renewable": document.is_renewable,
-                "begin_date": document.exp_begin_date,
-                "end_date": document.exp_end_date,
-                "issuing_authority": (
-                    document.issuing_authority.partnership.name if document.issuing_authority else None
-                ),
-            }
-            for document in documents
-        ]
+        if "documents" in sections:
+            overall_data["documents"] = [self.document_data(document) for document in self.get_documents(vehicle)]
 
         # Financial Records
-        maintenance_costs = VehicleMaintenance.objects.filter(issue_reports__vehicle=vehicle).aggregate(
-            total=Sum("payment_amount")
-        )
-        fuel_costs = vehicle.fuel_consumptions.aggregate(total=Sum("fuel_cost"))
-        document_costs = DocumentCost.objects.filter(document__issued_vehicle=vehicle).aggregate(
-            total=Sum("payment_amount")
-        )
-        financial_records = {
-            "maintenance_total": maintenance_costs["total"] or 0,
-            "fuel_total": fuel_costs["total"] or 0,
-            "document_total": document_costs["total"] or 0,
-            "total_cost": (maintenance_costs["total"] or 0)
-            + (fuel_costs["total"] or 0)
-            + (document_costs["total"] or 0),
-        }
+        if "financial_records" in sections or "stats" in sections:
+            summary = self.get_summary(vehicle)
+
+        if "financial_records" in sections:
+            overall_data["financial_records"] = {
+                "maintenance_total": summary.maintenance_total,
+                "fuel_total": summary.fuel_total,
+                "document_total": summary.document_total,
+                "total_cost": summary.total_cost,
+            }
 
         # Technicians
-        technicians = vehicle.technician.all().order_by("-begin_date")
-        technical_management = [
-            {
-                "technician": technician.user.full_name,
-                "begin_date": technician.begin_date,
-                "end_date": technician.end_date,
-            }
-            for technician in technicians
-        ]
+        if "technical_management" in sections:
+            overall_data["technical_management"] = [
+                self.technician_data(technician) for technician in self.get_technicians(vehicle)
+            ]
 
         # Issue Reports
-        issue_reports = vehicle.issue_reports.all().order_by("-created_at")
-        issue_report_data = ListIssueReportSerializer(issue_reports, many=True, context={"request": request}).data
+        if "issue_reports" in sections:
+            overall_data["issue_reports"] = ListIssueReportSerializer(
+                self.get_issue_reports(vehicle), many=True, context={"request": request}
+            ).data
 
         # Stats
-        stats = {
-            "total_drivers": vehicle.assignments.count(),
-            "active_drivers": vehicle.assignments.filter(
-                assignment_status=VehicleDriverAssignment.AssignmentStatus.ACTIVE
-            ).count(),
-            "reported_issues": vehicle.issue_reports.count(),
-            "total_maintenances": VehicleMaintenance.objects.filter(issue_reports__vehicle=vehicle).distinct().count(),
-            "total_fuel_records": vehicle.fuel_consumptions.count(),
-            "total_documents": vehicle.documents.count(),
-            "last_maintenance_date": vehicle.last_service_date,
-            "current_mileage": vehicle.mileage,
-        }
-
-        overall_data = {
-            "basic_info": basic_info,
-            "driver_assignments": driver_assignments,
-            "maintenance_records": maintenance_records,
-            "fuel_consumption": fuel_consumption,
-            "documents": document_records,
-            "financial_records": financial_records,
-            "technical_management": technical_management,
-            "issue_reports": issue_report_data,
-            "stats": stats,
-        }
+        if "stats" in sections:
+            overall_data["stats"] = {
+                "total_drivers": summary.total_drivers,
+                "active_drivers": summary.active_drivers,
+                "reported_issues": summary.reported_issues,
+                "total_maintenances": summary.total_maintenances,
+                "total_fuel_records": summary.total_fuel_records,
+                "total_documents": summary.total_documents,
+                "last_maintenance_date": vehicle.last_service_date,
+                "current_mileage": vehicle.mileage,
+            }
 
         return Response(overall_data)
 
+    ######################################
+    # PAGINATED SECTIONS (?cursor=)
+    ######################################
+
+    @action(detail=True, methods=["get"], url_path="assignments/")
+    def assignments(self, request, pk=None):
+        vehicle = self.get_vehicle(pk)
+        return self.paginated_section(
+            request, self.get_assignments(vehicle, request.user), self.assignment_data, ("-begin_at", "-id")
+        )
+
+    @action(detail=True, methods=["get"], url_path="maintenances/")
+    def maintenances(self, request, pk=None):
+        vehicle = self.get_vehicle(pk)
+        return self.paginated_section(
+            request, self.get_maintenances(vehicle), self.maintenance_data, ("-created_at", "-id")
+        )
+
+    @action(detail=True, methods=["get"], url_path="fuel/")
+    def fuel(self, request, pk=None):
+        # the consumption date may be empty, the cursor needs a non-null key.
+        vehicle = self.get_vehicle(pk)
+        return self.paginated_section(
+            request, self.get_consumptions(vehicle), self.consumption_data, ("-created_at", "-id")
+        )
+
+    @action(detail=True, methods=["get"], url_path="documents/")
+    def documents(self, request, pk=None):
+        vehicle = self.get_vehicle(pk)
+        return self.paginated_section(request, self.get_documents(vehicle), self.document_data, ("-created_at", "-id"))
+
+    @action(detail=True, methods=["get"], url_path="technicians/")
+    def technicians(self, request, pk=None):
+        vehicle = self.get_vehicle(pk)
+        return self.paginated_section(
+            request, self.get_technicians(vehicle), self.technician_data, ("-begin_date", "-id")
+        )
+
+    @action(detail=True, methods=["get"], url_path="issue-reports/")
+    def issue_reports(self, request, pk=None):
+        vehicle = self.get_vehicle(pk)
+
+        def to_data(issue_report):
+            return ListIssueReportSerializer(issue_report, context={"request": request}).data
+
+        return self.paginated_section(request, self.get_issue_reports(vehicle), to_data, ("-created_at", "-id"))
+
 
 class DriverDashboardView(APIView):
     permission_classes = [IsAuthenticated]
@@ -1303,30 +1420,73 @@ class TechnicianDashboardView(APIView):
 
 
 class FinancialControllerDashboardView(APIView):
+    """
+    Expenses answered from the expense rollups, over `?from=`/`?to=` (YYYY-MM-DD, unbounded by default)
+    and bucketed per `?granularity=day|month` (month by default; month buckets cover whole months).
+    The rollups sum the ledger (`FinancialRecord.cost`): the fuel total is the `payment_amount` of the
+    consumptions, no longer their `fuel_cost`, and the maintenance total only counts finished maintenances.
+    The amounts are whole numbers, like the payments they sum.
+    """
+
     permission_classes = [IsAuthenticated]
 
+    def get_expense_rollups(self, request):
+        granularity = request.query_params.get("granularity", ExpenseRollup.Granularity.MONTH)
+        if granularity not in ExpenseRollup.Granularity.values:
+            raise ValueError(f"Invalid granularity: {granularity}")
+
+        date_from, date_to = (
+            date.fromisoformat(request.query_params[param]) if request.query_params.get(param) else None
+            for param in ("from", "to")
+        )
+        rollups = ExpenseRollup.objects.filter(granularity=granularity)
+        if date_from:
+            if granularity == ExpenseRollup.Granularity.MONTH:
+                date_from = date_from.replace(day=1)
+            rollups = rollups.filter(period__gte=date_from)
+        if date_to:
+            rollups = rollups.filter(period__lte=date_to)
+        return granularity, rollups
+
     def get(self, request):
         try:
-            today = timezone.now().date()
+            granularity, rollups = self.get_expense_rollups(request)
+            by_type = {
+                expense_type: Coalesce(
+                    Sum("total", filter=Q(expense_type=expense_type)), 0, output_field=DecimalField()
+                )
+                for expense_type in ExpenseRollup.ExpenseType.values
+            }
+            by_method = {
+                payment_method: Coalesce(
+                    Sum("total", filter=Q(payment_method=payment_method)), 0, output_field=DecimalField()
+                )
+                for payment_method in PaymentMixin.PaymentMethods.values
+            }
+            totals = rollups.aggregate(
+                **{f"type_{key}": value for key, value in by_type.items()},
+                **{f"method_{key}": value for key, value in by_method.items()},
+            )
+            # the rollup totals are decimals, the payments they sum integers.
+            totals = {key: int(value) for key, value in totals.items()}
 
             # Maintenance costs
+            maintenance_counts = VehicleMaintenance.objects.aggregate(
+                pending_maintenances=Count("id", filter=Q(status=VehicleMaintenance.Status.PENDING)),
+                active_maintenances=Count(
+                    "id",
+                    filter=Q(status=VehicleMaintenance.Status.APPROVED, maintenance_end_date__isnull=True),
+                ),
+            )
             maintenance_stats = {
-                "pending_maintenances": VehicleMaintenance.objects.filter(
-                    status=VehicleMaintenance.Status.PENDING
-                ).count(),
-                "active_maintenances": VehicleMaintenance.objects.filter(
-                    status=VehicleMaintenance.Status.APPROVED, maintenance_end_date__isnull=True
-                ).count(),
-                "total_maintenance_cost": VehicleMaintenance.objects.filter(
-                    status=VehicleMaintenance.Status.APPROVED
-                ).aggregate(total=Sum("payment_amount"))["total"]
-                or 0,
+                **maintenance_counts,
+                "total_maintenance_cost": totals[f"type_{ExpenseRollup.ExpenseType.MAINTENANCE}"],
             }
 
             # Vehicle costs
             vehicle_costs = {
-                "total_fuel_cost": FuelConsumption.objects.aggregate(total=Sum("fuel_cost"))["total"] or 0,
-                "total_document_cost": DocumentCost.objects.aggregate(total=Sum("payment_amount"))["total"] or 0,
+                "total_fuel_cost": totals[f"type_{ExpenseRollup.ExpenseType.FUEL}"],
+                "total_document_cost": totals[f"type_{ExpenseRollup.ExpenseType.DOCUMENT}"],
             }
 
             # Financial overview
@@ -1339,15 +1499,138 @@ class FinancialControllerDashboardView(APIView):
                     "fuel": vehicle_costs["total_fuel_cost"],
                     "documents": vehicle_costs["total_document_cost"],
                 },
+                "payment_methods": {
+                    str(label).lower(): totals[f"method_{payment_method}"]
+                    for payment_method, label in PaymentMixin.PaymentMethods.choices
+                },
             }
 
+            # Expenses per bucket
+            timeline = [
+                {
+                    "period": row["period"],
+                    "total": int(row["period_total"]),
+                    "maintenance": int(row[ExpenseRollup.ExpenseType.MAINTENANCE]),
+                    "fuel": int(row[ExpenseRollup.ExpenseType.FUEL]),
+                    "documents": int(row[ExpenseRollup.ExpenseType.DOCUMENT]),
+                }
+                for row in rollups.values("period").annotate(period_total=Sum("total"), **by_type).order_by("period")
+            ]
+
             return Response(
                 {
                     "maintenance_stats": maintenance_stats,
                     "vehicle_costs": vehicle_costs,
                     "financial_overview": financial_overview,
+                    "granularity": granularity,
+                    "timeline": timeline,
                 }
             )
 
         except Exception as e:
             return Response({"error": str(e)}, status=400)
+
+
+class ExportView(AccessMixin, APIView):
+    """
+    Streams financial records, fuel consumptions, document costs or maintenances as CSV or NDJSON.
+    Filters: `?vehicle=`, `?from=` and `?to=` (YYYY-MM-DD), `?output=csv|ndjson`.
+    The exports hold the costs of the whole fleet: they are reserved to the financial role (and the superusers).
+    """
+
+    permission_classes = [IsAuthenticated]
+    access_required = "authentication.Financial"
+    permission_denied_message = "You do not have the financial access required to export."
+    content_types = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+    def get_date(self, request, param):
+        value = request.query_params.get(param)
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValueError(value)
+        return parsed
+
+    def get(self, request, resource):
+        export = EXPORTS.get(resource)
+        if export is None:
+            return Response(
+                {"success": False, "response_message": _("This export does not exist.")},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        output = request.query_params.get("output", "csv")
+        if output not in self.content_types:
+            return Response(
+                {"success": False, "response_message": _("The output must be csv or ndjson.")},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            vehicle_id = request.query_params.get("vehicle")
+            vehicle_id = int(vehicle_id) if vehicle_id else None
+            date_from, date_to = (self.get_date(request, param) for param in ("from", "to"))
+        except ValueError:
+            return Response(
+                {"success": False, "response_message": _("Invalid vehicle or date filter.")},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = export.get_queryset(vehicle_id, date_from, date_to)
+        stream = export.stream_csv(queryset) if output == "csv" else export.stream_ndjson(queryset)
+        response = StreamingHttpResponse(stream, content_type=self.content_types[output])
+        response["Content-Disposition"] = f'attachment; filename="{resource}.{output}"'
+        return response
+
+
+class ImportView(APIView):
+    """
+    Bulk import of fuel consumptions or document costs: a CSV or NDJSON `file`, the format being given by
+    `file_format` or by the extension of the file. See `vehicleBudget.importers` for the columns.
+    Rows carrying an `external_reference` are upserted, so a failed import can be sent again as is.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, resource):
+        importer_class = IMPORTERS.get(resource)
+        if importer_class is None:
+            return Response(
+                {"success": False, "response_message": _("This import does not exist.")},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"success": False, "response_message": _("A file is required.")},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        file_format = request.data.get("file_format") or os.path.splitext(upload.name)[1].lstrip(".").lower()
+        if file_format not in importer_class.formats:
+            return Response(
+                {"success": False, "response_message": _("The file must be csv or ndjson.")},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        report = importer_class().run(io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline=""), file_format)
+        if report["error"]:
+            return Response(
+                {"success": False, "response_message": _("The file could not be read."), "response_data": report},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if report["rows"] and not report["imported"]:
+            return Response(
+                {"success": False, "response_message": _("No valid row to import."), "response_data": report},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            {
+                "success": True,
+                "response_message": _(f"{report['imported']} rows imported."),
+                "response_data": report,
+            },
+            status=status.HTTP_201_CREATED,
+        )
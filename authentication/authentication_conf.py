@@ -1,6 +1,15 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.functional import cached_property
 from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+
+from authentication.models import get_token_version
 
 
 class AuthenticationView(JWTAuthentication):
@@ -9,3 +18,59 @@ class AuthenticationView(JWTAuthentication):
             return super().authenticate(request)
         except InvalidToken as e:
             raise AuthenticationFailed("Your session is expired. Enter your credentials first.") from e
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if validated_token.get("token_version", 0) != user.token_version:
+            raise AuthenticationFailed("Your session has been revoked. Enter your credentials first.")
+        return user
+
+
+class ClaimsUser(TokenUser):
+    """
+    Lightweight user built from the role claims of the token.
+    Anything the claims do not carry is read from the `AppUser` row, loaded on first use.
+    """
+
+    @cached_property
+    def _app_user(self):
+        return get_user_model().objects.get(pk=self.id)
+
+    def get_role_names(self):
+        valid_until = self.token.get("roles_valid_until")
+        if valid_until and date.fromisoformat(valid_until) >= timezone.now().date():
+            return frozenset(self.token["roles"])
+        return self._app_user.get_role_names()
+
+    def has_access(self, role_name):
+        if self.is_superuser:
+            return True
+        return role_name in self.get_role_names()
+
+    def __getattr__(self, attr):
+        if attr.startswith("_") or attr == "token":
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self._app_user, attr)
+
+
+class StatelessAuthenticationView(AuthenticationView):
+    """
+    Trusts the role claims written by `TokenSerializer` when JWT_ROLE_CLAIMS is enabled: read-only requests
+    get a `ClaimsUser`, only the token version of the user being read. Write requests, and tokens issued
+    without the role claims, still go through the regular database lookup.
+    """
+
+    def authenticate(self, request):
+        self.request_method = request.method
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if self.request_method not in SAFE_METHODS or "roles" not in validated_token:
+            return super().get_user(validated_token)
+
+        user = ClaimsUser(validated_token)
+        if validated_token.get("token_version", 0) != get_token_version(user.id):
+            raise AuthenticationFailed("Your session has been revoked. Enter your credentials first.")
+        return user
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_access_cache(app_configs, **kwargs):
+    """
+    The role names resolved by `AppUser.has_access` are cached, and dropped from the cache when a role changes.
+    A cache held by each process only drops them in the process that made the change: the others keep
+    authorizing with the previous roles until ACCESS_CACHE_TIMEOUT.
+    """
+    if settings.DEBUG or not settings.ACCESS_CACHE_TIMEOUT or not isinstance(caches["default"], LocMemCache):
+        return []
+    return [
+        Warning(
+            "The role names are cached in a per-process cache: a role change is only seen by the other "
+            "processes after ACCESS_CACHE_TIMEOUT.",
+            hint="Configure a cache shared by the processes in CACHES (e.g. "
+            "django.core.cache.backends.redis.RedisCache), or set ACCESS_CACHE_TIMEOUT to 0.",
+            id="authentication.W001",
+        )
+    ]
@@ -0,0 +1,43 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.serializers import TokenSerializer
+
+
+class Command(BaseCommand):
+    help = "Simulate a burst of logins through the login serializer and report the throughput (logins per second)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", required=True, help="email of an existing active user")
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--logins", type=int, default=100, help="number of logins in the burst")
+
+    def handle(self, *args, **options):
+        credentials = {"email": options["email"], "password": options["password"]}
+
+        serializer = TokenSerializer(data=credentials)
+        if not serializer.is_valid():
+            raise CommandError(f"Login failed: {serializer.errors}")
+
+        durations = []
+        queries = []
+        started_at = time.perf_counter()
+        for _ in range(options["logins"]):
+            with CaptureQueriesContext(connection) as context:
+                login_started_at = time.perf_counter()
+                TokenSerializer(data=credentials).is_valid(raise_exception=True)
+                durations.append(time.perf_counter() - login_started_at)
+            queries.append(len(context))
+        elapsed = time.perf_counter() - started_at
+
+        durations.sort()
+        p95 = durations[max(int(len(durations) * 0.95) - 1, 0)]
+        self.stdout.write(f"logins: {len(durations)} in {elapsed:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"throughput: {len(durations) / elapsed:.1f} logins/s"))
+        self.stdout.write(f"latency: avg {statistics.mean(durations) * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms")
+        self.stdout.write(f"queries per login: {statistics.mean(queries):.1f}")
+        self.stdout.write("note: the figures include the password hashing configured in PASSWORD_HASHERS.")
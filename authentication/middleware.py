@@ -1,3 +1,18 @@
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
 class BearerTokenMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -9,3 +24,97 @@ class BearerTokenMiddleware:
 
         response = self.get_response(request)
         return response
+
+
+def fingerprint(sql):
+    """
+    The statement with its literals and the length of its IN lists blanked out, so that the same query
+    run with other parameters gets the same fingerprint.
+    """
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    sql = re.sub(r"\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)", "IN (...)", sql)
+    return sql
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started_at))
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Records the SQL queries of a share (QUERY_INSTRUMENTATION_SAMPLE_RATE) of the requests through
+    `connection.execute_wrapper`: their count, the database time, the slowest statements and the statements
+    run several times (same fingerprint). The figures are logged as JSON, and sent in a `Server-Timing` header
+    to the staff only (to everyone with DEBUG): they would tell the other clients about the data behind a request.
+    Queries run while a streaming response is consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.QUERY_INSTRUMENTATION_SAMPLE_RATE:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started_at = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started_at
+
+        report = self.get_report(request, response, recorder.queries, duration)
+        if self.sends_server_timing(request):
+            response["Server-Timing"] = self.get_server_timing(report)
+        logger.info(json.dumps(report), extra={"instrumentation": report})
+        return response
+
+    def sends_server_timing(self, request):
+        # the user authenticated by the API view is set on the request as well.
+        user = getattr(request, "user", None)
+        return settings.DEBUG or bool(user is not None and user.is_staff)
+
+    def get_report(self, request, response, queries, duration):
+        fingerprints = Counter()
+        samples = {}
+        for sql, _ in queries:
+            key = hashlib.sha1(fingerprint(sql).encode()).hexdigest()[:12]
+            fingerprints[key] += 1
+            samples.setdefault(key, sql)
+
+        slowest = sorted(queries, key=lambda query: query[1], reverse=True)[: settings.QUERY_INSTRUMENTATION_SLOWEST]
+        return {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 2),
+            "queries": len(queries),
+            "db_ms": round(sum(query_duration for _, query_duration in queries) * 1000, 2),
+            "slowest": [{"sql": sql[:500], "ms": round(query_duration * 1000, 2)} for sql, query_duration in slowest],
+            "duplicates": [
+                {"fingerprint": key, "count": count, "sql": samples[key][:500]}
+                for key, count in fingerprints.most_common()
+                if count > 1
+            ],
+        }
+
+    def get_server_timing(self, report):
+        duplicated = sum(duplicate["count"] - 1 for duplicate in report["duplicates"])
+        metrics = [
+            f'db;dur={report["db_ms"]};desc="{report["queries"]} queries"',
+            f'db-duplicates;desc="{duplicated} duplicated queries"',
+            f"app;dur={round(report['duration_ms'] - report['db_ms'], 2)}",
+        ]
+        if report["slowest"]:
+            metrics.append(f"db-slowest;dur={report['slowest'][0]['ms']}")
+        return ", ".join(metrics)
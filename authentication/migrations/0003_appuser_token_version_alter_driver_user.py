@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="appuser",
+            name="token_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name="driver",
+            name="user",
+            field=models.OneToOneField(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="driver",
+                related_query_name="drivers",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
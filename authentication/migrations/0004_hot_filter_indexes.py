@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0003_appuser_token_version_alter_driver_user"),
+        ("vehicleHub", "0002_issuereport_is_fixed_issuereport_issue_cost_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="accessrole",
+            index=models.Index(fields=["user", "start_date", "end_date"], name="access_role_user_period_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="driver",
+            index=models.Index(fields=["expiry_date"], name="driver_expiry_date_idx"),
+        ),
+    ]
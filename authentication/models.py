@@ -1,13 +1,31 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractBaseUser, AbstractUser, PermissionsMixin
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
 from authentication.managers import AppUserManager, DeactivatedUserManager
 
 
+def access_cache_key(user_id, day=None):
+    day = day or timezone.now().date()
+    return f"authentication:access:{user_id}:{day.isoformat()}"
+
+
+def get_token_version(user_id):
+    # read from the database: a revocation must be seen at once by every process, whatever the cache.
+    return AppUser.objects.filter(pk=user_id).values_list("token_version", flat=True).first() or 0
+
+
+def revoke_tokens(user_ids):
+    """invalidate every token issued so far to the given users (see the `token_version` claim)."""
+    AppUser.objects.filter(pk__in=list(user_ids)).update(token_version=models.F("token_version") + 1)
+
+
 class AppUser(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True)
     is_staff = models.BooleanField(default=False)
@@ -15,6 +33,7 @@ class AppUser(AbstractBaseUser, PermissionsMixin):
     last_name = models.CharField(max_length=100, verbose_name=_("last name"), null=True, blank=True)
     is_active = models.BooleanField(default=True)
     employeeID = models.CharField(unique=True, null=True, blank=True, max_length=50)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
 
     objects = AppUserManager()
     inactive = DeactivatedUserManager()
@@ -39,14 +58,44 @@ class AppUser(AbstractBaseUser, PermissionsMixin):
     def get_access_list(self):
         return self.access_roles.filter(start_date__lte=timezone.now(), end_date__gte=timezone.now())
 
+    @staticmethod
+    def active_access_filter():
+        today = timezone.now().date()
+        return models.Q(start_date__lte=today, end_date__gte=today, role__is_active=True)
+
+    def get_active_access_roles(self):
+        return self.access_roles.filter(self.active_access_filter())
+
+    def load_active_access_roles(self):
+        # the active roles (latest first) with their Role, fetched in one query and kept on the instance.
+        if not hasattr(self, "active_access_roles"):
+            queryset = (
+                AccessRole.objects.filter(self.active_access_filter()).select_related("role").order_by("-start_date")
+            )
+            prefetch_related_objects(
+                [self], models.Prefetch("access_roles", queryset=queryset, to_attr="active_access_roles")
+            )
+        return self.active_access_roles
+
+    def get_role_names(self):
+        # resolved once per user instance (i.e. per request) and cached across requests until a role changes.
+        if not hasattr(self, "_role_names"):
+            key = access_cache_key(self.pk)
+            role_names = cache.get(key)
+            if role_names is None:
+                role_names = frozenset(self.get_active_access_roles().values_list("role__role_name", flat=True))
+                cache.set(key, role_names, settings.ACCESS_CACHE_TIMEOUT)
+            self._role_names = role_names
+        return self._role_names
+
     def has_access(self, role_name):
         if self.is_superuser:
             return True
-        access_list = self.get_access_list()
-        for access in access_list:
-            if role_name == access.role.role_name:
-                return True
-        return False
+        return role_name in self.get_role_names()
+
+    def revoke_tokens(self):
+        revoke_tokens([self.pk])
+        self.refresh_from_db(fields=["token_version"])
 
 
 class Driver(models.Model):
@@ -91,6 +140,7 @@ class Driver(models.Model):
     class Meta:
         ordering = ["license_category", "-expiry_date"]
         unique_together = ["user", "driving_license_number"]
+        indexes = [models.Index(fields=["expiry_date"], name="driver_expiry_date_idx")]
 
     def __str__(self):
         return f"{self.user.full_name} :: {self.driving_license_number} :: {self.license_category}"
@@ -138,5 +188,8 @@ class AccessRole(models.Model):
     end_date = models.DateField()
     previous_end_date = models.DateField(null=True, blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["user", "start_date", "end_date"], name="access_role_user_period_idx")]
+
     def __str__(self):
         return f"{self.user.full_name} :: {self.role}"
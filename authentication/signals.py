@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from authentication.models import AccessRole, AppUser, Role, access_cache_key, revoke_tokens
+
+
+def invalidate_access_cache(sender, instance, **kwargs):
+    if sender is AccessRole:
+        user_ids = {instance.user_id}
+    else:
+        user_ids = set(AccessRole.objects.filter(role=instance).values_list("user_id", flat=True))
+
+    if user_ids:
+        cache.delete_many([access_cache_key(user_id) for user_id in user_ids])
+        if settings.JWT_ROLE_CLAIMS:
+            # the role claims of the tokens already issued are outdated.
+            revoke_tokens(user_ids)
+
+
+def revoke_deactivated_user_tokens(sender, instance, created, **kwargs):
+    if settings.JWT_ROLE_CLAIMS and not created and not instance.is_active:
+        revoke_tokens([instance.pk])
+
+
+post_save.connect(revoke_deactivated_user_tokens, sender=AppUser)
+post_save.connect(invalidate_access_cache, sender=AccessRole)
+post_delete.connect(invalidate_access_cache, sender=AccessRole)
+post_save.connect(invalidate_access_cache, sender=Role)
+post_delete.connect(invalidate_access_cache, sender=Role)
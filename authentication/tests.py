@@ -1,3 +1,148 @@
-from django.test import TestCase
+import json
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.serializers import TokenSerializer
+from authentication.authentication_conf import StatelessAuthenticationView
+from authentication.checks import check_access_cache
+from authentication.middleware import QueryInstrumentationMiddleware, fingerprint
+from authentication.models import AccessRole, AppUser, Role
+
+
+class AccessCacheCheckTests(SimpleTestCase):
+    @override_settings(DEBUG=False, CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_per_process_cache(self):
+        self.assertEqual([message.id for message in check_access_cache(None)], ["authentication.W001"])
+        with override_settings(ACCESS_CACHE_TIMEOUT=0):
+            self.assertEqual(check_access_cache(None), [])
+
+    @override_settings(DEBUG=False, CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+    def test_no_cache(self):
+        self.assertEqual(check_access_cache(None), [])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class AccessCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = AppUser.objects.create_user(email="financial@example.com", password=None)
+        self.role = Role.objects.create(role_name="Financial", role_group=Role.RoleGroup.FINANCIAL)
+        self.access = AccessRole.objects.create(
+            user=self.user, role=self.role, start_date=date(2024, 1, 1), end_date=date(2030, 1, 1)
+        )
+
+    def test_cached_across_requests(self):
+        # a fresh instance per request: only the shared cache spares the query of the second one.
+        user = AppUser.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.get_role_names(), {"Financial"})
+            self.assertTrue(user.has_access("Financial"))
+
+        user = AppUser.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_access("Financial"))
+            self.assertFalse(user.has_access("Technician"))
+
+    def test_invalidated_by_a_role_change(self):
+        self.assertTrue(AppUser.objects.get(pk=self.user.pk).has_access("Financial"))
+        technician = Role.objects.create(role_name="Technician", role_group=Role.RoleGroup.TECHNICIAN)
+        AccessRole.objects.create(
+            user=self.user, role=technician, start_date=date(2024, 1, 1), end_date=date(2030, 1, 1)
+        )
+        self.assertEqual(AppUser.objects.get(pk=self.user.pk).get_role_names(), {"Financial", "Technician"})
+
+        self.role.is_active = False
+        self.role.save()
+        self.assertEqual(AppUser.objects.get(pk=self.user.pk).get_role_names(), {"Technician"})
+
+    def test_invalidated_by_a_revocation(self):
+        self.assertTrue(AppUser.objects.get(pk=self.user.pk).has_access("Financial"))
+        self.access.end_date = date(2024, 1, 31)
+        self.access.save()
+        self.assertFalse(AppUser.objects.get(pk=self.user.pk).has_access("Financial"))
+
+        self.access.end_date = date(2030, 1, 1)
+        self.access.save()
+        self.assertTrue(AppUser.objects.get(pk=self.user.pk).has_access("Financial"))
+        self.access.delete()
+        self.assertFalse(AppUser.objects.get(pk=self.user.pk).has_access("Financial"))
+
+
+@override_settings(JWT_ROLE_CLAIMS=True)
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        self.user = AppUser.objects.create_user(email="driver@example.com", password=None)
+        token = TokenSerializer.get_token(self.user).access_token
+        self.request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_revoked_token_rejected(self):
+        authentication = StatelessAuthenticationView()
+        user, _ = authentication.authenticate(self.request)
+        self.assertEqual(user.id, self.user.id)
+
+        # revoked by another process: nothing is dropped from the cache of this one.
+        AppUser.objects.filter(pk=self.user.pk).update(token_version=F("token_version") + 1)
+        with self.assertRaises(AuthenticationFailed):
+            authentication.authenticate(self.request)
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_literals_blanked_out(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t1 WHERE a = 'it''s' AND b > 12.5 AND c IN (1, 2, 3)"),
+            "SELECT * FROM t1 WHERE a = ? AND b > ? AND c IN (...)",
+        )
+
+    def test_in_lists_of_any_length(self):
+        self.assertEqual(fingerprint("WHERE id IN (%s)"), fingerprint("WHERE id IN (%s, %s, %s)"))
+
+
+@override_settings(DEBUG=False, QUERY_INSTRUMENTATION_SAMPLE_RATE=1)
+class QueryInstrumentationMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = AppUser.objects.create_user(email="driver@example.com", password=None)
+        self.staff = AppUser.objects.create_superuser(email="admin@example.com", password=None)
+
+    def get_response(self, request):
+        AppUser.objects.filter(pk=1).exists()
+        AppUser.objects.filter(pk=2).exists()
+        return HttpResponse()
+
+    def call_middleware(self, user):
+        request = RequestFactory().get("/api/vehicle")
+        request.user = user
+        return QueryInstrumentationMiddleware(self.get_response)(request)
+
+    def test_logged_and_sent_to_the_staff(self):
+        with self.assertLogs("authentication.middleware", "INFO") as logs:
+            response = self.call_middleware(self.staff)
+        report = json.loads(logs.records[0].getMessage())
+        self.assertEqual((report["path"], report["queries"]), ("/api/vehicle", 2))
+        self.assertEqual(report["duplicates"][0]["count"], 2)
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+        self.assertIn('desc="1 duplicated queries"', response["Server-Timing"])
+
+    def test_not_sent_to_the_other_users(self):
+        for user, debug in ((self.user, False), (AnonymousUser(), False), (AnonymousUser(), True)):
+            with override_settings(DEBUG=debug), self.assertLogs("authentication.middleware", "INFO"):
+                response = self.call_middleware(user)
+            self.assertEqual(response.has_header("Server-Timing"), debug)
+
+    def test_sampling(self):
+        with override_settings(QUERY_INSTRUMENTATION_SAMPLE_RATE=0), self.assertNoLogs("authentication.middleware"):
+            self.assertFalse(self.call_middleware(self.staff).has_header("Server-Timing"))
+
+        with mock.patch("authentication.middleware.random.random", side_effect=[0.2, 0.05]):
+            with override_settings(QUERY_INSTRUMENTATION_SAMPLE_RATE=0.1), self.assertLogs(
+                "authentication.middleware"
+            ) as logs:
+                self.call_middleware(self.staff)
+                self.call_middleware(self.staff)
+        self.assertEqual(len(logs.records), 1)
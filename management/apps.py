@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ManagementConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "management"
+
+    def ready(self):
+        super(ManagementConfig, self).ready()
+        import management.signals
@@ -0,0 +1,109 @@
+"""
+Coalescing of the work triggered by model signals.
+
+Signal handlers mark the objects they touched as dirty with `mark_dirty(event, ids)` instead of doing the
+work right away. The ids are collected by a single `Flush` per transaction or savepoint (and database alias),
+registered with `transaction.on_commit`; once the transaction commits, the handler registered for each event
+runs once, in batches, over the distinct ids. A rolled back transaction or savepoint drops its `Flush`, and the
+ids with it.
+With DEFERRED_EVENTS_ASYNC, the collected events are handed off to the `process_events` Celery task instead.
+Outside of a transaction, `transaction.on_commit` runs the handlers immediately.
+"""
+
+import threading
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+_handlers = {}
+# per database alias, the flushes waiting for a commit in this thread, with the savepoints they were registered in.
+_pending = threading.local()
+
+
+def handler(event):
+    """
+    Register the function processing the dirty ids of `event`, called with a list of at most
+    DEFERRED_EVENTS_BATCH_SIZE ids.
+    """
+
+    def decorator(func):
+        _handlers[event] = func
+        return func
+
+    return decorator
+
+
+class Flush:
+    """The dirty ids of a transaction, processed when it commits."""
+
+    def __init__(self):
+        self.events = defaultdict(set)
+        self.flushed = False
+
+    def __call__(self):
+        self.flushed = True
+        events = {event: sorted(ids) for event, ids in self.events.items()}
+        if not events:
+            return
+
+        if settings.DEFERRED_EVENTS_ASYNC:
+            from management.tasks import process_events
+
+            process_events.delay(events)
+        else:
+            process(events)
+
+
+def get_flush(using=None):
+    """The `Flush` waiting for the commit of the current transaction (and savepoints) on `using`, if any."""
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return None
+
+    # the flushes are weakly referenced: the connection drops them once run by the commit, or with the
+    # transaction or savepoint rolled back, and they are gone from here as well.
+    pending = _pending.__dict__.setdefault(connection.alias, [])
+    pending[:] = [(sids, ref) for sids, ref in pending if ref() is not None and not ref().flushed]
+
+    savepoints = tuple(connection.savepoint_ids)
+    for sids, ref in pending:
+        # rolled back with the current savepoints; the savepoints it was registered in past them were released.
+        if sids[: len(savepoints)] == savepoints:
+            return ref()
+    return None
+
+
+def add_flush(flush, using=None):
+    connection = transaction.get_connection(using)
+    if connection.in_atomic_block:
+        pending = _pending.__dict__.setdefault(connection.alias, [])
+        pending.append((tuple(connection.savepoint_ids), weakref.ref(flush)))
+    # robust: a failing handler is logged instead of failing the request whose transaction committed already.
+    transaction.on_commit(flush, using=using, robust=True)
+
+
+def mark_dirty(event, ids, using=None):
+    if event not in _handlers:
+        raise KeyError(f"No handler registered for the event: {event}")
+
+    ids = set(ids) - {None}
+    if not ids:
+        return
+
+    # a single flush per transaction, whatever the number of saves.
+    flush = get_flush(using)
+    if flush is not None:
+        flush.events[event].update(ids)
+        return
+    flush = Flush()
+    flush.events[event].update(ids)
+    add_flush(flush, using)
+
+
+def process(events):
+    batch_size = settings.DEFERRED_EVENTS_BATCH_SIZE
+    for event, ids in events.items():
+        for start in range(0, len(ids), batch_size):
+            _handlers[event](ids[start : start + batch_size])
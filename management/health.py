@@ -0,0 +1,83 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+CELERY_HEALTH_CACHE_KEY = "health:celery"
+
+
+class CeleryHealthProbe:
+    """
+    Checks that the broker accepts connections and that at least one worker answers a ping.
+    """
+
+    def __init__(self, app=None, timeout=None):
+        if app is None:
+            from vehicleManagementSystem.celery import app
+        self.app = app
+        self.timeout = timeout if timeout is not None else settings.HEALTH_CHECK_TIMEOUT
+
+    def run(self):
+        result = {"status": "Error", "broker": "Disconnected", "workers": 0, "checked_at": None}
+        try:
+            with self.app.connection_for_write() as connection:
+                connection.ensure_connection(max_retries=1, interval_start=0, timeout=self.timeout)
+            result["broker"] = "Connected"
+
+            replies = self.app.control.ping(timeout=self.timeout)
+            result["workers"] = len(replies)
+            result["status"] = "Running" if replies else "Stopped"
+        except Exception as error:
+            result["error"] = str(error)
+
+        result["checked_at"] = timezone.now().isoformat()
+        return result
+
+
+class HealthMonitor:
+    """
+    Runs a probe in a background thread every `interval` seconds and keeps the last result in the cache,
+    so that readers never wait for the probe itself.
+    """
+
+    def __init__(self, probe, cache_key, interval=None):
+        self.probe = probe
+        self.cache_key = cache_key
+        self.interval = interval if interval is not None else settings.HEALTH_CHECK_INTERVAL
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def store(self, result):
+        cache.set(self.cache_key, result, None)
+
+    def refresh(self):
+        result = self.probe.run()
+        self.store(result)
+        return result
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                pass  # the next round will try again...
+            if self._stopped.wait(self.interval):
+                return
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def last_result(self):
+        return cache.get(self.cache_key) or {"status": "Unknown", "checked_at": None}
+
+
+celery_monitor = HealthMonitor(CeleryHealthProbe(), CELERY_HEALTH_CACHE_KEY)
@@ -0,0 +1,217 @@
+import json
+import logging
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from api.serializers import TokenSerializer
+from authentication.models import AppUser
+from management.models import Vehicle, VehicleDriverAssignment, VehicleTechnician
+
+DEFAULT_BUDGET = settings.BASE_DIR.parent / "api" / "endpoint_budgets.json"
+
+# route name -> url name and whether it takes the pk of a vehicle the user can see
+ROUTES = {
+    "vehicle-list": ("vehicle-list", False),
+    "vehicle-detail": ("vehicle-detail", True),
+    "vehicle-count": ("vehicle-vehicle-config", False),
+    "vehicles-access": ("custom-vehicles-list", False),
+    "vehicle-all-info": ("vehicle-history-all-info", True),
+    "vehicle-technician-list": ("vehicle-technician-list", False),
+    "driver-list": ("driver-list", False),
+    "assignment-list": ("manage-assignments-list", False),
+    "issue-report-list": ("issue-reports-list", False),
+    "maintenance-list": ("vehicle-maintenances-list", False),
+    "document-list": ("documents-list", False),
+    "partner-list": ("partners-list", False),
+    "partnership-list": ("partnership-list", False),
+    "user-list": ("manage-users-list", False),
+    "system-dashboard": ("system-dashboard", False),
+    "driver-dashboard": ("driver-dashboard", False),
+    "technician-dashboard": ("technician-dashboard", False),
+    "financial-dashboard": ("financial-dashboard", False),
+}
+# budget fields -> measured value they cap. The query counts and the bytes are deterministic and fail the
+# run; the latency depends on the machine and is only reported.
+BUDGET_FIELDS = {"max_queries": "queries", "max_bytes": "bytes"}
+ADVISORY_BUDGET_FIELDS = {"max_p95_ms": "p95_ms"}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(int(round(len(values) * fraction)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the read routes of the API as a superuser, a driver, a technician and a financial controller "
+        "of a fleet made by generate_fleet, and report the latency (p50/p95), SQL queries and response bytes "
+        "of each route. Fails when a route exceeds its query or bytes budget; latency overruns are warnings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="seed of the generated fleet")
+        parser.add_argument("--requests", type=int, default=20, help="measured requests per route and role")
+        parser.add_argument("--warmup", type=int, default=2, help="unmeasured requests per route and role")
+        parser.add_argument("--routes", nargs="+", choices=list(ROUTES), help="routes to benchmark (all by default)")
+        parser.add_argument("--output", default="endpoint_benchmark.json", help="JSON file of the results")
+        parser.add_argument("--budget", default=str(DEFAULT_BUDGET), help="JSON file of the budgets")
+        parser.add_argument(
+            "--write-budget",
+            action="store_true",
+            help="write the measured query counts, 5x the p95 latency and 1.5x the bytes to the budget file",
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        # the 4xx answers of the routes a role may not use are part of the run, not warnings.
+        request_logger = logging.getLogger("django.request")
+        request_log_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            # the superuser is created for the run only: nothing is left in the database.
+            # the sampled instrumentation of the middleware would skew the latencies.
+            with transaction.atomic(), override_settings(QUERY_INSTRUMENTATION_SAMPLE_RATE=0):
+                results = self.run(options)
+                transaction.set_rollback(True)
+        finally:
+            request_logger.setLevel(request_log_level)
+            teardown_test_environment()
+
+        report = {
+            "vendor": connection.vendor,
+            "seed": options["seed"],
+            "requests": options["requests"],
+            "results": results,
+        }
+        if options["write_budget"]:
+            self.write_budget(options["budget"], results)
+        else:
+            budget = self.read_budget(options["budget"])
+            report["violations"] = self.check_budget(budget, results, BUDGET_FIELDS)
+            report["warnings"] = self.check_budget(budget, results, ADVISORY_BUDGET_FIELDS)
+
+        with open(options["output"], "w") as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(f"Results written to {options['output']}.")
+
+        for warning in report.get("warnings", []):
+            self.stdout.write(self.style.WARNING(warning))
+        for violation in report.get("violations", []):
+            self.stdout.write(self.style.ERROR(violation))
+        if report.get("violations"):
+            raise CommandError(f"{len(report['violations'])} budgets exceeded.")
+
+    def get_users(self, seed):
+        fleet_users = AppUser.objects.filter(email__endswith=f".s{seed}@fleet.example.com").order_by("id")
+        driver = fleet_users.filter(
+            drivers__assignment__assignment_status=VehicleDriverAssignment.AssignmentStatus.ACTIVE
+        ).first()
+        technician = fleet_users.filter(id__in=self.get_technicians().values("user")).first()
+        financial = fleet_users.filter(email__startswith="financial").first()
+        if not (driver and technician and financial):
+            raise CommandError(f"No fleet generated with the seed {seed}: run generate_fleet --seed {seed} first.")
+
+        superuser = AppUser.objects.create_superuser(email=f"benchmark.s{seed}@fleet.example.com", password=None)
+        return {"superuser": superuser, "driver": driver, "technician": technician, "financial": financial}
+
+    def get_technicians(self):
+        # the technicians the API shows vehicles to (see VehicleScopeMixin).
+        return VehicleTechnician.objects.filter(end_date__isnull=False, managed_vehicles__isnull=False)
+
+    def get_vehicle(self, role, user):
+        # a vehicle in the scope of the user, for the detail routes.
+        if role == "driver":
+            vehicles = Vehicle.objects.filter(
+                assignment__driver__user=user,
+                assignment__assignment_status=VehicleDriverAssignment.AssignmentStatus.ACTIVE,
+            )
+        elif role == "technician":
+            vehicles = Vehicle.objects.filter(managing_technician__in=self.get_technicians().filter(user=user))
+        else:
+            vehicles = Vehicle.objects.filter(vin_number__startswith="FLEET")
+        return vehicles.order_by("id").values_list("id", flat=True).first()
+
+    def run(self, options):
+        routes = options["routes"] or list(ROUTES)
+        results = []
+        for role, user in self.get_users(options["seed"]).items():
+            client = Client(HTTP_AUTHORIZATION=f"Bearer {TokenSerializer.get_token(user).access_token}")
+            vehicle_id = self.get_vehicle(role, user)
+            for route in routes:
+                url_name, takes_vehicle = ROUTES[route]
+                url = reverse(url_name, kwargs={"pk": vehicle_id} if takes_vehicle else None)
+                results.append(self.measure(client, route, role, url, options["warmup"], options["requests"]))
+                self.stdout.write(self.format_result(results[-1]))
+        return results
+
+    def measure(self, client, route, role, url, warmup, requests):
+        for _ in range(warmup):
+            client.get(url)
+
+        durations, queries = [], []
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as context:
+                started_at = time.perf_counter()
+                response = client.get(url)
+                durations.append((time.perf_counter() - started_at) * 1000)
+            queries.append(len(context))
+
+        return {
+            "route": route,
+            "role": role,
+            "url": url,
+            "status": response.status_code,
+            "p50_ms": round(statistics.median(durations), 2),
+            "p95_ms": round(percentile(durations, 0.95), 2),
+            "queries": max(queries),
+            "bytes": len(response.content),
+        }
+
+    def format_result(self, result):
+        return (
+            f"{result['route']} [{result['role']}] {result['status']}: p50 {result['p50_ms']}ms, "
+            f"p95 {result['p95_ms']}ms, {result['queries']} queries, {result['bytes']} bytes"
+        )
+
+    def read_budget(self, path):
+        try:
+            with open(path) as budget_file:
+                return json.load(budget_file)
+        except FileNotFoundError:
+            raise CommandError(f"No budget file at {path}: run with --write-budget to create it.")
+
+    def check_budget(self, budget, results, fields):
+        violations = []
+        for result in results:
+            limits = budget.get(result["route"], {}).get(result["role"], {})
+            for field, measured in fields.items():
+                if field in limits and result[measured] > limits[field]:
+                    violations.append(
+                        f"{result['route']} [{result['role']}]: {measured} {result[measured]} > {limits[field]}"
+                    )
+        return violations
+
+    def write_budget(self, path, results):
+        budget = {}
+        for result in results:
+            budget.setdefault(result["route"], {})[result["role"]] = {
+                "max_queries": result["queries"],
+                "max_p95_ms": max(round(result["p95_ms"] * 5, -1), 100),
+                "max_bytes": int(result["bytes"] * 1.5),
+            }
+        with open(path, "w") as budget_file:
+            json.dump(budget, budget_file, indent=2)
+            budget_file.write("\n")
+        self.stdout.write(f"Budget written to {path}.")
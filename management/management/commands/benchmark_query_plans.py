@@ -0,0 +1,236 @@
+import random
+import re
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from authentication.models import AccessRole, AppUser, Driver, Role
+from management.models import Vehicle, VehicleDriverAssignment
+from vehicleBudget.models import FinancialRecord, FuelConsumption, VehicleMaintenance
+from vehicleHub.models import Fuel, IssueReport, Partner, Partnership
+
+INDEXED_MODELS = (
+    AccessRole,
+    Driver,
+    Vehicle,
+    VehicleDriverAssignment,
+    IssueReport,
+    VehicleMaintenance,
+    FuelConsumption,
+    FinancialRecord,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic rows in a transaction that is rolled back, then EXPLAIN the hot filters of the views "
+        "without and with the indexes declared in the models' Meta.indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="rows per hot table"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--show-plans", action="store_true", help="print the full query plans")
+
+    def handle(self, *args, **options):
+        for rows in options["rows"]:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{rows} rows"))
+            with transaction.atomic():
+                started_at = time.perf_counter()
+                samples = self.seed(rows, random.Random(options["seed"]))
+                self.stdout.write(f"seeded in {time.perf_counter() - started_at:.1f}s")
+                self.analyze()
+
+                # the dropped indexes come back with the savepoint rollback.
+                savepoint = transaction.savepoint()
+                self.drop_indexes()
+                self.analyze()
+                without_indexes = self.explain_all(samples)
+                transaction.savepoint_rollback(savepoint)
+                self.analyze()
+                with_indexes = self.explain_all(samples)
+
+                for label in with_indexes:
+                    self.report(label, without_indexes[label], with_indexes[label], options["show_plans"])
+                transaction.set_rollback(True)
+
+    def get_queries(self, samples):
+        today = date.today()
+        active = VehicleDriverAssignment.AssignmentStatus.ACTIVE
+        return {
+            "active assignments of a driver": VehicleDriverAssignment.objects.filter(
+                driver_id=samples["driver"], assignment_status=active
+            ),
+            "open issue reports of a vehicle": IssueReport.objects.filter(
+                vehicle_id=samples["vehicle"], is_fixed=False
+            ),
+            "latest pending maintenances": VehicleMaintenance.objects.filter(
+                status=VehicleMaintenance.Status.PENDING
+            ).order_by("-created_at")[:10],
+            "ongoing maintenances": VehicleMaintenance.objects.filter(
+                status=VehicleMaintenance.Status.APPROVED, maintenance_end_date__isnull=True
+            ),
+            "licenses expiring within 30 days": Driver.objects.filter(
+                expiry_date__range=[today, today + timedelta(days=30)]
+            ),
+            "vehicles needing service": Vehicle.objects.filter(last_service_date__lt=today - timedelta(days=365 * 3)),
+            "active roles of a user": AccessRole.objects.filter(
+                user_id=samples["user"], start_date__lte=today, end_date__gte=today
+            ),
+            "latest fuel records of a vehicle": FuelConsumption.objects.filter(vehicle_id=samples["vehicle"]).order_by(
+                "-date"
+            )[:10],
+            "ledger of a week": FinancialRecord.objects.filter(record_date__range=[today - timedelta(days=7), today]),
+        }
+
+    def explain_all(self, samples):
+        results = {}
+        for label, queryset in self.get_queries(samples).items():
+            plan = queryset.explain()
+            started_at = time.perf_counter()
+            list(queryset)
+            results[label] = (plan, time.perf_counter() - started_at)
+        return results
+
+    def report(self, label, without_indexes, with_indexes, show_plans):
+        (plan_before, duration_before), (plan_after, duration_after) = without_indexes, with_indexes
+        self.stdout.write(
+            f"{label}: {self.describe(plan_before)} {duration_before * 1000:.1f}ms"
+            f" -> {self.describe(plan_after)} {duration_after * 1000:.1f}ms"
+        )
+        if show_plans:
+            self.stdout.write(f"  without indexes:\n{plan_before}\n  with indexes:\n{plan_after}")
+
+    def describe(self, plan):
+        # PostgreSQL: "Seq Scan on <table>", SQLite: "SCAN <table>" (an index is used with "SEARCH ... USING INDEX")
+        if "Seq Scan" in plan or re.search(r"\bSCAN \w+$", plan, re.MULTILINE):
+            return "sequential scan"
+        used = re.findall(r"(?:USING (?:COVERING )?INDEX|Scan (?:Backward )?using) (\w+)", plan)
+        return f"index scan ({', '.join(dict.fromkeys(used))})"
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+
+    def seed(self, rows, rng):
+        """
+        `rows` rows in each hot table; users, drivers and vehicles a tenth of it.
+        """
+        today = date.today()
+        people = max(rows // 10, 10)
+
+        def some_day(years=5):
+            return today - timedelta(days=rng.randrange(365 * years))
+
+        users = AppUser.objects.bulk_create(
+            [AppUser(email=f"benchmark.{n}@example.com", password="!") for n in range(people)], batch_size=5000
+        )
+        drivers = Driver.objects.bulk_create(
+            [
+                Driver(
+                    user=user,
+                    driving_license_number=f"BL{n}",
+                    delivery_date=today - timedelta(days=365 * 5),
+                    expiry_date=today + timedelta(days=rng.randrange(-365, 365 * 5)),
+                )
+                for n, user in enumerate(users)
+            ],
+            batch_size=5000,
+        )
+        fuel = Fuel.objects.create(fuel_type="benchmark")
+        vehicles = Vehicle.objects.bulk_create(
+            [
+                Vehicle(
+                    make="Benchmark",
+                    model=f"M{n % 20}",
+                    year=2000 + n % 25,
+                    vin_number=f"BVIN{n}",
+                    license_plate_number=f"BP{n}",
+                    fuel_type=fuel,
+                    last_service_date=some_day(),
+                )
+                for n in range(people)
+            ],
+            batch_size=5000,
+        )
+        partner = Partner.objects.create(
+            partnership=Partnership.objects.create(name="benchmark"), email="benchmark.partner@example.com"
+        )
+        roles = [Role.objects.create(role_name=f"benchmark-{n}") for n in range(4)]
+
+        # a vehicle has at most one active assignment
+        status = VehicleDriverAssignment.AssignmentStatus
+        VehicleDriverAssignment.objects.bulk_create(
+            [
+                VehicleDriverAssignment(
+                    driver=rng.choice(drivers),
+                    vehicle=vehicles[n % people],
+                    assignment_status=status.ACTIVE if n < people else status.INACTIVE,
+                    begin_at=some_day(),
+                )
+                for n in range(rows)
+            ],
+            batch_size=5000,
+        )
+        AccessRole.objects.bulk_create(
+            [
+                AccessRole(
+                    user=rng.choice(users),
+                    role=rng.choice(roles),
+                    start_date=start,
+                    end_date=start + timedelta(days=90),
+                )
+                for start in (some_day() for _ in range(rows))
+            ],
+            batch_size=5000,
+        )
+        IssueReport.objects.bulk_create(
+            [
+                IssueReport(name="benchmark", vehicle=rng.choice(vehicles), is_fixed=rng.random() < 0.95)
+                for _ in range(rows)
+            ],
+            batch_size=5000,
+        )
+        statuses = VehicleMaintenance.Status.values
+        VehicleMaintenance.objects.bulk_create(
+            [
+                VehicleMaintenance(
+                    name="benchmark",
+                    status=rng.choice(statuses),
+                    maintenance_end_date=some_day() if rng.random() < 0.95 else None,
+                )
+                for _ in range(rows)
+            ],
+            batch_size=5000,
+        )
+        consumptions = FuelConsumption.objects.bulk_create(
+            [
+                FuelConsumption(
+                    vehicle=rng.choice(vehicles),
+                    fuel_type=fuel,
+                    partner=partner,
+                    fuel_cost=rng.randrange(100, 10_000),
+                    date=some_day(),
+                )
+                for _ in range(rows)
+            ],
+            batch_size=5000,
+        )
+        FinancialRecord.objects.bulk_create(
+            [
+                FinancialRecord(fuel_consumption=consumption, cost=consumption.fuel_cost, record_date=consumption.date)
+                for consumption in consumptions
+            ],
+            batch_size=5000,
+        )
+        return {"user": rng.choice(users).id, "driver": rng.choice(drivers).id, "vehicle": rng.choice(vehicles).id}
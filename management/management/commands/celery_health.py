@@ -0,0 +1,33 @@
+from celery import Celery
+from django.core.management.base import BaseCommand, CommandError
+
+from management.health import CeleryHealthProbe, celery_monitor
+
+
+class Command(BaseCommand):
+    help = "Probe the Celery broker and workers (the same probe that feeds the system dashboard)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--broker-url", help="probe this broker instead of the configured one")
+        parser.add_argument("--timeout", type=float, help="seconds to wait for the broker and the workers")
+        parser.add_argument(
+            "--store", action="store_true", help="also store the result as the status read by the dashboard"
+        )
+
+    def handle(self, *args, **options):
+        if options["store"] and options["broker_url"]:
+            # the dashboard reports on the configured broker, not on another one.
+            raise CommandError("--store cannot be combined with --broker-url.")
+
+        app = Celery(broker=options["broker_url"]) if options["broker_url"] else None
+        probe = CeleryHealthProbe(app=app, timeout=options["timeout"])
+
+        result = probe.run()
+        if options["store"]:
+            celery_monitor.store(result)
+
+        for key, value in result.items():
+            self.stdout.write(f"{key}: {value}")
+
+        if result["status"] != "Running":
+            raise CommandError(f"Celery is not healthy ({result['status']}).")
@@ -0,0 +1,456 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from authentication.models import AccessRole, AppUser, Driver, Role
+from management.models import Vehicle, VehicleDriverAssignment, VehicleTechnician
+from management.signals import SYSTEM_DASHBOARD_CACHE_KEY
+from vehicleBudget.models import DocumentCost, FinancialRecord, FuelConsumption, VehicleCostSummary, VehicleMaintenance
+from vehicleHub.models import Document, Fuel, IssueReport, Partner, Partnership
+
+# rows generated per unit of --scale
+VEHICLES = 100
+DRIVERS = 110
+TECHNICIANS = 5
+FINANCIAL_CONTROLLERS = 2
+PARTNERS = 10
+# rows generated per vehicle
+ASSIGNMENTS = 3
+ISSUE_REPORTS = 8
+MAINTENANCES = 3
+FUEL_CONSUMPTIONS = 200
+
+# history covered by the generated rows, up to --until
+HISTORY_DAYS = 4 * 365
+
+MAKES = {
+    "Toyota": ["Hilux", "Land Cruiser", "Corolla", "RAV4"],
+    "Nissan": ["Navara", "Patrol", "X-Trail"],
+    "Mitsubishi": ["L200", "Pajero"],
+    "Isuzu": ["D-Max", "NPR"],
+    "Ford": ["Ranger", "Transit"],
+    "Yamaha": ["AG 200", "Crux"],
+}
+COLORS = ["white", "black", "silver", "grey", "blue", "red"]
+FUEL_TYPES = {"Diesel": 2800, "Gasoline": 3200}
+ISSUES = ["Brake pads worn", "Flat tire", "Oil leak", "Battery failure", "Broken mirror", "Engine overheating"]
+VEHICLE_DOCUMENTS = [
+    Document.DocumentChoices.INSURANCE_CERTIFICATE,
+    Document.DocumentChoices.ROAD_TAX,
+    Document.DocumentChoices.VEHICLE_INSPECTION_REPORT,
+    Document.DocumentChoices.VEHICLE_REGISTRATION_DOCUMENT,
+]
+PAYMENT_METHODS = FuelConsumption.PaymentMethods.values
+ROLES = {
+    "Driver": Role.RoleGroup.DRIVER,
+    "Technician": Role.RoleGroup.TECHNICIAN,
+    "Financial": Role.RoleGroup.FINANCIAL,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic fleet with bulk inserts, for load and scaling tests: "
+        f"--scale 1 is {VEHICLES} vehicles, {DRIVERS} drivers and {VEHICLES * FUEL_CONSUMPTIONS} fuel consumptions. "
+        "The same --seed, --scale and --until always generate the same fleet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=float, default=1, help="size of the fleet, in units of 100 vehicles")
+        parser.add_argument("--seed", type=int, default=0, help="seed of the generator (0 to 999)")
+        parser.add_argument(
+            "--until", type=date.fromisoformat, default=None, help="last day of the history (YYYY-MM-DD, today)"
+        )
+        parser.add_argument("--batch-size", type=int, default=5000, help="rows per INSERT")
+        parser.add_argument("--password", default="fleet", help="password of the generated users")
+        parser.add_argument(
+            "--skip-derived",
+            action="store_true",
+            help="leave the ledger, the vehicle cost summaries and the expense rollups out",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.seed = options["seed"]
+        self.batch_size = options["batch_size"]
+        self.until = options["until"] or date.today()
+        self.since = self.until - timedelta(days=HISTORY_DAYS)
+        self.password = make_password(options["password"])
+
+        scale = options["scale"]
+        counts = {
+            "vehicles": max(int(VEHICLES * scale), 1),
+            "drivers": max(int(DRIVERS * scale), 1),
+            "technicians": max(int(TECHNICIANS * scale), 1),
+            "financial_controllers": max(int(FINANCIAL_CONTROLLERS * scale), 1),
+            "partners": max(int(PARTNERS * scale), 2),
+        }
+        # the seed and the row numbers make the unique identifiers (plates are 10 characters long).
+        if not 0 <= self.seed <= 999:
+            raise CommandError("The seed must be between 0 and 999.")
+        if max(counts.values()) >= 1_000_000:
+            raise CommandError("The scale must generate less than 1 000 000 vehicles and users.")
+        if Vehicle.objects.filter(vin_number__startswith=self.vin_prefix).exists():
+            raise CommandError(f"A fleet was already generated with the seed {self.seed}.")
+
+        self.started_at = time.perf_counter()
+        with transaction.atomic():
+            self.generate(counts, skip_derived=options["skip_derived"])
+            # the rollups of the ledger days are rebuilt when the transaction commits.
+        cache.delete(SYSTEM_DASHBOARD_CACHE_KEY)
+        self.stdout.write(self.style.SUCCESS(f"Fleet generated in {time.perf_counter() - self.started_at:.1f}s."))
+
+    @property
+    def vin_prefix(self):
+        return f"FLEET{self.seed:03d}"
+
+    def log(self, model, count):
+        self.stdout.write(f"{model._meta.label}: {count} rows ({time.perf_counter() - self.started_at:.1f}s)")
+
+    def bulk_create(self, model, objects):
+        objects = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.log(model, len(objects))
+        return objects
+
+    def some_day(self, since=None, until=None):
+        since, until = since or self.since, until or self.until
+        return since + timedelta(days=self.rng.randrange((until - since).days + 1))
+
+    def payment_method(self):
+        return self.rng.choice(PAYMENT_METHODS)
+
+    def generate(self, counts, skip_derived=False):
+        roles = {
+            name: Role.objects.get_or_create(role_name=name, defaults={"role_group": group})[0]
+            for name, group in ROLES.items()
+        }
+        fuels = [
+            Fuel.objects.filter(fuel_type=fuel_type).first() or Fuel.objects.create(fuel_type=fuel_type)
+            for fuel_type in FUEL_TYPES
+        ]
+
+        partners = self.generate_partners(counts["partners"])
+        vehicles = self.generate_vehicles(counts["vehicles"], fuels)
+        drivers, technicians, controllers = self.generate_staff(counts, roles)
+        self.generate_assignments(vehicles, drivers)
+        self.generate_technicians(vehicles, technicians)
+        maintenances = self.generate_issues_and_maintenances(vehicles, partners)
+        document_costs = self.generate_documents(vehicles, drivers, partners)
+        fuel_consumptions = self.generate_fuel_consumptions(vehicles, partners)
+
+        if skip_derived:
+            return
+        for source_field, source_ids in (
+            ("vehicle_maintenance", [maintenance.id for maintenance in maintenances]),
+            ("document_cost", [document_cost.id for document_cost in document_costs]),
+            ("fuel_consumption", fuel_consumptions),
+        ):
+            for start in range(0, len(source_ids), self.batch_size):
+                FinancialRecord.objects.sync(source_field, source_ids[start : start + self.batch_size])
+        self.log(FinancialRecord, FinancialRecord.objects.count())
+
+        vehicle_ids = [vehicle.id for vehicle in vehicles]
+        for start in range(0, len(vehicle_ids), self.batch_size):
+            VehicleCostSummary.objects.refresh(vehicle_ids[start : start + self.batch_size])
+        self.log(VehicleCostSummary, len(vehicle_ids))
+
+    def generate_partners(self, count):
+        partnerships = []
+        for n in range(count):
+            # most partnerships are permanent
+            end_date = None if self.rng.random() < 0.8 else self.until + timedelta(days=365)
+            partnerships.append(
+                Partnership(
+                    name=f"Fleet partner {self.seed}-{n}",
+                    start_date=self.since,
+                    end_date=end_date,
+                    is_permanent_partner=end_date is None,
+                )
+            )
+        partnerships = self.bulk_create(Partnership, partnerships)
+
+        return self.bulk_create(
+            Partner,
+            [
+                Partner(
+                    partnership=partnership,
+                    email=f"partner{n}.s{self.seed}@fleet.example.com",
+                    companyNIF=f"NIF{self.seed:03d}{n:07d}",
+                    phone_number=f"+257 {self.rng.randrange(10**7, 10**8)}",
+                    address=f"{self.rng.randrange(1, 200)} Avenue {self.rng.choice(COLORS).title()}",
+                )
+                for n, partnership in enumerate(partnerships)
+            ],
+        )
+
+    def generate_vehicles(self, count, fuels):
+        vehicles = []
+        for n in range(count):
+            make = self.rng.choice(list(MAKES))
+            purchase_date = self.some_day(until=self.until - timedelta(days=30))
+            vehicles.append(
+                Vehicle(
+                    make=make,
+                    model=self.rng.choice(MAKES[make]),
+                    year=purchase_date.year - self.rng.randrange(3),
+                    vehicle_type=(
+                        Vehicle.VehicleType.MOTORCYCLE
+                        if make == "Yamaha"
+                        else self.rng.choice([Vehicle.VehicleType.CAR, Vehicle.VehicleType.TRUCK])
+                    ),
+                    vin_number=f"{self.vin_prefix}{n:09d}",
+                    license_plate_number=f"F{self.seed:03d}{n:06d}",
+                    color=self.rng.choice(COLORS),
+                    fuel_type=self.rng.choice(fuels),
+                    mileage=self.rng.randrange(1_000, 300_000),
+                    purchase_date=purchase_date,
+                    last_service_date=self.some_day(since=purchase_date),
+                )
+            )
+        return self.bulk_create(Vehicle, vehicles)
+
+    def generate_users(self, kind, count):
+        return self.bulk_create(
+            AppUser,
+            [
+                AppUser(
+                    email=f"{kind}{n}.s{self.seed}@fleet.example.com",
+                    password=self.password,
+                    first_name=kind.title(),
+                    last_name=str(n),
+                    employeeID=f"{kind[0].upper()}{self.seed:03d}{n:06d}",
+                )
+                for n in range(count)
+            ],
+        )
+
+    def generate_staff(self, counts, roles):
+        driver_users = self.generate_users("driver", counts["drivers"])
+        technician_users = self.generate_users("technician", counts["technicians"])
+        controllers = self.generate_users("financial", counts["financial_controllers"])
+
+        access_roles = []
+        for role_name, users in (
+            ("Driver", driver_users),
+            ("Technician", technician_users),
+            ("Financial", controllers),
+        ):
+            for user in users:
+                access_roles.append(
+                    AccessRole(
+                        user=user,
+                        role=roles[role_name],
+                        start_date=self.since,
+                        end_date=self.until + timedelta(days=365),
+                    )
+                )
+        self.bulk_create(AccessRole, access_roles)
+
+        drivers = []
+        for n, user in enumerate(driver_users):
+            delivery_date = self.some_day(since=self.since - timedelta(days=5 * 365))
+            drivers.append(
+                Driver(
+                    user=user,
+                    driving_license_number=f"DL{self.seed:03d}{n:06d}",
+                    license_category=self.rng.choice(Driver.LicenseCategories.values),
+                    delivery_date=delivery_date,
+                    expiry_date=delivery_date + timedelta(days=10 * 365),
+                )
+            )
+        return self.bulk_create(Driver, drivers), technician_users, controllers
+
+    def generate_assignments(self, vehicles, drivers):
+        # successive assignments of each vehicle, the last one still active for most vehicles.
+        assignments = []
+        for vehicle in vehicles:
+            begin_at = vehicle.purchase_date
+            for n in range(ASSIGNMENTS):
+                active = n == ASSIGNMENTS - 1 and self.rng.random() < 0.9
+                ends_at = None if active else self.some_day(since=begin_at, until=self.until - timedelta(days=1))
+                assignments.append(
+                    VehicleDriverAssignment(
+                        driver=self.rng.choice(drivers),
+                        vehicle=vehicle,
+                        assignment_status=(
+                            VehicleDriverAssignment.AssignmentStatus.ACTIVE
+                            if active
+                            else VehicleDriverAssignment.AssignmentStatus.INACTIVE
+                        ),
+                        begin_at=begin_at,
+                        ends_at=ends_at,
+                    )
+                )
+                begin_at = ends_at
+        self.bulk_create(VehicleDriverAssignment, assignments)
+
+    def generate_technicians(self, vehicles, users):
+        technicians = self.bulk_create(
+            VehicleTechnician,
+            [
+                VehicleTechnician(user=user, begin_date=self.since, end_date=self.until + timedelta(days=365))
+                for user in users
+            ],
+        )
+        # the vehicles are shared out between the technicians.
+        ManagedVehicle = VehicleTechnician.managed_vehicles.through
+        ManagedVehicle.objects.bulk_create(
+            [
+                ManagedVehicle(vehicletechnician=technicians[n % len(technicians)], vehicle=vehicle)
+                for n, vehicle in enumerate(vehicles)
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def generate_issues_and_maintenances(self, vehicles, partners):
+        reports = []
+        for vehicle in vehicles:
+            for _ in range(ISSUE_REPORTS):
+                reports.append(
+                    IssueReport(
+                        name=self.rng.choice(ISSUES),
+                        vehicle=vehicle,
+                        priority=self.rng.choice(IssueReport.Priority.values),
+                        report_date=self.some_day(since=vehicle.purchase_date),
+                        issue_cost=self.rng.randrange(10, 2_000) * 1_000,
+                    )
+                )
+        reports = self.bulk_create(IssueReport, reports)
+
+        # each maintenance covers two reports of the same vehicle; the remaining reports stay open.
+        maintenances, covered = [], []
+        Status = VehicleMaintenance.Status
+        for start in range(0, len(reports), ISSUE_REPORTS):
+            vehicle_reports = sorted(reports[start : start + ISSUE_REPORTS], key=lambda report: report.report_date)
+            for n in range(MAINTENANCES):
+                issue_reports = vehicle_reports[2 * n : 2 * n + 2]
+                status = self.rng.choices(
+                    [Status.APPROVED, Status.PENDING, Status.REJECTED, Status.CANCELED], weights=[80, 12, 5, 3]
+                )[0]
+                maintenance = VehicleMaintenance(
+                    name=f"Maintenance of {issue_reports[0].vehicle.license_plate_number}",
+                    status=status,
+                    partner=self.rng.choice(partners),
+                    payment_method=self.payment_method(),
+                    payment_amount=sum(report.issue_cost for report in issue_reports),
+                )
+                if status == Status.APPROVED:
+                    maintenance.maintenance_begin_date = self.some_day(since=issue_reports[-1].report_date)
+                    # a few approved maintenances are still in progress.
+                    if self.rng.random() < 0.9:
+                        maintenance.maintenance_end_date = min(
+                            maintenance.maintenance_begin_date + timedelta(days=self.rng.randrange(1, 15)),
+                            self.until,
+                        )
+                        maintenance.payment_date = maintenance.maintenance_end_date
+                        for report in issue_reports:
+                            report.is_fixed = True
+                maintenances.append(maintenance)
+                covered.append(issue_reports)
+        maintenances = self.bulk_create(VehicleMaintenance, maintenances)
+        IssueReport.objects.bulk_update(reports, ["is_fixed"], batch_size=self.batch_size)
+
+        MaintenanceReport = VehicleMaintenance.issue_reports.through
+        MaintenanceReport.objects.bulk_create(
+            [
+                MaintenanceReport(vehiclemaintenance=maintenance, issuereport=report)
+                for maintenance, issue_reports in zip(maintenances, covered)
+                for report in issue_reports
+            ],
+            batch_size=self.batch_size,
+        )
+        return maintenances
+
+    def generate_documents(self, vehicles, drivers, partners):
+        documents = []
+        for vehicle in vehicles:
+            for document_type in VEHICLE_DOCUMENTS:
+                renewable = document_type != Document.DocumentChoices.VEHICLE_REGISTRATION_DOCUMENT
+                documents.append(
+                    Document(
+                        name=f"{Document.DocumentChoices(document_type).label} {vehicle.license_plate_number}",
+                        document_type=document_type,
+                        document_category=Document.DocumentTypeChoices.CORE,
+                        issued_to=Document.OwnerChoices.VEHICLE,
+                        issued_vehicle=vehicle,
+                        is_renewable=renewable,
+                        issuing_authority=self.rng.choice(partners),
+                        exp_begin_date=vehicle.purchase_date,
+                        exp_end_date=self.until + timedelta(days=self.rng.randrange(365)) if renewable else None,
+                    )
+                )
+        for driver in drivers:
+            documents.append(
+                Document(
+                    name=f"Driving license {driver.driving_license_number}",
+                    document_type=Document.DocumentChoices.DRIVER_CERTIFICATE,
+                    document_category=Document.DocumentTypeChoices.CORE,
+                    issued_to=Document.OwnerChoices.DRIVER,
+                    issued_driver=driver,
+                    exp_begin_date=driver.delivery_date,
+                    exp_end_date=driver.expiry_date,
+                )
+            )
+        documents = self.bulk_create(Document, documents)
+
+        licenses = documents[-len(drivers) :]
+        for driver, document in zip(drivers, licenses):
+            driver.driver_license_document = document
+        Driver.objects.bulk_update(drivers, ["driver_license_document"], batch_size=self.batch_size)
+
+        # renewable vehicle documents are paid for every year.
+        costs = []
+        for document in documents[: -len(drivers)]:
+            payment_dates = [document.exp_begin_date]
+            if document.is_renewable:
+                while payment_dates[-1] + timedelta(days=365) <= self.until:
+                    payment_dates.append(payment_dates[-1] + timedelta(days=365))
+            for payment_date in payment_dates:
+                costs.append(
+                    DocumentCost(
+                        document=document,
+                        payment_date=payment_date,
+                        payment_amount=self.rng.randrange(20, 500) * 1_000,
+                        payment_method=self.payment_method(),
+                    )
+                )
+        return self.bulk_create(DocumentCost, costs)
+
+    def generate_fuel_consumptions(self, vehicles, partners):
+        """
+        Inserted in batches as they are generated, so that only their ids are kept in memory.
+        The foreign keys are set by id, which spares the related descriptors on the hot path.
+        """
+        ids, batch = [], []
+        station_ids = [partner.id for partner in partners[: max(len(partners) // 2, 1)]]
+        for vehicle in vehicles:
+            price = FUEL_TYPES.get(vehicle.fuel_type.fuel_type, 3000)
+            for _ in range(FUEL_CONSUMPTIONS):
+                consumption_date = self.some_day(since=vehicle.purchase_date)
+                quantity = Decimal(self.rng.randrange(1_000, 8_000)) / 100
+                cost = int(quantity * price)
+                batch.append(
+                    FuelConsumption(
+                        vehicle_id=vehicle.id,
+                        fuel_type_id=vehicle.fuel_type_id,
+                        partner_id=self.rng.choice(station_ids),
+                        quantity=quantity,
+                        fuel_cost=cost,
+                        date=consumption_date,
+                        payment_date=consumption_date,
+                        payment_amount=cost,
+                        payment_method=self.payment_method(),
+                    )
+                )
+                if len(batch) == self.batch_size:
+                    ids.extend(consumption.id for consumption in FuelConsumption.objects.bulk_create(batch))
+                    batch = []
+        ids.extend(consumption.id for consumption in FuelConsumption.objects.bulk_create(batch))
+        self.log(FuelConsumption, len(ids))
+        return ids
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("management", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="vehicle",
+            name="vehicle_image",
+            field=models.ImageField(blank=True, null=True, upload_to="vehicles/"),
+        ),
+        migrations.AlterField(
+            model_name="vehicledriverassignment",
+            name="ends_at",
+            field=models.DateField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="vehicletechnician",
+            name="end_date",
+            field=models.DateField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="vehicletechnician",
+            name="user",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="technician",
+                related_query_name="user",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0004_hot_filter_indexes"),
+        ("management", "0003_alter_vehicle_vehicle_image_and_more"),
+        ("vehicleHub", "0002_issuereport_is_fixed_issuereport_issue_cost_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="vehicle",
+            index=models.Index(fields=["last_service_date"], name="vehicle_last_service_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="vehicledriverassignment",
+            index=models.Index(fields=["driver", "assignment_status"], name="assignment_driver_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="vehicledriverassignment",
+            index=models.Index(fields=["vehicle", "assignment_status"], name="assignment_vehicle_status_idx"),
+        ),
+    ]
@@ -52,6 +52,7 @@ class Vehicle(TimeStampModel):
     class Meta:
         ordering = ["-year", "make", "model"]
         unique_together = ("make", "model", "year", "vin_number")
+        indexes = [models.Index(fields=["last_service_date"], name="vehicle_last_service_idx")]
 
     def __str__(self):
         return f"{self.make} - {self.model} ({self.year})"
@@ -85,6 +86,10 @@ class VehicleDriverAssignment(TimeStampModel):
                 name="unique_active_vehicle_assignment",
             )
         ]
+        indexes = [
+            models.Index(fields=["driver", "assignment_status"], name="assignment_driver_status_idx"),
+            models.Index(fields=["vehicle", "assignment_status"], name="assignment_vehicle_status_idx"),
+        ]
 
     def clean(self):
         if self.begin_at > self.ends_at:
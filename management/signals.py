@@ -0,0 +1,24 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from authentication.models import AppUser, Driver, Role
+from management import events
+from management.models import Vehicle, VehicleDriverAssignment, VehicleTechnician
+
+SYSTEM_DASHBOARD_CACHE_KEY = "dashboard:system"
+
+
+def invalidate_system_dashboard(sender, instance, **kwargs):
+    cache.delete(SYSTEM_DASHBOARD_CACHE_KEY)
+
+
+def refresh_vehicle_cost_summary(sender, instance, **kwargs):
+    events.mark_dirty("summary.assignments", [instance.vehicle_id])
+
+
+for model in (Vehicle, VehicleDriverAssignment, VehicleTechnician, Driver, AppUser, Role):
+    post_save.connect(invalidate_system_dashboard, sender=model)
+    post_delete.connect(invalidate_system_dashboard, sender=model)
+
+post_save.connect(refresh_vehicle_cost_summary, sender=VehicleDriverAssignment)
+post_delete.connect(refresh_vehicle_cost_summary, sender=VehicleDriverAssignment)
@@ -0,0 +1,11 @@
+from celery import shared_task
+
+from management import events
+
+
+@shared_task
+def process_events(dirty_ids):
+    """
+    Run the handlers of the events collected during a committed transaction, see `management.events`.
+    """
+    events.process(dirty_ids)
@@ -1,3 +1,95 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from management import events
+
+processed = []
+
+
+@events.handler("tests.recorded")
+def record(ids):
+    processed.append(ids)
+
+
+class DeferredEventsTests(TestCase):
+    def setUp(self):
+        processed.clear()
+
+    def test_processed_once_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            events.mark_dirty("tests.recorded", [3, 1])
+            events.mark_dirty("tests.recorded", [1, 2, None])
+            self.assertEqual(processed, [])
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(processed, [[1, 2, 3]])
+
+    def test_processed_in_batches(self):
+        with override_settings(DEFERRED_EVENTS_BATCH_SIZE=2), self.captureOnCommitCallbacks(execute=True):
+            events.mark_dirty("tests.recorded", range(5))
+
+        self.assertEqual(processed, [[0, 1], [2, 3], [4]])
+
+    def test_rolled_back_ids_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    events.mark_dirty("tests.recorded", [1])
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            events.mark_dirty("tests.recorded", [2])
+
+        self.assertEqual(processed, [[2]])
+
+    def test_flush_per_savepoint(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            # the flush of a released savepoint is shared with the enclosing transaction...
+            with transaction.atomic():
+                events.mark_dirty("tests.recorded", [1])
+            events.mark_dirty("tests.recorded", [2])
+            # ...not the other way around: the ids of a savepoint are dropped with it.
+            with transaction.atomic():
+                events.mark_dirty("tests.recorded", [3])
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    events.mark_dirty("tests.recorded", [4])
+                    raise RuntimeError
+                events.mark_dirty("tests.recorded", [5])
+
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(processed, [[1, 2], [3, 5]])
+
+    def test_next_transaction_starts_empty(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            events.mark_dirty("tests.recorded", [1])
+        with self.captureOnCommitCallbacks(execute=True):
+            events.mark_dirty("tests.recorded", [2])
+
+        self.assertEqual(processed, [[1], [2]])
+
+    def test_flush_per_alias(self):
+        with self.captureOnCommitCallbacks(execute=True, using="default") as callbacks:
+            events.mark_dirty("tests.recorded", [1], using="default")
+            self.assertIsNotNone(events.get_flush(using="default"))
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNone(events.get_flush(using="default"))
+
+    def test_unknown_event(self):
+        with self.assertRaises(KeyError):
+            events.mark_dirty("tests.unknown", [1])
+
+
+class CeleryHealthCommandTests(SimpleTestCase):
+    def test_store_with_broker_url(self):
+        with self.assertRaisesMessage(CommandError, "--store cannot be combined with --broker-url"):
+            call_command("celery_health", broker_url="memory://", store=True, stdout=StringIO())
+
+    def test_broker_without_workers(self):
+        stdout = StringIO()
+        with self.assertRaisesMessage(CommandError, "Celery is not healthy"):
+            call_command("celery_health", broker_url="memory://", timeout=0.1, stdout=stdout)
+        self.assertIn("broker: Connected", stdout.getvalue())
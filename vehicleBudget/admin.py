@@ -6,3 +6,4 @@ admin.site.register(VehicleMaintenance)
 admin.site.register(DocumentCost)
 admin.site.register(FuelConsumption)
 admin.site.register(FinancialRecord)
+admin.site.register(ExpenseRollup)
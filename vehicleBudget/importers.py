@@ -0,0 +1,343 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils.dateparse import parse_date
+
+from management import events
+from management.models import Vehicle
+from vehicleBudget.models import DocumentCost, FinancialRecord, FuelConsumption, PaymentMixin
+from vehicleHub.models import Document, Fuel, Partner
+
+
+class RowError(ValueError):
+    pass
+
+
+def normalize(value):
+    return str(value).strip().lower()
+
+
+class BaseImporter:
+    """
+    Streams CSV or NDJSON rows into `model`: every row is validated as it is read, the valid ones are
+    written with `bulk_create` every `batch_size` rows, and the invalid ones are reported with their line.
+    A batch the database rejects is rolled back alone and reported with its lines, as `failed` rows.
+    A file that cannot be read to its end (undecodable bytes, broken CSV) stops the import: the rows read until
+    then are written, and the report says why in `error`.
+    Foreign keys are resolved through the in-memory maps built by `load_lookups()`, not per row.
+    """
+
+    model = None
+    formats = ("csv", "ndjson")
+    max_reported_errors = 100
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+
+    def load_lookups(self):
+        pass
+
+    def build(self, row):
+        raise NotImplementedError
+
+    def save(self, instances):
+        return self.model.objects.bulk_create(instances)
+
+    def after_import(self):
+        pass
+
+    def read(self, stream, file_format):
+        if file_format == "csv":
+            # a stray quote would otherwise swallow the next lines into a field.
+            reader = csv.DictReader(stream, strict=True)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(stream, start=1):
+                if line.strip():
+                    yield line_number, line
+
+    def decode(self, row, file_format):
+        if file_format == "csv":
+            return row
+        try:
+            row = json.loads(row)
+        except ValueError:
+            raise RowError("invalid JSON")
+        if not isinstance(row, dict):
+            raise RowError("a JSON object is expected")
+        return row
+
+    def add_error(self, report, line_number, error):
+        if len(report["errors"]) < self.max_reported_errors:
+            report["errors"].append({"line": line_number, "error": str(error)})
+
+    def write(self, batch, lines, report):
+        try:
+            with transaction.atomic():
+                report["imported"] += len(self.save(batch))
+        except DatabaseError as error:
+            report["failed"] += len(batch)
+            self.add_error(report, lines[0], f"lines {lines[0]}-{lines[-1]} not written: {error}")
+
+    def run(self, stream, file_format):
+        if file_format not in self.formats:
+            raise ValueError(f"Unsupported format: {file_format}")
+
+        self.load_lookups()
+        report = {"rows": 0, "imported": 0, "invalid": 0, "failed": 0, "error": None, "errors": []}
+        started_at = time.perf_counter()
+
+        batch, lines, line_number = [], [], 0
+        try:
+            for line_number, row in self.read(stream, file_format):
+                report["rows"] += 1
+                try:
+                    batch.append(self.build(self.decode(row, file_format)))
+                    lines.append(line_number)
+                except RowError as error:
+                    report["invalid"] += 1
+                    self.add_error(report, line_number, error)
+
+                if len(batch) >= self.batch_size:
+                    self.write(batch, lines, report)
+                    batch, lines = [], []
+        except (UnicodeDecodeError, csv.Error) as error:
+            report["error"] = f"unreadable after line {line_number}: {error}"
+        if batch:
+            self.write(batch, lines, report)
+
+        self.after_import()
+        elapsed = time.perf_counter() - started_at
+        report["seconds"] = round(elapsed, 3)
+        report["rows_per_second"] = round(report["rows"] / elapsed, 1) if elapsed else None
+        return report
+
+    ######################################
+    # FIELD PARSING
+    ######################################
+
+    def get_value(self, row, field, required=False):
+        value = row.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ""):
+            if required:
+                raise RowError(f"{field}: this field is required")
+            return None
+        return value
+
+    def parse_str(self, row, field, max_length, required=False):
+        value = self.get_value(row, field, required)
+        if value is None:
+            return None
+        value = str(value)
+        if len(value) > max_length:
+            raise RowError(f"{field}: at most {max_length} characters")
+        return value
+
+    def lookup(self, mapping, row, field, required=True):
+        value = self.get_value(row, field, required)
+        if value is None:
+            return None
+        try:
+            return mapping[normalize(value)]
+        except KeyError:
+            raise RowError(f"{field}: unknown value {value!r}")
+
+    def parse_int(self, row, field, required=False):
+        value = self.get_value(row, field, required)
+        if value is None:
+            return None
+        # JSON booleans are ints, and int() truncates the JSON numbers: true is not 1, nor 12.5 12.
+        if isinstance(value, bool):
+            raise RowError(f"{field}: {value!r} is not an integer")
+        try:
+            number = int(value)
+        except (TypeError, ValueError, OverflowError):
+            raise RowError(f"{field}: {value!r} is not an integer")
+        if not isinstance(value, str) and number != value:
+            raise RowError(f"{field}: {value!r} is not an integer")
+        value = number
+        if value < 0:
+            raise RowError(f"{field}: must be positive")
+        return value
+
+    def parse_decimal(self, row, field, max_digits, decimal_places, required=False):
+        value = self.get_value(row, field, required)
+        if value is None:
+            return None
+        try:
+            number = Decimal(str(value))
+            # NaN would be stored as is, and infinities are rejected by the database only.
+            if not number.is_finite():
+                raise InvalidOperation
+            number = number.quantize(Decimal(1).scaleb(-decimal_places))
+        except InvalidOperation:
+            raise RowError(f"{field}: {value!r} is not a number")
+        if len(number.as_tuple().digits) > max_digits:
+            raise RowError(f"{field}: at most {max_digits} digits")
+        return number
+
+    def parse_date(self, row, field, required=False):
+        value = self.get_value(row, field, required)
+        if value is None:
+            return None
+        try:
+            parsed = parse_date(str(value))
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise RowError(f"{field}: {value!r} is not a date (YYYY-MM-DD)")
+        return parsed
+
+    def parse_choice(self, row, field, choices, default=None):
+        value = self.get_value(row, field)
+        if value is None:
+            return default
+        # both the stored value and its label are accepted.
+        for choice, label in choices:
+            if normalize(value) in (normalize(choice), normalize(label)):
+                return choice
+        raise RowError(f"{field}: {value!r} is not a valid choice")
+
+
+class LedgerImporter(BaseImporter):
+    """
+    Importer of payments mirrored in the `FinancialRecord` ledger. Rows carrying an `external_reference`
+    are upserted on it, so that a retried import updates the rows it already wrote instead of duplicating
+    them; the ledger records are upserted on their source in the same way.
+    """
+
+    ledger_field = None
+    summary_section = None
+
+    def load_lookups(self):
+        self.vehicle_ids = set()
+
+    def get_vehicle_id(self, instance):
+        raise NotImplementedError
+
+    def get_update_fields(self):
+        excluded = {"id", "created_by", "created_at", "updated_at", "external_reference"}
+        return [field.name for field in self.model._meta.concrete_fields if field.name not in excluded]
+
+    def save(self, instances):
+        # the last row wins when a reference appears twice in the batch, an upsert cannot touch a row twice.
+        referenced = {instance.external_reference: instance for instance in instances if instance.external_reference}
+        instances = [instance for instance in instances if not instance.external_reference] + list(referenced.values())
+
+        instances = self.model.objects.bulk_create(
+            instances,
+            update_conflicts=True,
+            unique_fields=["external_reference"],
+            update_fields=self.get_update_fields(),
+        )
+
+        # `bulk_create` sends no `post_save`: the ledger records are written here, in bulk as well.
+        FinancialRecord.objects.sync(self.ledger_field, [instance.id for instance in instances])
+        self.vehicle_ids.update(self.get_vehicle_id(instance) for instance in instances)
+        return instances
+
+    def after_import(self):
+        events.mark_dirty(f"summary.{self.summary_section}", self.vehicle_ids)
+
+
+class FuelConsumptionImporter(LedgerImporter):
+    """
+    Fuel-card fill-ups. Columns: external_reference (transaction id of the provider), vehicle (license plate
+    or VIN), fuel_type, partner (email, NIF or partnership name), date, quantity, quantity_type, fuel_cost,
+    payment_amount, payment_method, payment_date.
+    The payment amount and date default to the fuel cost and the fill-up date.
+    """
+
+    model = FuelConsumption
+    ledger_field = "fuel_consumption"
+    summary_section = "fuel"
+
+    def load_lookups(self):
+        super().load_lookups()
+        self.vehicles = {}
+        for vehicle_id, license_plate_number, vin_number in Vehicle.objects.values_list(
+            "id", "license_plate_number", "vin_number"
+        ):
+            self.vehicles[normalize(license_plate_number)] = vehicle_id
+            self.vehicles[normalize(vin_number)] = vehicle_id
+
+        self.fuels = {
+            normalize(fuel_type): fuel_id for fuel_id, fuel_type in Fuel.objects.values_list("id", "fuel_type")
+        }
+
+        self.partners = {}
+        for partner_id, *keys in Partner.objects.values_list("id", "email", "companyNIF", "partnership__name"):
+            for key in keys:
+                if key:
+                    self.partners[normalize(key)] = partner_id
+
+    def get_vehicle_id(self, instance):
+        return instance.vehicle_id
+
+    def build(self, row):
+        date = self.parse_date(row, "date", required=True)
+        fuel_cost = self.parse_int(row, "fuel_cost", required=True)
+        payment_amount = self.parse_int(row, "payment_amount")
+        payment_date = self.parse_date(row, "payment_date")
+        return FuelConsumption(
+            external_reference=self.parse_str(row, "external_reference", max_length=100),
+            vehicle_id=self.lookup(self.vehicles, row, "vehicle"),
+            fuel_type_id=self.lookup(self.fuels, row, "fuel_type"),
+            partner_id=self.lookup(self.partners, row, "partner"),
+            date=date,
+            quantity=self.parse_decimal(row, "quantity", max_digits=5, decimal_places=2),
+            quantity_type=self.parse_choice(
+                row, "quantity_type", FuelConsumption.QuantityType.choices, FuelConsumption.QuantityType.LITER
+            ),
+            fuel_cost=fuel_cost,
+            payment_amount=payment_amount if payment_amount is not None else fuel_cost,
+            payment_method=self.parse_choice(
+                row, "payment_method", PaymentMixin.PaymentMethods.choices, PaymentMixin.PaymentMethods.CASH
+            ),
+            payment_date=payment_date or date,
+        )
+
+
+class DocumentCostImporter(LedgerImporter):
+    """
+    Document costs (insurance, road tax, ...). Columns: external_reference, document (id), payment_amount,
+    payment_method, payment_date, notes.
+    """
+
+    model = DocumentCost
+    ledger_field = "document_cost"
+    summary_section = "documents"
+
+    def load_lookups(self):
+        super().load_lookups()
+        # document id -> vehicle the document was issued for
+        self.documents = dict(Document.objects.values_list("id", "issued_vehicle_id"))
+        self.document_ids = {normalize(document_id): document_id for document_id in self.documents}
+
+    def get_vehicle_id(self, instance):
+        return self.documents[instance.document_id]
+
+    def build(self, row):
+        return DocumentCost(
+            external_reference=self.parse_str(row, "external_reference", max_length=100),
+            document_id=self.lookup(self.document_ids, row, "document"),
+            payment_amount=self.parse_int(row, "payment_amount", required=True),
+            payment_method=self.parse_choice(
+                row, "payment_method", PaymentMixin.PaymentMethods.choices, PaymentMixin.PaymentMethods.CASH
+            ),
+            payment_date=self.parse_date(row, "payment_date"),
+            notes=self.parse_str(row, "notes", max_length=250),
+        )
+
+
+IMPORTERS = {
+    "fuel-consumptions": FuelConsumptionImporter,
+    "document-costs": DocumentCostImporter,
+}
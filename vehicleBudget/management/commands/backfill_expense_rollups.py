@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from vehicleBudget.models import ExpenseRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily and monthly expense rollups from the financial records, one month at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+        parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="last day (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        bounds = ExpenseRollup.objects.get_ledger().aggregate(first=Min("expense_date"), last=Max("expense_date"))
+        date_from = options["date_from"] or bounds["first"]
+        date_to = options["date_to"] or bounds["last"]
+        if date_from is None or date_to is None:
+            self.stdout.write("The ledger is empty, nothing to rebuild.")
+            return
+        if date_from > date_to:
+            raise CommandError("--from must not be after --to.")
+
+        start = date_from
+        while start <= date_to:
+            end = min((start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1), date_to)
+            ExpenseRollup.objects.rebuild(date_from=start, date_to=end)
+            self.stdout.write(f"{start} - {end} rebuilt.")
+            start = end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Expense rollups rebuilt from {date_from} to {date_to}."))
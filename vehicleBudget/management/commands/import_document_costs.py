@@ -0,0 +1,8 @@
+from vehicleBudget.importers import DocumentCostImporter
+from vehicleBudget.management.commands.import_fuel_consumptions import Command as ImportCommand
+
+
+class Command(ImportCommand):
+    help = "Import document costs from a CSV or NDJSON file and report the throughput (rows per second)."
+
+    importer_class = DocumentCostImporter
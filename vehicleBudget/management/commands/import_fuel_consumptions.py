@@ -0,0 +1,37 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vehicleBudget.importers import FuelConsumptionImporter
+
+
+class Command(BaseCommand):
+    help = "Import fuel-card fill-ups from a CSV or NDJSON file and report the throughput (rows per second)."
+
+    importer_class = FuelConsumptionImporter
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="file to import")
+        parser.add_argument("--file-format", choices=self.importer_class.formats, help="defaults to the extension")
+        parser.add_argument("--batch-size", type=int, help="rows written per bulk insert")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["file_format"] or os.path.splitext(path)[1].lstrip(".").lower()
+        importer = self.importer_class(batch_size=options["batch_size"])
+
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as stream:
+                report = importer.run(stream, file_format)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+
+        for error in report["errors"]:
+            self.stdout.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(
+            f"rows: {report['rows']}, imported: {report['imported']}, invalid: {report['invalid']}, "
+            f"failed: {report['failed']}"
+        )
+        if report["error"]:
+            raise CommandError(f"The import stopped, the file is {report['error']}")
+        self.stdout.write(self.style.SUCCESS(f"throughput: {report['rows_per_second']} rows/s ({report['seconds']}s)"))
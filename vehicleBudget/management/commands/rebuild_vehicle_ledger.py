@@ -0,0 +1,94 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from management.models import Vehicle, VehicleDriverAssignment
+from vehicleBudget.models import DocumentCost, FuelConsumption, VehicleCostSummary, VehicleMaintenance
+from vehicleHub.models import Document, IssueReport
+
+
+class Command(BaseCommand):
+    help = "Rebuild the vehicle cost summaries from scratch and verify them against live aggregates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="vehicles refreshed per query")
+        parser.add_argument("--verify-only", action="store_true", help="only compare the summaries to the sources")
+
+    def handle(self, *args, **options):
+        if not options["verify_only"]:
+            self.rebuild(options["batch_size"])
+
+        mismatches = self.verify()
+        for vehicle_id, field, stored, live in mismatches:
+            self.stdout.write(f"vehicle {vehicle_id} :: {field}: stored {stored}, live {live}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} summary values do not match the live aggregates.")
+        self.stdout.write(self.style.SUCCESS("Vehicle cost summaries match the live aggregates."))
+
+    def rebuild(self, batch_size):
+        vehicle_ids = list(Vehicle.objects.order_by("id").values_list("id", flat=True))
+        with transaction.atomic():
+            VehicleCostSummary.objects.all().delete()
+            for start in range(0, len(vehicle_ids), batch_size):
+                VehicleCostSummary.objects.refresh(vehicle_ids[start : start + batch_size])
+        self.stdout.write(f"{len(vehicle_ids)} vehicle cost summaries rebuilt.")
+
+    def get_live_values(self):
+        # grouped aggregates over each source table, independent from the summary queries.
+        live = defaultdict(lambda: dict.fromkeys(VehicleCostSummary.objects.summary_fields(), 0))
+
+        for row in FuelConsumption.objects.values("vehicle").annotate(total=Sum("fuel_cost"), count=Count("id")):
+            live[row["vehicle"]].update(fuel_total=row["total"] or 0, total_fuel_records=row["count"])
+
+        for row in (
+            Document.objects.filter(issued_vehicle__isnull=False).values("issued_vehicle").annotate(count=Count("id"))
+        ):
+            live[row["issued_vehicle"]]["total_documents"] = row["count"]
+
+        for row in (
+            DocumentCost.objects.filter(document__issued_vehicle__isnull=False)
+            .values("document__issued_vehicle")
+            .annotate(total=Sum("payment_amount"))
+        ):
+            live[row["document__issued_vehicle"]]["document_total"] = row["total"] or 0
+
+        for row in IssueReport.objects.filter(vehicle__isnull=False).values("vehicle").annotate(count=Count("id")):
+            live[row["vehicle"]]["reported_issues"] = row["count"]
+
+        for row in VehicleDriverAssignment.objects.values("vehicle").annotate(
+            total=Count("id"),
+            active=Count("id", filter=Q(assignment_status=VehicleDriverAssignment.AssignmentStatus.ACTIVE)),
+        ):
+            live[row["vehicle"]].update(total_drivers=row["total"], active_drivers=row["active"])
+
+        maintenances = (
+            VehicleMaintenance.objects.filter(issue_reports__vehicle__isnull=False)
+            .values_list("issue_reports__vehicle", "id", "payment_amount")
+            .distinct()
+        )
+        for vehicle_id, maintenance_id, payment_amount in maintenances:
+            live[vehicle_id]["maintenance_total"] += payment_amount or 0
+            live[vehicle_id]["total_maintenances"] += 1
+
+        return live
+
+    def verify(self):
+        live = self.get_live_values()
+        fields = VehicleCostSummary.objects.summary_fields()
+
+        mismatches = []
+        summaries = VehicleCostSummary.objects.values("vehicle_id", *fields)
+        summarized = set()
+        for summary in summaries.iterator():
+            vehicle_id = summary.pop("vehicle_id")
+            summarized.add(vehicle_id)
+            live_values = live.get(vehicle_id, dict.fromkeys(fields, 0))
+            for field in fields:
+                if summary[field] != live_values[field]:
+                    mismatches.append((vehicle_id, field, summary[field], live_values[field]))
+
+        for vehicle_id in set(live) - summarized:
+            mismatches.append((vehicle_id, "summary", None, "missing"))
+        return mismatches
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from vehicleBudget.models import FinancialRecord
+
+
+class Command(BaseCommand):
+    help = "Diff the financial records against their fuel, document and maintenance payments and repair them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="payments resynchronized per query")
+        parser.add_argument("--dry-run", action="store_true", help="only report the differences")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        unsynced_total = 0
+
+        for source_field in FinancialRecord.objects.SOURCES:
+            missing, mismatched, stale = FinancialRecord.objects.get_unsynced_sources(source_field)
+            source_ids = sorted(set(missing) | set(mismatched) | set(stale))
+            unsynced_total += len(source_ids)
+            self.stdout.write(
+                f"{source_field}: {len(missing)} missing, {len(mismatched)} mismatched, {len(stale)} stale records"
+            )
+
+            if options["dry_run"] or not source_ids:
+                continue
+            for start in range(0, len(source_ids), batch_size):
+                with transaction.atomic():
+                    FinancialRecord.objects.sync(source_field, source_ids[start : start + batch_size])
+
+        if options["dry_run"]:
+            if unsynced_total:
+                raise CommandError(f"{unsynced_total} payments are out of sync with the ledger.")
+            self.stdout.write(self.style.SUCCESS("The ledger matches the payments."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{unsynced_total} payments resynchronized."))
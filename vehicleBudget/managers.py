@@ -0,0 +1,371 @@
+from datetime import datetime, time, timedelta
+
+from django.apps import apps
+from django.db import connections, models, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from django.utils import timezone
+
+from management import events
+
+# key of the PostgreSQL advisory lock serializing the expense rollup rebuilds.
+EXPENSE_ROLLUP_LOCK_ID = 7301
+
+
+def aggregate_subquery(queryset, aggregate):
+    # single-row correlated subquery: the aggregate is computed over the whole (filtered) queryset.
+    return Coalesce(
+        Subquery(
+            queryset.order_by().annotate(_group=Value(1)).values("_group").annotate(value=aggregate).values("value")
+        ),
+        0,
+    )
+
+
+def date_bounds(field, date_from=None, date_to=None):
+    bounds = Q()
+    if date_from is not None:
+        bounds &= Q(**{f"{field}__gte": date_from})
+    if date_to is not None:
+        bounds &= Q(**{f"{field}__lte": date_to})
+    return bounds
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def expense_date_filter(days=None, date_from=None, date_to=None):
+    """
+    Financial records whose expense date (the record date, or the creation date when it has none) is one of
+    `days`, or in the `date_from`-`date_to` range. Written on the columns rather than on the computed date,
+    so that `financial_record_date_idx` is used.
+    """
+    if days is not None:
+        created = Q()
+        for day in days:
+            created |= Q(created_at__gte=day_start(day), created_at__lt=day_start(day + timedelta(days=1)))
+        return Q(record_date__in=days) | (Q(record_date__isnull=True) & created)
+
+    created = Q()
+    if date_from is not None:
+        created &= Q(created_at__gte=day_start(date_from))
+    if date_to is not None:
+        created &= Q(created_at__lt=day_start(date_to + timedelta(days=1)))
+    return (Q(record_date__isnull=False) & date_bounds("record_date", date_from, date_to)) | (
+        Q(record_date__isnull=True) & created
+    )
+
+
+class VehicleMaintenanceQuerySet(models.QuerySet):
+    def recompute_payment_amounts(self):
+        """
+        Set the payment amount of every maintenance of the queryset to the sum of its issue costs,
+        with a single UPDATE driven by a correlated subquery.
+        `update()` does not send `post_save`, so the financial records and the vehicle cost summaries
+        of the maintenances are synchronized here as well.
+        """
+        FinancialRecord = apps.get_model("vehicleBudget.FinancialRecord")
+        IssueReport = apps.get_model("vehicleHub.IssueReport")
+        VehicleCostSummary = apps.get_model("vehicleBudget.VehicleCostSummary")
+
+        maintenance_ids = list(self.values_list("id", flat=True))
+        if not maintenance_ids:
+            return 0
+
+        maintenances = self.model.objects.filter(id__in=maintenance_ids)
+        updated = maintenances.update(
+            payment_amount=aggregate_subquery(
+                IssueReport.objects.filter(maintenance=OuterRef("pk")), Sum("issue_cost")
+            )
+        )
+        FinancialRecord.objects.sync("vehicle_maintenance", maintenance_ids)
+        vehicle_ids = IssueReport.objects.filter(maintenance__in=maintenance_ids).values_list("vehicle_id", flat=True)
+        VehicleCostSummary.objects.refresh(vehicle_ids, sections=["maintenance"])
+        return updated
+
+
+class FinancialRecordManager(models.Manager):
+    # ledger source field -> model of the payment it mirrors
+    SOURCES = {
+        "fuel_consumption": "vehicleBudget.FuelConsumption",
+        "document_cost": "vehicleBudget.DocumentCost",
+        "vehicle_maintenance": "vehicleBudget.VehicleMaintenance",
+    }
+    # ledger column -> payment column of the source
+    SYNCED_FIELDS = {"cost": "payment_amount", "payment_method": "payment_method", "record_date": "payment_date"}
+
+    def get_sources(self, source_field):
+        """
+        The payments of `source_field` that belong in the ledger: maintenances only once approved and finished.
+        """
+        model = apps.get_model(self.SOURCES[source_field])
+        sources = model.objects.order_by()
+        if source_field == "vehicle_maintenance":
+            sources = sources.filter(status=model.Status.APPROVED, maintenance_end_date__isnull=False)
+        return sources
+
+    def sync(self, source_field, source_ids):
+        """
+        Upsert the financial records of the given payments, keyed on their source (one record per payment).
+        Payments that do not belong in the ledger (anymore: a maintenance no longer approved or finished)
+        lose their record.
+        """
+        ExpenseRollup = apps.get_model("vehicleBudget.ExpenseRollup")
+
+        source_ids = list(source_ids)
+        sources = self.get_sources(source_field)
+        # the rollups of the days the records leave and of the days they land on are rebuilt on commit.
+        expense_dates = ExpenseRollup.objects.get_expense_dates(source_field, source_ids)
+
+        stale = self.filter(**{f"{source_field}__in": source_ids}).exclude(**{f"{source_field}__in": sources})
+        # records written before one record per payment also hold other payments: they only lose this one.
+        other_sources = {f"{field}__isnull": True for field in self.SOURCES if field != source_field}
+        stale.filter(**other_sources).delete()
+        stale.update(**{source_field: None})
+
+        rows = sources.filter(id__in=source_ids).values("id", *self.SYNCED_FIELDS.values())
+        records = self.bulk_create(
+            [
+                self.model(
+                    **{f"{source_field}_id": row["id"]},
+                    **{field: row[source] for field, source in self.SYNCED_FIELDS.items()},
+                )
+                for row in rows
+            ],
+            update_conflicts=True,
+            unique_fields=[source_field],
+            update_fields=list(self.SYNCED_FIELDS),
+        )
+
+        expense_dates |= ExpenseRollup.objects.get_expense_dates(source_field, source_ids)
+        events.mark_dirty("expense_rollups.days", [expense_date.isoformat() for expense_date in expense_dates])
+        return records
+
+    def get_unsynced_sources(self, source_field):
+        """
+        Set-based diff of the ledger against the payments of `source_field`: the payments without a record,
+        the payments whose record holds other values, and the payments holding a record they should not.
+        """
+        sources = self.get_sources(source_field)
+        missing = sources.exclude(Exists(self.filter(**{source_field: OuterRef("pk")})))
+
+        differs = Q()
+        for field, source in self.SYNCED_FIELDS.items():
+            source = f"{source_field}__{source}"
+            same = Q(**{field: F(source)}) | Q(**{f"{field}__isnull": True, f"{source}__isnull": True})
+            differs |= ~same
+        mismatched = self.filter(**{f"{source_field}__in": sources}).filter(differs)
+        stale = self.filter(**{f"{source_field}__isnull": False}).exclude(**{f"{source_field}__in": sources})
+        return (
+            missing.values_list("id", flat=True),
+            mismatched.values_list(source_field, flat=True),
+            stale.values_list(source_field, flat=True),
+        )
+
+
+class VehicleCostSummaryManager(models.Manager):
+    # the summary fields maintained together, by the source they are computed from.
+    SECTIONS = {
+        "maintenance": ("maintenance_total", "total_maintenances"),
+        "fuel": ("fuel_total", "total_fuel_records"),
+        "documents": ("document_total", "total_documents"),
+        "issues": ("reported_issues",),
+        "assignments": ("total_drivers", "active_drivers"),
+    }
+
+    def summary_fields(self):
+        return [field for fields in self.SECTIONS.values() for field in fields]
+
+    def get_section_annotations(self, section):
+        Document = apps.get_model("vehicleHub.Document")
+        DocumentCost = apps.get_model("vehicleBudget.DocumentCost")
+        FuelConsumption = apps.get_model("vehicleBudget.FuelConsumption")
+        IssueReport = apps.get_model("vehicleHub.IssueReport")
+        VehicleDriverAssignment = apps.get_model("management.VehicleDriverAssignment")
+        VehicleMaintenance = apps.get_model("vehicleBudget.VehicleMaintenance")
+
+        vehicle = OuterRef("pk")
+        if section == "maintenance":
+            # a maintenance covering several reports of the same vehicle is only counted once.
+            maintenances = VehicleMaintenance.objects.filter(
+                Exists(IssueReport.objects.filter(maintenance=OuterRef("pk"), vehicle=OuterRef(vehicle)))
+            )
+            return {
+                "maintenance_total": aggregate_subquery(maintenances, Sum("payment_amount")),
+                "total_maintenances": aggregate_subquery(maintenances, Count("id")),
+            }
+        elif section == "fuel":
+            consumptions = FuelConsumption.objects.filter(vehicle=vehicle)
+            return {
+                "fuel_total": aggregate_subquery(consumptions, Sum("fuel_cost")),
+                "total_fuel_records": aggregate_subquery(consumptions, Count("id")),
+            }
+        elif section == "documents":
+            return {
+                "document_total": aggregate_subquery(
+                    DocumentCost.objects.filter(document__issued_vehicle=vehicle), Sum("payment_amount")
+                ),
+                "total_documents": aggregate_subquery(Document.objects.filter(issued_vehicle=vehicle), Count("id")),
+            }
+        elif section == "issues":
+            return {"reported_issues": aggregate_subquery(IssueReport.objects.filter(vehicle=vehicle), Count("id"))}
+        elif section == "assignments":
+            assignments = VehicleDriverAssignment.objects.filter(vehicle=vehicle)
+            return {
+                "total_drivers": aggregate_subquery(assignments, Count("id")),
+                "active_drivers": aggregate_subquery(
+                    assignments,
+                    Count("id", filter=Q(assignment_status=VehicleDriverAssignment.AssignmentStatus.ACTIVE)),
+                ),
+            }
+        raise ValueError(f"Unknown summary section: {section}")
+
+    def refresh(self, vehicle_ids, sections=None, create=True):
+        """
+        Recompute the given sections (all of them by default) of the vehicles' summaries
+        with one set-based query, then upsert the rows.
+        With create=False, vehicles without a summary are left alone (e.g. while a vehicle is being deleted).
+        """
+        Vehicle = apps.get_model("management.Vehicle")
+
+        vehicle_ids = set(vehicle_ids) - {None}
+        if not vehicle_ids:
+            return
+        sections = sections or list(self.SECTIONS)
+
+        # vehicles without a summary yet need every section.
+        existing = set(self.filter(vehicle_id__in=vehicle_ids).values_list("vehicle_id", flat=True))
+        missing = vehicle_ids - existing if create else set()
+        for ids, refreshed_sections in ((existing, sections), (missing, list(self.SECTIONS))):
+            if not ids:
+                continue
+            fields = [field for section in refreshed_sections for field in self.SECTIONS[section]]
+            annotations = {}
+            for section in refreshed_sections:
+                annotations.update(self.get_section_annotations(section))
+
+            rows = Vehicle.objects.filter(id__in=ids).order_by().annotate(**annotations).values("id", *fields)
+            self.bulk_create(
+                [self.model(vehicle_id=row.pop("id"), **row) for row in rows],
+                update_conflicts=True,
+                unique_fields=["vehicle"],
+                update_fields=fields + ["updated_at"],
+            )
+
+
+class ExpenseRollupManager(models.Manager):
+    def get_ledger(self):
+        """
+        Financial records annotated with the rollup dimensions: the expense date (the record date, or the
+        creation date when it has none), the vehicle of the source payment and the expense type.
+        """
+        ExpenseRollup = self.model
+        FinancialRecord = apps.get_model("vehicleBudget.FinancialRecord")
+        IssueReport = apps.get_model("vehicleHub.IssueReport")
+
+        # a maintenance covering several vehicles is counted for the first one.
+        maintenance_vehicle = Subquery(
+            IssueReport.objects.filter(maintenance=OuterRef("vehicle_maintenance"))
+            .order_by("vehicle_id")
+            .values("vehicle_id")[:1]
+        )
+        return FinancialRecord.objects.order_by().annotate(
+            expense_date=Coalesce("record_date", TruncDate("created_at")),
+            expense_vehicle=Coalesce(
+                "fuel_consumption__vehicle",
+                "document_cost__document__issued_vehicle",
+                maintenance_vehicle,
+                output_field=models.BigIntegerField(),
+            ),
+            expense_type=Case(
+                When(fuel_consumption__isnull=False, then=Value(ExpenseRollup.ExpenseType.FUEL)),
+                When(document_cost__isnull=False, then=Value(ExpenseRollup.ExpenseType.DOCUMENT)),
+                default=Value(ExpenseRollup.ExpenseType.MAINTENANCE),
+            ),
+        )
+
+    def get_expense_dates(self, source_field, source_ids):
+        records = self.get_ledger().filter(**{f"{source_field}__in": source_ids})
+        return set(records.values_list("expense_date", flat=True)) - {None}
+
+    def lock(self):
+        # two transactions committing payments of the same day would both rebuild, and insert, its buckets;
+        # unique_expense_rollup_bucket does not cover the buckets without a vehicle (NULLs are distinct).
+        connection = connections[self.db]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [EXPENSE_ROLLUP_LOCK_ID])
+
+    def rebuild(self, days=None, date_from=None, date_to=None):
+        """
+        Rebuild the day buckets of `days`, or of the `date_from`-`date_to` range (bounds included, everything
+        by default), from the ledger; then the month buckets containing them, from the day buckets of their
+        whole month. The rebuilds are serialized: concurrent ones cannot insert the same bucket twice.
+        """
+        Granularity = self.model.Granularity
+
+        if days is not None:
+            days = set(days)
+            months = {day.replace(day=1) for day in days}
+            ledger = self.get_ledger().filter(expense_date_filter(days=days))
+            day_filter = Q(period__in=days)
+
+            def month_filter(field):
+                return Q(**{f"{field}__in": months})
+
+        else:
+            # month buckets are dated on their first day.
+            month_from = date_from.replace(day=1) if date_from else None
+            ledger = self.get_ledger().filter(expense_date_filter(date_from=date_from, date_to=date_to))
+            day_filter = date_bounds("period", date_from, date_to)
+
+            def month_filter(field):
+                return date_bounds(field, month_from, date_to)
+
+        day_totals = ledger.values("expense_date", "expense_vehicle", "payment_method", "expense_type").annotate(
+            total=Coalesce(Sum("cost"), Value(0), output_field=models.DecimalField()), records=Count("id")
+        )
+        with transaction.atomic(using=self.db):
+            self.lock()
+            self.filter(day_filter, granularity=Granularity.DAY).delete()
+            self.bulk_create(
+                [
+                    self.model(
+                        granularity=Granularity.DAY,
+                        period=row["expense_date"],
+                        vehicle_id=row["expense_vehicle"],
+                        payment_method=row["payment_method"],
+                        expense_type=row["expense_type"],
+                        total=row["total"],
+                        records=row["records"],
+                    )
+                    for row in day_totals
+                ],
+                batch_size=1000,
+            )
+
+            # the day buckets of the other days of the months are already built (see backfill_expense_rollups).
+            month_totals = (
+                self.filter(granularity=Granularity.DAY)
+                .annotate(month=TruncMonth("period"))
+                .filter(month_filter("month"))
+                .values("month", "vehicle_id", "payment_method", "expense_type")
+                .annotate(month_total=Sum("total"), month_records=Sum("records"))
+            )
+            self.filter(month_filter("period"), granularity=Granularity.MONTH).delete()
+            self.bulk_create(
+                [
+                    self.model(
+                        granularity=Granularity.MONTH,
+                        period=row["month"],
+                        vehicle_id=row["vehicle_id"],
+                        payment_method=row["payment_method"],
+                        expense_type=row["expense_type"],
+                        total=row["month_total"],
+                        records=row["month_records"],
+                    )
+                    for row in month_totals
+                ],
+                batch_size=1000,
+            )
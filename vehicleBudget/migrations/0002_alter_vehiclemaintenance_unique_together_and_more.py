@@ -0,0 +1,95 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("management", "0003_alter_vehicle_vehicle_image_and_more"),
+        ("vehicleBudget", "0001_initial"),
+        ("vehicleHub", "0002_issuereport_is_fixed_issuereport_issue_cost_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="vehiclemaintenance",
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name="vehiclemaintenance",
+            name="issue_reports",
+            field=models.ManyToManyField(
+                blank=True, related_name="maintenances", related_query_name="maintenance", to="vehicleHub.issuereport"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="financialrecord",
+            name="cost",
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True),
+        ),
+        migrations.AlterField(
+            model_name="financialrecord",
+            name="document_cost",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="financial_records",
+                to="vehicleBudget.documentcost",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="financialrecord",
+            name="fuel_consumption",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="financial_records",
+                to="vehicleBudget.fuelconsumption",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="financialrecord",
+            name="vehicle_maintenance",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="financial_records",
+                to="vehicleBudget.vehiclemaintenance",
+            ),
+        ),
+        migrations.CreateModel(
+            name="VehicleCostSummary",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("maintenance_total", models.PositiveBigIntegerField(default=0)),
+                ("fuel_total", models.PositiveBigIntegerField(default=0)),
+                ("document_total", models.PositiveBigIntegerField(default=0)),
+                ("total_drivers", models.PositiveIntegerField(default=0)),
+                ("active_drivers", models.PositiveIntegerField(default=0)),
+                ("reported_issues", models.PositiveIntegerField(default=0)),
+                ("total_maintenances", models.PositiveIntegerField(default=0)),
+                ("total_fuel_records", models.PositiveIntegerField(default=0)),
+                ("total_documents", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "vehicle",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cost_summary",
+                        related_query_name="cost_summary",
+                        to="management.vehicle",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name="vehiclemaintenance",
+            name="issue_report",
+        ),
+        migrations.RemoveField(
+            model_name="vehiclemaintenance",
+            name="vehicle",
+        ),
+    ]
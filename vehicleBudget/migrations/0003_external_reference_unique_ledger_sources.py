@@ -0,0 +1,67 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def detach_duplicate_records(apps, schema_editor):
+    """
+    The ledger signal used to update the record sharing the id of the saved cost, which could point a second
+    record to the same source. For each source, the latest record holding only that source is kept (it is
+    resynchronized anyway); the others lose the source, and are deleted when they are left without any.
+    """
+    FinancialRecord = apps.get_model("vehicleBudget", "FinancialRecord")
+    sources = ("fuel_consumption", "document_cost", "vehicle_maintenance")
+
+    for field in ("fuel_consumption", "document_cost"):
+        others = {f"{other}__isnull": True for other in sources if other != field}
+        duplicated = (
+            FinancialRecord.objects.filter(**{f"{field}__isnull": False})
+            .values(field)
+            .annotate(count=models.Count("id"))
+            .filter(count__gt=1)
+            .values_list(field, flat=True)
+        )
+        for source_id in list(duplicated):
+            records = FinancialRecord.objects.filter(**{field: source_id})
+            kept = records.filter(**others).order_by("-id").first() or records.order_by("-id").first()
+            records.exclude(id=kept.id).filter(**others).delete()
+            records.exclude(id=kept.id).update(**{field: None})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vehicleBudget", "0002_alter_vehiclemaintenance_unique_together_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentcost",
+            name="external_reference",
+            field=models.CharField(
+                blank=True, help_text="reference of the cost at the provider.", max_length=100, null=True, unique=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="fuelconsumption",
+            name="external_reference",
+            field=models.CharField(
+                blank=True,
+                help_text="transaction id of the fuel-card provider.",
+                max_length=100,
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.RunPython(detach_duplicate_records, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="financialrecord",
+            constraint=models.UniqueConstraint(fields=("fuel_consumption",), name="unique_fuel_consumption_record"),
+        ),
+        migrations.AddConstraint(
+            model_name="financialrecord",
+            constraint=models.UniqueConstraint(fields=("document_cost",), name="unique_document_cost_record"),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicate_maintenance_records(apps, schema_editor):
+    """
+    The ledger signal used to add a record on every save of a finished maintenance. For each maintenance,
+    the latest record holding only that maintenance is kept (it is resynchronized anyway); the others lose
+    the maintenance, and are deleted when they are left without any source.
+    """
+    FinancialRecord = apps.get_model("vehicleBudget", "FinancialRecord")
+
+    duplicated = (
+        FinancialRecord.objects.filter(vehicle_maintenance__isnull=False)
+        .values("vehicle_maintenance")
+        .annotate(count=models.Count("id"))
+        .filter(count__gt=1)
+        .values_list("vehicle_maintenance", flat=True)
+    )
+    for maintenance_id in list(duplicated):
+        records = FinancialRecord.objects.filter(vehicle_maintenance=maintenance_id)
+        kept = (
+            records.filter(fuel_consumption__isnull=True, document_cost__isnull=True).order_by("-id").first()
+            or records.order_by("-id").first()
+        )
+        records.exclude(id=kept.id).filter(fuel_consumption__isnull=True, document_cost__isnull=True).delete()
+        records.exclude(id=kept.id).update(vehicle_maintenance=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vehicleBudget", "0003_external_reference_unique_ledger_sources"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_maintenance_records, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="financialrecord",
+            constraint=models.UniqueConstraint(
+                fields=("vehicle_maintenance",), name="unique_vehicle_maintenance_record"
+            ),
+        ),
+    ]
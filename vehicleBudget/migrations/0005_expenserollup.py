@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("management", "0003_alter_vehicle_vehicle_image_and_more"),
+        ("vehicleBudget", "0004_unique_vehicle_maintenance_record"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExpenseRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("granularity", models.CharField(choices=[("day", "Day"), ("month", "Month")], max_length=5)),
+                ("period", models.DateField(help_text="first day of the bucket.")),
+                (
+                    "payment_method",
+                    models.CharField(choices=[("C", "Cash"), ("B", "Bank"), ("M", "Mobile")], max_length=1),
+                ),
+                (
+                    "expense_type",
+                    models.CharField(choices=[("F", "Fuel"), ("D", "Document"), ("M", "Maintenance")], max_length=1),
+                ),
+                ("total", models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ("records", models.PositiveIntegerField(default=0)),
+                (
+                    "vehicle",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="expense_rollups",
+                        related_query_name="expense_rollup",
+                        to="management.vehicle",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["granularity", "period"], name="expense_rollup_period_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("management", "0004_hot_filter_indexes"),
+        ("vehicleBudget", "0005_expenserollup"),
+        ("vehicleHub", "0003_hot_filter_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="financialrecord",
+            index=models.Index(fields=["record_date"], name="financial_record_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="fuelconsumption",
+            index=models.Index(fields=["vehicle", "-date"], name="fuel_vehicle_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="vehiclemaintenance",
+            index=models.Index(fields=["status", "-created_at"], name="maintenance_status_recent_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="vehiclemaintenance",
+            index=models.Index(
+                condition=models.Q(("maintenance_end_date__isnull", True)),
+                fields=["status"],
+                name="maintenance_ongoing_idx",
+            ),
+        ),
+    ]
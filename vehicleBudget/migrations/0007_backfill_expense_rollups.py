@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    The ledger written before the expense rollups existed is rolled up by the backfill_expense_rollups command,
+    run once after `migrate` (see the README): a migration only sees the historical models, not the
+    managers rolling the ledger up.
+    """
+
+    dependencies = [
+        ("vehicleBudget", "0006_hot_filter_indexes"),
+    ]
+
+    operations = []
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-18 04:46
+
+from django.db import migrations, models
+
+
+def remove_duplicate_expense_rollups(apps, schema_editor):
+    """
+    Concurrent rebuilds of the same day could both insert its buckets. The latest row of each bucket is kept;
+    the rollups of the day are rebuilt by the next payment of that day, or by backfill_expense_rollups.
+    """
+    ExpenseRollup = apps.get_model("vehicleBudget", "ExpenseRollup")
+
+    bucket = ("granularity", "period", "vehicle", "payment_method", "expense_type")
+    kept = (
+        ExpenseRollup.objects.values(*bucket)
+        .annotate(count=models.Count("id"), kept=models.Max("id"))
+        .filter(count__gt=1)
+    )
+    for row in list(kept):
+        kept_id = row.pop("kept")
+        row.pop("count")
+        ExpenseRollup.objects.filter(**row).exclude(id=kept_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("management", "0004_hot_filter_indexes"),
+        ("vehicleBudget", "0007_backfill_expense_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_expense_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="expenserollup",
+            constraint=models.UniqueConstraint(
+                fields=("granularity", "period", "vehicle", "payment_method", "expense_type"),
+                name="unique_expense_rollup_bucket",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 04:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vehicleBudget", "0008_unique_expense_rollup_bucket"),
+        ("vehicleHub", "0003_hot_filter_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="vehiclemaintenance",
+            index=models.Index(fields=["-created_at", "-id"], name="maintenance_keyset_idx"),
+        ),
+    ]
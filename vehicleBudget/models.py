@@ -1,7 +1,14 @@
 from django.db import models
+from django.db.models import Q, Sum
 from django.utils.translation import gettext_lazy as _
 
 from management.models import TimeStampModel
+from vehicleBudget.managers import (
+    ExpenseRollupManager,
+    FinancialRecordManager,
+    VehicleCostSummaryManager,
+    VehicleMaintenanceQuerySet,
+)
 
 
 class PaymentMixin(models.Model):
@@ -47,6 +54,19 @@ class VehicleMaintenance(TimeStampModel, PaymentMixin):
         verbose_name=_("Maintenance partnership"),
     )
 
+    objects = VehicleMaintenanceQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-created_at"], name="maintenance_status_recent_idx"),
+            # maintenances in progress (financial dashboard)
+            models.Index(
+                fields=["status"], condition=Q(maintenance_end_date__isnull=True), name="maintenance_ongoing_idx"
+            ),
+            # keyset pagination of the maintenance list (api.pagination.KeysetPagination).
+            models.Index(fields=["-created_at", "-id"], name="maintenance_keyset_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} - ({self.get_status_display()})"
 
@@ -59,11 +79,7 @@ class VehicleMaintenance(TimeStampModel, PaymentMixin):
         super().save(*args, **kwargs)
 
     def update_maintenance_cost(self, commit=True):
-        issue_reports = self.issue_reports.all()
-        total = 0
-        for report in issue_reports:
-            total += report.issue_cost if report.issue_cost else 0  # to avoid value error in the computing process...
-        self.payment_amount = total
+        self.payment_amount = self.issue_reports.aggregate(total=Sum("issue_cost"))["total"] or 0
 
         if commit:
             self.save()
@@ -74,6 +90,9 @@ class DocumentCost(TimeStampModel, PaymentMixin):
         "vehicleHub.Document", on_delete=models.PROTECT, related_name="costs", related_query_name="costs"
     )
     notes = models.CharField(max_length=250, null=True, blank=True, verbose_name=_("notes"))
+    external_reference = models.CharField(
+        max_length=100, unique=True, null=True, blank=True, help_text=_("reference of the cost at the provider.")
+    )
 
     def __str__(self):
         return f"{self.document} - {self.payment_amount}"
@@ -107,6 +126,12 @@ class FuelConsumption(TimeStampModel, PaymentMixin):
         related_name="fuel_consumptions",
         related_query_name="fuel_consumption",
     )
+    external_reference = models.CharField(
+        max_length=100, unique=True, null=True, blank=True, help_text=_("transaction id of the fuel-card provider.")
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=["vehicle", "-date"], name="fuel_vehicle_date_idx")]
 
     def __str__(self):
         return f"{self.date} - {self.vehicle} - {self.quantity} - {self.quantity_type}"
@@ -128,6 +153,16 @@ class FinancialRecord(TimeStampModel):
     )
     record_date = models.DateField(null=True, blank=True)
 
+    objects = FinancialRecordManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["fuel_consumption"], name="unique_fuel_consumption_record"),
+            models.UniqueConstraint(fields=["document_cost"], name="unique_document_cost_record"),
+            models.UniqueConstraint(fields=["vehicle_maintenance"], name="unique_vehicle_maintenance_record"),
+        ]
+        indexes = [models.Index(fields=["record_date"], name="financial_record_date_idx")]
+
     def __str__(self):
         if self.document_cost:
             return f"RECORD :: {self.cost}  - {self.document_cost.document} - {self.get_payment_method_display()}"
@@ -135,3 +170,77 @@ class FinancialRecord(TimeStampModel):
             return f"RECORD :: {self.cost} - {self.fuel_consumption} - {self.get_payment_method_display()}"
         elif self.vehicle_maintenance:
             return f"RECORD :: {self.cost} - {self.vehicle_maintenance.name} - {self.get_payment_method_display()}"
+
+
+class VehicleCostSummary(models.Model):
+    """
+    Running totals and counts of a vehicle's history, kept up to date by the signals of the source models.
+    """
+
+    vehicle = models.OneToOneField(
+        "management.Vehicle", on_delete=models.CASCADE, related_name="cost_summary", related_query_name="cost_summary"
+    )
+    maintenance_total = models.PositiveBigIntegerField(default=0)
+    fuel_total = models.PositiveBigIntegerField(default=0)
+    document_total = models.PositiveBigIntegerField(default=0)
+    total_drivers = models.PositiveIntegerField(default=0)
+    active_drivers = models.PositiveIntegerField(default=0)
+    reported_issues = models.PositiveIntegerField(default=0)
+    total_maintenances = models.PositiveIntegerField(default=0)
+    total_fuel_records = models.PositiveIntegerField(default=0)
+    total_documents = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = VehicleCostSummaryManager()
+
+    def __str__(self):
+        return f"{self.vehicle} :: {self.total_cost}"
+
+    @property
+    def total_cost(self):
+        return self.maintenance_total + self.fuel_total + self.document_total
+
+
+class ExpenseRollup(models.Model):
+    """
+    Financial records summed per day or month, vehicle, payment method and expense type.
+    Rebuilt from the ledger for the days it changed, see `ExpenseRollupManager`.
+    """
+
+    class Granularity(models.TextChoices):
+        DAY = "day", _("Day")
+        MONTH = "month", _("Month")
+
+    class ExpenseType(models.TextChoices):
+        FUEL = "F", _("Fuel")
+        DOCUMENT = "D", _("Document")
+        MAINTENANCE = "M", _("Maintenance")
+
+    granularity = models.CharField(max_length=5, choices=Granularity.choices)
+    period = models.DateField(help_text=_("first day of the bucket."))
+    vehicle = models.ForeignKey(
+        "management.Vehicle",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="expense_rollups",
+        related_query_name="expense_rollup",
+    )
+    payment_method = models.CharField(max_length=1, choices=PaymentMixin.PaymentMethods.choices)
+    expense_type = models.CharField(max_length=1, choices=ExpenseType.choices)
+    total = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    records = models.PositiveIntegerField(default=0)
+
+    objects = ExpenseRollupManager()
+
+    class Meta:
+        indexes = [models.Index(fields=["granularity", "period"], name="expense_rollup_period_idx")]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "period", "vehicle", "payment_method", "expense_type"],
+                name="unique_expense_rollup_bucket",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.period} ({self.granularity}) :: {self.get_expense_type_display()} - {self.total}"
@@ -1,40 +1,118 @@
-from django.db.models.signals import post_save
+from datetime import date
 
-from vehicleBudget.models import DocumentCost, FinancialRecord, FuelConsumption, VehicleMaintenance
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 
+from management import events
+from vehicleBudget.models import (
+    DocumentCost,
+    ExpenseRollup,
+    FinancialRecord,
+    FuelConsumption,
+    VehicleCostSummary,
+    VehicleMaintenance,
+)
+from vehicleHub.models import IssueReport
 
-def create_clone_in_financial_records(sender, instance: VehicleMaintenance, created, **kwargs):
-    # if not created and not sender.__name__ == "VehicleMaintenance":
-    #     return
 
-    payment_details = {
-        "cost": instance.payment_amount,
-        "payment_method": instance.payment_method,
-        "record_date": instance.payment_date,
-    }
+def ledger_handler(source_field):
+    def sync(source_ids):
+        FinancialRecord.objects.sync(source_field, source_ids)
 
-    if sender.__name__ == "DocumentCost":
-        if created:
-            FinancialRecord.objects.create(document_cost=instance, **payment_details)
-        else:
-            FinancialRecord.objects.filter(id=instance.id).update(document_cost=instance, **payment_details)
+    return sync
 
-    elif sender.__name__ == "FuelConsumption":
-        if created:
-            FinancialRecord.objects.create(fuel_consumption=instance, **payment_details)
-        else:
-            FinancialRecord.objects.filter(id=instance.id).update(fuel_consumption=instance, **payment_details)
-    elif (
-        sender.__name__ == "VehicleMaintenance"
-        and instance.status == sender.Status.APPROVED
-        and instance.maintenance_end_date
-    ):
-        if not created:
-            FinancialRecord.objects.create(vehicle_maintenance=instance, **payment_details)
+
+for source_field in FinancialRecord.objects.SOURCES:
+    events.handler(f"ledger.{source_field}")(ledger_handler(source_field))
+
+
+@events.handler("expense_rollups.days")
+def rebuild_expense_rollups(days):
+    ExpenseRollup.objects.rebuild(days=[date.fromisoformat(day) for day in days])
+
+
+def create_clone_in_financial_records(sender, instance, **kwargs):
+    # the record is upserted on its source once the transaction commits, see `FinancialRecordManager.sync`.
+    if sender is DocumentCost:
+        events.mark_dirty("ledger.document_cost", [instance.id])
+    elif sender is FuelConsumption:
+        events.mark_dirty("ledger.fuel_consumption", [instance.id])
+    elif sender is VehicleMaintenance:
+        events.mark_dirty("ledger.vehicle_maintenance", [instance.id])
+
+
+def summary_handler(section):
+    def refresh(vehicle_ids):
+        # vehicles deleted in the meantime are skipped by the refresh.
+        VehicleCostSummary.objects.refresh(vehicle_ids, sections=[section])
+
+    return refresh
+
+
+for section in VehicleCostSummary.objects.SECTIONS:
+    events.handler(f"summary.{section}")(summary_handler(section))
+
+
+@events.handler("maintenance.vehicles")
+def refresh_maintenance_summaries(maintenance_ids):
+    vehicle_ids = IssueReport.objects.filter(maintenance__in=maintenance_ids).values_list("vehicle_id", flat=True)
+    VehicleCostSummary.objects.refresh(vehicle_ids, sections=["maintenance"])
+
+
+# model -> lookup of the vehicle whose summary its rows are counted in
+VEHICLE_LOOKUPS = {FuelConsumption: "vehicle", DocumentCost: "document__issued_vehicle"}
+
+
+def remember_previous_vehicle(sender, instance, **kwargs):
+    # a row moved to another vehicle leaves the summary of the previous one stale too.
+    instance._previous_vehicle_id = None
+    if not instance._state.adding:
+        previous = sender.objects.filter(pk=instance.pk).values_list(VEHICLE_LOOKUPS[sender], flat=True)
+        instance._previous_vehicle_id = previous.first()
+
+
+def refresh_vehicle_cost_summary(sender, instance, **kwargs):
+    previous_vehicle_id = getattr(instance, "_previous_vehicle_id", None)
+    if sender is FuelConsumption:
+        events.mark_dirty("summary.fuel", [instance.vehicle_id, previous_vehicle_id])
+    elif sender is DocumentCost:
+        events.mark_dirty("summary.documents", [instance.document.issued_vehicle_id, previous_vehicle_id])
+    elif sender is VehicleMaintenance:
+        events.mark_dirty("maintenance.vehicles", [instance.id])
+
+
+def refresh_deleted_maintenance_vehicles(sender, instance, **kwargs):
+    # the links to the reports are deleted with the maintenance: their vehicles are read before.
+    events.mark_dirty("summary.maintenance", instance.issue_reports.values_list("vehicle_id", flat=True))
+
+
+def refresh_maintenance_vehicles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # post_clear has no pk_set: the vehicles losing the maintenance are read before the links go.
+        if reverse:
+            events.mark_dirty("summary.maintenance", [instance.vehicle_id])
         else:
-            FinancialRecord.objects.filter(id=instance.id).update(vehicle_maintenance=instance, **payment_details)
+            events.mark_dirty("summary.maintenance", instance.issue_reports.values_list("vehicle_id", flat=True))
+        return
+
+    if action not in ("post_add", "post_remove"):
+        return
+
+    if reverse:
+        events.mark_dirty("summary.maintenance", [instance.vehicle_id])
+    else:
+        # the reports removed from the maintenance are not linked to it anymore once the transaction commits.
+        vehicle_ids = IssueReport.objects.filter(id__in=pk_set).values_list("vehicle_id", flat=True)
+        events.mark_dirty("summary.maintenance", vehicle_ids)
 
 
 post_save.connect(create_clone_in_financial_records, sender=DocumentCost)
 post_save.connect(create_clone_in_financial_records, sender=FuelConsumption)
 post_save.connect(create_clone_in_financial_records, sender=VehicleMaintenance)
+
+for model in VEHICLE_LOOKUPS:
+    pre_save.connect(remember_previous_vehicle, sender=model)
+    post_save.connect(refresh_vehicle_cost_summary, sender=model)
+    post_delete.connect(refresh_vehicle_cost_summary, sender=model)
+post_save.connect(refresh_vehicle_cost_summary, sender=VehicleMaintenance)
+pre_delete.connect(refresh_deleted_maintenance_vehicles, sender=VehicleMaintenance)
+m2m_changed.connect(refresh_maintenance_vehicles, sender=VehicleMaintenance.issue_reports.through)
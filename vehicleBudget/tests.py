@@ -1,3 +1,346 @@
+import io
+import json
+from datetime import date
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
 from django.test import TestCase
 
-# Create your tests here.
+from management.models import Vehicle
+from vehicleBudget.importers import FuelConsumptionImporter
+from vehicleBudget.models import (
+    DocumentCost,
+    ExpenseRollup,
+    FinancialRecord,
+    FuelConsumption,
+    VehicleCostSummary,
+    VehicleMaintenance,
+)
+from vehicleHub.models import Document, Fuel, IssueReport, Partner, Partnership
+
+
+class VehicleCostSummaryTests(TestCase):
+    """The summaries follow the rows moved to another vehicle and the deleted ones."""
+
+    def setUp(self):
+        self.vehicle, self.other_vehicle = [
+            Vehicle.objects.create(
+                make="Toyota", model="Hilux", year=2020, vin_number=f"VIN{n}", license_plate_number=f"P{n}"
+            )
+            for n in range(2)
+        ]
+        partnership = Partnership.objects.create(name="Fuel station")
+        self.partner = Partner.objects.create(partnership=partnership, email="station@example.com", companyNIF="NIF1")
+        self.fuel = Fuel.objects.create(fuel_type="Diesel")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.consumption = self.add_consumption(self.vehicle, 100)
+            self.add_consumption(self.vehicle, 50)
+            self.document = Document.objects.create(
+                name="Road tax",
+                document_type=Document.DocumentChoices.ROAD_TAX,
+                document_category=Document.DocumentTypeChoices.CORE,
+                issued_vehicle=self.vehicle,
+                exp_begin_date=date(2024, 1, 1),
+                exp_end_date=date(2025, 1, 1),
+            )
+            self.other_document = Document.objects.create(
+                name="Insurance",
+                document_type=Document.DocumentChoices.INSURANCE_CERTIFICATE,
+                document_category=Document.DocumentTypeChoices.CORE,
+                issued_vehicle=self.other_vehicle,
+                exp_begin_date=date(2024, 1, 1),
+                exp_end_date=date(2025, 1, 1),
+            )
+            self.document_cost = DocumentCost.objects.create(document=self.document, payment_amount=7)
+            self.reports = [IssueReport.objects.create(vehicle=self.vehicle, issue_cost=cost) for cost in (30, 20)]
+            self.maintenances = []
+            for report in self.reports:
+                maintenance = VehicleMaintenance.objects.create(name=f"Fix {report.id}")
+                maintenance.issue_reports.set([report])
+                maintenance.update_maintenance_cost()
+                self.maintenances.append(maintenance)
+        self.assert_summaries_match()
+
+    def add_consumption(self, vehicle, cost):
+        return FuelConsumption.objects.create(
+            vehicle=vehicle, fuel_type=self.fuel, partner=self.partner, fuel_cost=cost, payment_amount=cost
+        )
+
+    def assert_summaries_match(self):
+        # raises CommandError on the first stale summary value.
+        call_command("rebuild_vehicle_ledger", verify_only=True, stdout=StringIO())
+
+    def get_summary(self, vehicle):
+        return VehicleCostSummary.objects.get(vehicle=vehicle)
+
+    def test_moved_fuel_consumption(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.consumption.vehicle = self.other_vehicle
+            self.consumption.save()
+
+        self.assertEqual(self.get_summary(self.vehicle).total_fuel_records, 1)
+        self.assertEqual(self.get_summary(self.other_vehicle).total_fuel_records, 1)
+        self.assert_summaries_match()
+
+    def test_moved_document_and_document_cost(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.document_cost.document = self.other_document
+            self.document_cost.save()
+        self.assertEqual(self.get_summary(self.vehicle).document_total, 0)
+        self.assert_summaries_match()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_document.issued_vehicle = self.vehicle
+            self.other_document.save()
+        self.assertEqual(self.get_summary(self.other_vehicle).total_documents, 0)
+        self.assert_summaries_match()
+
+    def test_moved_issue_report(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reports[0].vehicle = self.other_vehicle
+            self.reports[0].save()
+
+        self.assertEqual(self.get_summary(self.vehicle).total_maintenances, 1)
+        self.assertEqual(self.get_summary(self.other_vehicle).total_maintenances, 1)
+        self.assert_summaries_match()
+
+    def test_deleted_maintenance(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.maintenances[0].delete()
+
+        summary = self.get_summary(self.vehicle)
+        self.assertEqual((summary.total_maintenances, summary.maintenance_total), (1, 20))
+        self.assert_summaries_match()
+
+    def test_cleared_maintenance_reports(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.maintenances[0].issue_reports.clear()
+        self.assertEqual(self.get_summary(self.vehicle).total_maintenances, 1)
+        self.assert_summaries_match()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reports[1].maintenances.clear()
+        self.assertEqual(self.get_summary(self.vehicle).total_maintenances, 0)
+        self.assert_summaries_match()
+
+    def test_deleted_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reports[0].delete()
+            # the ledger protects the costs it records.
+            self.document_cost.financial_records.all().delete()
+            self.document_cost.delete()
+            self.consumption.financial_records.all().delete()
+            self.consumption.delete()
+
+        summary = self.get_summary(self.vehicle)
+        self.assertEqual((summary.reported_issues, summary.total_maintenances), (1, 1))
+        self.assertEqual((summary.document_total, summary.total_fuel_records), (0, 1))
+        self.assert_summaries_match()
+
+
+class FinancialRecordSyncTests(TestCase):
+    """The ledger holds a record per payment, for the maintenances approved and finished only."""
+
+    def setUp(self):
+        self.partner = Partner.objects.create(
+            partnership=Partnership.objects.create(name="Garage"), email="garage@example.com", companyNIF="NIF1"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.maintenance = VehicleMaintenance.objects.create(
+                name="Fix",
+                partner=self.partner,
+                status=VehicleMaintenance.Status.APPROVED,
+                maintenance_end_date=date(2024, 1, 15),
+                payment_amount=100,
+                payment_date=date(2024, 1, 15),
+            )
+
+    def get_unsynced_sources(self):
+        return [sorted(ids) for ids in FinancialRecord.objects.get_unsynced_sources("vehicle_maintenance")]
+
+    def update_maintenance(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for field, value in fields.items():
+                setattr(self.maintenance, field, value)
+            self.maintenance.save()
+
+    def test_synced_on_commit(self):
+        record = FinancialRecord.objects.get(vehicle_maintenance=self.maintenance)
+        self.assertEqual((record.cost, record.record_date), (100, date(2024, 1, 15)))
+
+        self.update_maintenance(payment_amount=120)
+        record = FinancialRecord.objects.get(vehicle_maintenance=self.maintenance)
+        self.assertEqual(record.cost, 120)
+        self.assertEqual(self.get_unsynced_sources(), [[], [], []])
+
+    def test_record_removed_from_the_ledger(self):
+        for fields in ({"status": VehicleMaintenance.Status.CANCELED}, {"maintenance_end_date": None}):
+            self.update_maintenance(status=VehicleMaintenance.Status.APPROVED, maintenance_end_date=date(2024, 1, 15))
+            self.assertTrue(FinancialRecord.objects.filter(vehicle_maintenance=self.maintenance).exists())
+
+            self.update_maintenance(**fields)
+            self.assertFalse(FinancialRecord.objects.filter(vehicle_maintenance=self.maintenance).exists())
+            month = ExpenseRollup.objects.filter(granularity=ExpenseRollup.Granularity.MONTH, period=date(2024, 1, 1))
+            self.assertFalse(month.exists())
+
+    def test_unsynced_sources(self):
+        FinancialRecord.objects.filter(vehicle_maintenance=self.maintenance).update(cost=1)
+        self.assertEqual(self.get_unsynced_sources(), [[], [self.maintenance.pk], []])
+
+        VehicleMaintenance.objects.filter(pk=self.maintenance.pk).update(status=VehicleMaintenance.Status.REJECTED)
+        self.assertEqual(self.get_unsynced_sources(), [[], [], [self.maintenance.pk]])
+
+        FinancialRecord.objects.all().delete()
+        VehicleMaintenance.objects.filter(pk=self.maintenance.pk).update(status=VehicleMaintenance.Status.APPROVED)
+        self.assertEqual(self.get_unsynced_sources(), [[self.maintenance.pk], [], []])
+
+    def test_reconcile_ledger(self):
+        VehicleMaintenance.objects.filter(pk=self.maintenance.pk).update(status=VehicleMaintenance.Status.REJECTED)
+        stdout = StringIO()
+        with self.assertRaisesMessage(CommandError, "1 payments are out of sync with the ledger."):
+            call_command("reconcile_ledger", dry_run=True, stdout=stdout)
+        self.assertIn("vehicle_maintenance: 0 missing, 0 mismatched, 1 stale records", stdout.getvalue())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("reconcile_ledger", stdout=StringIO())
+        self.assertFalse(FinancialRecord.objects.exists())
+        call_command("reconcile_ledger", dry_run=True, stdout=StringIO())
+
+
+class ExpenseRollupTests(TestCase):
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(
+            make="Toyota", model="Hilux", year=2020, vin_number="VIN", license_plate_number="P"
+        )
+        partnership = Partnership.objects.create(name="Fuel station")
+        self.partner = Partner.objects.create(partnership=partnership, email="station@example.com", companyNIF="NIF1")
+        self.fuel = Fuel.objects.create(fuel_type="Diesel")
+        with self.captureOnCommitCallbacks(execute=True):
+            for day, amount in ((1, 10), (15, 20), (31, 30)):
+                FuelConsumption.objects.create(
+                    vehicle=self.vehicle,
+                    fuel_type=self.fuel,
+                    partner=self.partner,
+                    fuel_cost=amount,
+                    payment_amount=amount,
+                    payment_date=date(2024, 1, day),
+                )
+        # the ledger as it was before the rollups existed.
+        ExpenseRollup.objects.all().delete()
+
+    def get_month_total(self):
+        month = ExpenseRollup.objects.get(granularity=ExpenseRollup.Granularity.MONTH, period=date(2024, 1, 1))
+        return month.total, month.records
+
+    def test_month_rebuilt_from_its_days(self):
+        call_command("backfill_expense_rollups", stdout=StringIO())
+        self.assertEqual(self.get_month_total(), (60, 3))
+        self.assertEqual(ExpenseRollup.objects.filter(granularity=ExpenseRollup.Granularity.DAY).count(), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            consumption = FuelConsumption.objects.get(payment_date=date(2024, 1, 15))
+            consumption.payment_amount = 25
+            consumption.save()
+        self.assertEqual(self.get_month_total(), (65, 3))
+
+        ExpenseRollup.objects.rebuild(date_from=date(2024, 1, 10), date_to=date(2024, 1, 20))
+        self.assertEqual(self.get_month_total(), (65, 3))
+        self.assertEqual(ExpenseRollup.objects.filter(granularity=ExpenseRollup.Granularity.DAY).count(), 3)
+
+    def test_records_without_date(self):
+        record = FinancialRecord.objects.get(fuel_consumption__payment_date=date(2024, 1, 15))
+        FinancialRecord.objects.filter(pk=record.pk).update(record_date=None)
+        day = record.created_at.date()
+
+        ExpenseRollup.objects.rebuild(days=[day])
+        self.assertEqual(ExpenseRollup.objects.get(granularity=ExpenseRollup.Granularity.DAY, period=day).total, 20)
+
+
+class FailingImporter(FuelConsumptionImporter):
+    batches = 0
+
+    def save(self, instances):
+        self.batches += 1
+        if self.batches == 2:
+            raise IntegrityError("rejected batch")
+        return super().save(instances)
+
+
+class FuelConsumptionImporterTests(TestCase):
+    header = "vehicle,fuel_type,partner,date,quantity,fuel_cost\n"
+
+    def setUp(self):
+        Vehicle.objects.create(make="Toyota", model="Hilux", year=2020, vin_number="VIN", license_plate_number="P1")
+        partnership = Partnership.objects.create(name="Fuel station")
+        Partner.objects.create(partnership=partnership, email="station@example.com", companyNIF="NIF1")
+        Fuel.objects.create(fuel_type="Diesel")
+
+    def import_rows(self, quantities, importer_class=FuelConsumptionImporter, batch_size=None):
+        rows = "".join(f"P1,diesel,NIF1,2024-01-01,{quantity},10\n" for quantity in quantities)
+        with self.captureOnCommitCallbacks(execute=True):
+            return importer_class(batch_size=batch_size).run(StringIO(self.header + rows), "csv")
+
+    def test_non_finite_quantities(self):
+        report = self.import_rows(["12.5", "NaN", "Infinity", "-inf"])
+        self.assertEqual((report["imported"], report["invalid"]), (1, 3))
+        self.assertEqual([error["line"] for error in report["errors"]], [3, 4, 5])
+
+    def test_integers(self):
+        rows = "".join(
+            json.dumps({"vehicle": "P1", "fuel_type": "diesel", "partner": "NIF1", "date": "2024-01-01", **row}) + "\n"
+            for row in (
+                {"fuel_cost": 10},
+                {"fuel_cost": 10.0, "payment_amount": "8"},
+                {"fuel_cost": True},
+                {"fuel_cost": 12.5},
+                {"fuel_cost": "12.5"},
+                {"fuel_cost": float("inf")},
+            )
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            report = FuelConsumptionImporter().run(StringIO(rows), "ndjson")
+        self.assertEqual((report["imported"], report["invalid"]), (2, 4))
+        self.assertEqual([error["line"] for error in report["errors"]], [3, 4, 5, 6])
+        self.assertEqual(sorted(FuelConsumption.objects.values_list("payment_amount", flat=True)), [8, 10])
+
+    def test_unreadable_file(self):
+        stream = io.TextIOWrapper(io.BytesIO((self.header + "P1,diesel,NIF1,2024-01-01,1,10\n").encode() + b"\xff\n"))
+        with self.captureOnCommitCallbacks(execute=True):
+            report = FuelConsumptionImporter().run(stream, "csv")
+        self.assertEqual(report["imported"], 0)
+        self.assertTrue(report["error"].startswith("unreadable after line 0: 'utf-8' codec can't decode"))
+
+        report = self.import_rows(["1", '"2'])
+        self.assertEqual((report["rows"], report["imported"]), (1, 1))
+        self.assertTrue(report["error"].startswith("unreadable after line 2:"))
+
+    def test_import_retried(self):
+        header = "external_reference,vehicle,fuel_type,partner,date,fuel_cost\n"
+        rows = "T1,P1,diesel,NIF1,2024-01-01,10\nT2,P1,diesel,NIF1,2024-01-02,20\nT3,P1,diesel,NIF1,2024-01-03,30\n"
+
+        def import_file(content):
+            with self.captureOnCommitCallbacks(execute=True):
+                return FuelConsumptionImporter(batch_size=2).run(StringIO(header + content), "csv")
+
+        self.assertEqual(import_file(rows)["imported"], 3)
+        # sent again, with T2 corrected and a new row: the rows are updated, not duplicated.
+        report = import_file(rows.replace(",20\n", ",25\n") + "T4,P1,diesel,NIF1,2024-01-04,40\n")
+        self.assertEqual((report["rows"], report["imported"], report["failed"]), (4, 4, 0))
+        self.assertEqual(FuelConsumption.objects.get(external_reference="T2").fuel_cost, 25)
+        # a reference repeated in a batch: the last row wins.
+        report = import_file("T2,P1,diesel,NIF1,2024-01-02,21\nT2,P1,diesel,NIF1,2024-01-02,22\n")
+        self.assertEqual((report["rows"], report["imported"], report["failed"]), (2, 1, 0))
+
+        costs = dict(FuelConsumption.objects.values_list("external_reference", "fuel_cost"))
+        self.assertEqual(costs, {"T1": 10, "T2": 22, "T3": 30, "T4": 40})
+        records = FinancialRecord.objects.filter(fuel_consumption__isnull=False)
+        self.assertEqual(records.count(), 4)
+        self.assertEqual(records.get(fuel_consumption__external_reference="T2").cost, 22)
+
+    def test_rejected_batch(self):
+        report = self.import_rows(["1", "2", "3", "4", "5"], FailingImporter, batch_size=2)
+        self.assertEqual((report["imported"], report["failed"]), (3, 2))
+        self.assertEqual(report["errors"], [{"line": 4, "error": "lines 4-5 not written: rejected batch"}])
+        self.assertEqual(FuelConsumption.objects.count(), 3)
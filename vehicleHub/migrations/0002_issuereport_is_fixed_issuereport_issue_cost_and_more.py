@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vehicleHub", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="issuereport",
+            name="is_fixed",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="issuereport",
+            name="issue_cost",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="partnership",
+            name="contract_file",
+            field=models.FileField(blank=True, null=True, upload_to="partnership/"),
+        ),
+        migrations.AlterField(
+            model_name="fuel",
+            name="fuel_type",
+            field=models.CharField(help_text="fuel type taken by the vehicle.", max_length=50),
+        ),
+    ]
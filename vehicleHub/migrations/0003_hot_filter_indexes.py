@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("management", "0004_hot_filter_indexes"),
+        ("vehicleHub", "0002_issuereport_is_fixed_issuereport_issue_cost_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="issuereport",
+            index=models.Index(
+                condition=models.Q(("is_fixed", False)), fields=["vehicle"], name="issue_report_open_vehicle_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issuereport",
+            index=models.Index(fields=["vehicle", "-created_at"], name="issue_report_recent_idx"),
+        ),
+    ]
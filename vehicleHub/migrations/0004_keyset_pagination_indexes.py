@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-18 04:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0004_hot_filter_indexes"),
+        ("management", "0004_hot_filter_indexes"),
+        ("vehicleHub", "0003_hot_filter_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(fields=["-created_at", "-id"], name="document_keyset_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="issuereport",
+            index=models.Index(fields=["-created_at", "-id"], name="issue_report_keyset_idx"),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -66,6 +67,10 @@ class Document(TimeStampModel):
     description = models.CharField(max_length=250, null=True, blank=True)
     document_file = models.FileField(upload_to="media/document/", null=True, blank=True)
 
+    class Meta:
+        # keyset pagination of the document list (api.pagination.KeysetPagination).
+        indexes = [models.Index(fields=["-created_at", "-id"], name="document_keyset_idx")]
+
     def __str__(self):
         if self.name:
             return f"{self.name} - {self.get_document_type_display()}"
@@ -159,6 +164,15 @@ class IssueReport(TimeStampModel):
 
     issue_cost = models.PositiveIntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # open reports, per vehicle (technician dashboards) and overall (issue report list).
+            models.Index(fields=["vehicle"], condition=Q(is_fixed=False), name="issue_report_open_vehicle_idx"),
+            models.Index(fields=["vehicle", "-created_at"], name="issue_report_recent_idx"),
+            # keyset pagination of the issue report list (api.pagination.KeysetPagination).
+            models.Index(fields=["-created_at", "-id"], name="issue_report_keyset_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} for {self.vehicle} - {self.get_priority_display()}"
 
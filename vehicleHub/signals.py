@@ -1,18 +1,49 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 
-from vehicleHub.models import IssueReport
+from management import events
+from vehicleBudget.models import VehicleMaintenance
+from vehicleHub.models import Document, IssueReport
+
+
+@events.handler("maintenance.costs")
+def recompute_maintenance_costs(maintenance_ids):
+    VehicleMaintenance.objects.filter(id__in=maintenance_ids).recompute_payment_amounts()
 
 
 def update_maintenance_overall(sender, instance, created, **kwargs):
     if not created and instance.is_fixed:
         return
 
-    active_maintenances = instance.maintenances.all()
-    if not active_maintenances:
-        return
-    else:
-        for maintenance in active_maintenances:
-            maintenance.update_maintenance_cost()
+    # recomputed once per maintenance when the transaction commits, however many of its reports changed.
+    events.mark_dirty("maintenance.costs", instance.maintenances.values_list("id", flat=True))
+
+
+# model -> field of the vehicle whose summary its rows are counted in
+VEHICLE_FIELDS = {IssueReport: "vehicle", Document: "issued_vehicle"}
+
+
+def remember_previous_vehicle(sender, instance, **kwargs):
+    # a row moved to another vehicle leaves the summary of the previous one stale too.
+    instance._previous_vehicle_id = None
+    if not instance._state.adding:
+        previous = sender.objects.filter(pk=instance.pk).values_list(VEHICLE_FIELDS[sender], flat=True)
+        instance._previous_vehicle_id = previous.first()
+
+
+def refresh_vehicle_cost_summary(sender, instance, **kwargs):
+    previous_vehicle_id = getattr(instance, "_previous_vehicle_id", None)
+    if sender is IssueReport:
+        vehicle_ids = [instance.vehicle_id, previous_vehicle_id]
+        events.mark_dirty("summary.issues", vehicle_ids)
+        # the maintenances of the report follow it to its new vehicle, or lose it when it is deleted.
+        if kwargs.get("created") is not True and previous_vehicle_id != instance.vehicle_id:
+            events.mark_dirty("summary.maintenance", vehicle_ids)
+    elif sender is Document:
+        events.mark_dirty("summary.documents", [instance.issued_vehicle_id, previous_vehicle_id])
 
 
 post_save.connect(update_maintenance_overall, sender=IssueReport)
+for model in VEHICLE_FIELDS:
+    pre_save.connect(remember_previous_vehicle, sender=model)
+    post_save.connect(refresh_vehicle_cost_summary, sender=model)
+    post_delete.connect(refresh_vehicle_cost_summary, sender=model)
@@ -59,6 +59,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "authentication.middleware.BearerTokenMiddleware",
+    "authentication.middleware.QueryInstrumentationMiddleware",
 ]
 
 REST_FRAMEWORK = {
@@ -76,6 +77,53 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(hours=24),
 }
 
+# Lifetime (in seconds) of the cached role names used by AppUser.has_access. Role changes are dropped
+# from the default cache: it must be shared by the processes (see authentication.checks).
+ACCESS_CACHE_TIMEOUT = 60 * 5
+
+# Write the active role names into the JWT claims. Combined with
+# "authentication.authentication_conf.StatelessAuthenticationView" as authentication class,
+# read-only requests are authorized from the claims without loading the user.
+JWT_ROLE_CLAIMS = False
+
+# Lifetime (in seconds) of the cached fleet-wide figures of the system dashboard.
+DASHBOARD_CACHE_TIMEOUT = 60
+
+CELERY_BROKER_URL = "redis://localhost:6379/0"
+
+# Interval and timeout (in seconds) of the background broker/worker health probe.
+HEALTH_CHECK_INTERVAL = 30
+HEALTH_CHECK_TIMEOUT = 1.0
+
+# Rows fetched per database round trip by the streaming exports.
+EXPORT_CHUNK_SIZE = 2000
+
+# Work deferred by the model signals to the transaction commit (see management.events):
+# ids processed per batch, and whether the work is handed off to a Celery worker.
+DEFERRED_EVENTS_BATCH_SIZE = 500
+DEFERRED_EVENTS_ASYNC = False
+
+# Rows written per bulk_create by the CSV/NDJSON importers (see vehicleBudget.importers).
+IMPORT_BATCH_SIZE = 1000
+
+# Share of the requests (0 to 1) whose SQL queries are recorded by QueryInstrumentationMiddleware,
+# reported in a log line and a Server-Timing header (staff users only, unless DEBUG); and the number of
+# slowest statements reported.
+QUERY_INSTRUMENTATION_SAMPLE_RATE = 0.1
+QUERY_INSTRUMENTATION_SLOWEST = 3
+# Log the serializer fields QueryOptimizerMixin cannot derive the queries of (method fields, properties...).
+QUERY_OPTIMIZER_DEBUG = False
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "authentication.middleware": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        "api.mixins": {"handlers": ["console"], "level": "WARNING", "propagate": False},
+    },
+}
+
 ROOT_URLCONF = "vehicleManagementSystem.urls"
 
 TEMPLATES = [